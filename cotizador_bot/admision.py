@@ -0,0 +1,318 @@
+"""
+Control de admisión del webhook.
+
+Limita las cotizaciones en curso a ADMISION_MAX_EN_CURSO. Una solicitud sin
+cupo espera hasta ADMISION_MAX_ESPERA segundos en su carril (el prioritario,
+para conversaciones que ya tienen una reserva a medias, se atiende antes que
+el normal); si no lo consigue, o si su carril ya tiene ADMISION_MAX_EN_ESPERA
+solicitudes, se difiere: el cliente recibe de inmediato un aviso y la
+cotización completa se procesa desde la cola de diferidos cuando se libera
+cupo. Con la cola de diferidos llena la solicitud se descarta.
+
+Un número tiene a lo sumo un mensaje diferido: los mensajes que llegan
+mientras espera se le agregan, así la extracción los ve juntos y en orden.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from registro import obtener_logger, hash_numero
+from config import (
+    ADMISION_MAX_EN_CURSO, ADMISION_MAX_ESPERA, ADMISION_MAX_EN_ESPERA,
+    ADMISION_MAX_DIFERIDOS, ADMISION_TTL_DIFERIDO
+)
+
+log = obtener_logger("admision")
+
+DIFERIDO = "diferido"
+DESCARTADO = "descartado"
+EXPIRADO = "expirado"
+
+class _BaseAdmision:
+    """Carriles, cola de diferidos y contadores de ambas versiones"""
+
+    def __init__(self, procesar, avisar):
+        """
+        Args:
+            procesar: Procesa un mensaje y retorna el estado para el webhook
+            avisar: avisar(mensaje, motivo) responde al cliente cuando su
+                mensaje se difiere, descarta o expira
+        """
+        self.procesar = procesar
+        self.avisar = avisar
+        self.en_curso = 0
+        self.carriles = {True: deque(), False: deque()}
+        self.diferidos = deque()
+        self.diferidos_por_numero = {}
+        self.contadores = {
+            "admitidos": 0,
+            "admitidos_prioridad": 0,
+            "diferidos": 0,
+            "procesados_diferidos": 0,
+            "descartados": 0,
+            "expirados": 0,
+        }
+
+    def _puede_entrar(self, turno, prioritario):
+        if self.en_curso >= ADMISION_MAX_EN_CURSO:
+            return False
+        if prioritario:
+            return self.carriles[True][0] is turno
+        return not self.carriles[True] and self.carriles[False][0] is turno
+
+    def _admitir(self, prioritario):
+        self.en_curso += 1
+        self.contadores["admitidos_prioridad" if prioritario else "admitidos"] += 1
+
+    def _diferir(self, mensaje):
+        """
+        Agrega el mensaje a la cola de diferidos (o al diferido de su número)
+
+        Returns:
+            DIFERIDO o DESCARTADO
+        """
+        pendiente = self.diferidos_por_numero.get(mensaje['numero'])
+        if pendiente is not None:
+            pendiente['texto'] = f"{pendiente['texto']}\n{mensaje['texto']}"
+        elif len(self.diferidos) >= ADMISION_MAX_DIFERIDOS:
+            self.contadores["descartados"] += 1
+            return DESCARTADO
+        else:
+            pendiente = dict(mensaje)
+            self.diferidos_por_numero[mensaje['numero']] = pendiente
+            self.diferidos.append((pendiente, time.monotonic()))
+        self.contadores["diferidos"] += 1
+        return DIFERIDO
+
+    def _siguiente_diferido(self):
+        """Saca los diferidos expirados y retorna el primero vigente o None"""
+        while self.diferidos:
+            pendiente, encolado = self.diferidos[0]
+            if time.monotonic() - encolado <= ADMISION_TTL_DIFERIDO:
+                return pendiente
+            self.diferidos.popleft()
+            del self.diferidos_por_numero[pendiente['numero']]
+            self.contadores["expirados"] += 1
+            self._avisar(pendiente, EXPIRADO)
+        return None
+
+    def _quitar_diferido(self):
+        pendiente, _ = self.diferidos.popleft()
+        del self.diferidos_por_numero[pendiente['numero']]
+        self.contadores["procesados_diferidos"] += 1
+        return pendiente
+
+    def _avisar(self, mensaje, motivo):
+        log.warning("Mensaje no admitido", extra={"datos": {
+            "motivo": motivo,
+            "numero_hash": hash_numero(mensaje['numero']),
+            "en_curso": self.en_curso,
+            "diferidos": len(self.diferidos),
+        }})
+        try:
+            self.avisar(mensaje, motivo)
+        except Exception:
+            log.exception("Error avisando al cliente")
+
+    def _estadisticas(self):
+        estadisticas = dict(self.contadores)
+        estadisticas["en_curso"] = self.en_curso
+        estadisticas["en_espera"] = len(self.carriles[False])
+        estadisticas["en_espera_prioridad"] = len(self.carriles[True])
+        estadisticas["diferidos_pendientes"] = len(self.diferidos)
+        return estadisticas
+
+class ControlAdmision(_BaseAdmision):
+    """Control de admisión para el servidor con hilos (app.py)"""
+
+    def __init__(self, procesar, avisar):
+        super().__init__(procesar, avisar)
+        self.condicion = threading.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=ADMISION_MAX_EN_CURSO, thread_name_prefix="diferidos")
+        self.despachador = None
+
+    def entrar(self, prioritario, espera=ADMISION_MAX_ESPERA, limitar_espera=True):
+        """
+        Espera un cupo en el carril indicado
+
+        Args:
+            limitar_espera: Rechaza de inmediato si el carril ya tiene
+                ADMISION_MAX_EN_ESPERA solicitudes (el despachador no lo usa)
+
+        Returns:
+            True si se obtuvo cupo (hay que llamar a salir() al terminar)
+        """
+        turno = object()
+        limite = time.monotonic() + espera
+        with self.condicion:
+            carril = self.carriles[prioritario]
+            if limitar_espera and len(carril) >= ADMISION_MAX_EN_ESPERA:
+                return False
+            carril.append(turno)
+            try:
+                while not self._puede_entrar(turno, prioritario):
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        return False
+                    self.condicion.wait(restante)
+                self._admitir(prioritario)
+                return True
+            finally:
+                carril.remove(turno)
+                self.condicion.notify_all()
+
+    def salir(self):
+        with self.condicion:
+            self.en_curso -= 1
+            self.condicion.notify_all()
+
+    def ejecutar(self, mensaje, prioritario=False):
+        """
+        Procesa el mensaje si obtiene cupo; si no, lo difiere y avisa al cliente
+
+        Returns:
+            Estado de procesar(), DIFERIDO o DESCARTADO
+        """
+        with self.condicion:
+            diferir = mensaje['numero'] in self.diferidos_por_numero
+
+        if not diferir and self.entrar(prioritario):
+            try:
+                return self.procesar(mensaje)
+            finally:
+                self.salir()
+
+        with self.condicion:
+            motivo = self._diferir(mensaje)
+            if motivo == DIFERIDO and self.despachador is None:
+                self.despachador = threading.Thread(target=self._despachar, name="admision", daemon=True)
+                self.despachador.start()
+            self.condicion.notify_all()
+        if not diferir:
+            # Si ya tenía un diferido, el cliente ya fue avisado
+            self._avisar(mensaje, motivo)
+        return motivo
+
+    def _despachar(self):
+        """Procesa los diferidos a medida que se libera cupo"""
+        while True:
+            with self.condicion:
+                while self._siguiente_diferido() is None:
+                    self.condicion.wait()
+
+            if not self.entrar(False, limitar_espera=False):
+                continue
+
+            with self.condicion:
+                pendiente = self._siguiente_diferido()
+                if pendiente is not None:
+                    pendiente = self._quitar_diferido()
+            if pendiente is None:
+                self.salir()
+                continue
+            self.executor.submit(self._procesar_diferido, pendiente)
+
+    def _procesar_diferido(self, mensaje):
+        try:
+            self.procesar(mensaje)
+        except Exception:
+            log.exception("Error procesando mensaje diferido")
+        finally:
+            self.salir()
+
+    def estadisticas(self):
+        with self.condicion:
+            return self._estadisticas()
+
+class ControlAdmisionAsync(_BaseAdmision):
+    """Versión asyncio del control de admisión (app_async.py)"""
+
+    def __init__(self, procesar, avisar):
+        """procesar es una función async; avisar es síncrona y no bloqueante"""
+        super().__init__(procesar, avisar)
+        self.condicion = None
+        self.despachador = None
+        self.tareas = set()
+
+    def _condicion(self):
+        # Se crea dentro del event loop del servidor
+        if self.condicion is None:
+            self.condicion = asyncio.Condition()
+        return self.condicion
+
+    async def entrar(self, prioritario, espera=ADMISION_MAX_ESPERA, limitar_espera=True):
+        turno = object()
+        condicion = self._condicion()
+        async with condicion:
+            carril = self.carriles[prioritario]
+            if limitar_espera and len(carril) >= ADMISION_MAX_EN_ESPERA:
+                return False
+            carril.append(turno)
+            try:
+                await asyncio.wait_for(
+                    condicion.wait_for(lambda: self._puede_entrar(turno, prioritario)), espera
+                )
+                self._admitir(prioritario)
+                return True
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                carril.remove(turno)
+                condicion.notify_all()
+
+    async def salir(self):
+        condicion = self._condicion()
+        async with condicion:
+            self.en_curso -= 1
+            condicion.notify_all()
+
+    async def ejecutar(self, mensaje, prioritario=False):
+        """Igual que ControlAdmision.ejecutar"""
+        diferir = mensaje['numero'] in self.diferidos_por_numero
+        if not diferir and await self.entrar(prioritario):
+            try:
+                return await self.procesar(mensaje)
+            finally:
+                await self.salir()
+
+        condicion = self._condicion()
+        async with condicion:
+            motivo = self._diferir(mensaje)
+            if motivo == DIFERIDO and self.despachador is None:
+                self.despachador = asyncio.create_task(self._despachar())
+            condicion.notify_all()
+        if not diferir:
+            self._avisar(mensaje, motivo)
+        return motivo
+
+    async def _despachar(self):
+        condicion = self._condicion()
+        while True:
+            async with condicion:
+                await condicion.wait_for(lambda: self._siguiente_diferido() is not None)
+
+            if not await self.entrar(False, limitar_espera=False):
+                continue
+
+            async with condicion:
+                pendiente = self._siguiente_diferido()
+                if pendiente is not None:
+                    pendiente = self._quitar_diferido()
+            if pendiente is None:
+                await self.salir()
+                continue
+            tarea = asyncio.create_task(self._procesar_diferido(pendiente))
+            self.tareas.add(tarea)
+            tarea.add_done_callback(self.tareas.discard)
+
+    async def _procesar_diferido(self, mensaje):
+        try:
+            await self.procesar(mensaje)
+        except Exception:
+            log.exception("Error procesando mensaje diferido")
+        finally:
+            await self.salir()
+
+    def estadisticas(self):
+        return self._estadisticas()
@@ -1,122 +1,169 @@
 from flask import Flask, request, jsonify
 import requests
 import time
-import json
-from datetime import datetime, timedelta
 from config import (
     API_KEY, EVOLUTION_API_BASE, WEBHOOK_TOKEN,
-    DURACION_ESCRIBIENDO, TIEMPO_MENSAJE_ANTIGUO, TIEMPO_AGRUPACION,
-    NUMERO_AUTORIZADO
+    DURACION_ESCRIBIENDO
 )
 from extractor import extraer_informacion_reserva
-from pdf_generator import generar_cotizacion_pdf
-from precios import obtener_precios_habitaciones, calcular_totales
+from plantillas import cache_plantillas
+from perfilado import perfilar_solicitud
+from registro import configurar_registro, obtener_logger, contexto_solicitud, ms_desde
+from grabacion import grabador
+from bitacora import bitacora
+from decodificacion import (
+    decodificar, estadisticas as estadisticas_decodificacion,
+    RECHAZO_INVALIDO, RECHAZO_NO_AUTORIZADO
+)
+from envios import PlanificadorEnvios, EnvioReintentable
+from admision import ControlAdmision
+from asignacion import completar_habitaciones
+from conversaciones import (
+    debe_procesar_mensaje, cerrar_conversacion, limpiar_cache,
+    obtener_reserva_parcial, guardar_reserva_parcial, descartar_reserva_parcial,
+    tiene_reserva_parcial, procesando
+)
+from intenciones import obtener_modelo
+from cotizacion import (
+    obtener_campos_faltantes, generar_cotizacion,
+    formatear_mensaje_exito, formatear_mensaje_faltantes, responder_sin_extraccion,
+    MENSAJE_ERROR_COTIZACION, MENSAJES_ADMISION
+)
 
 app = Flask(__name__)
 
-conversaciones_activas = {}
-mensajes_procesados = set()
+planificador = PlanificadorEnvios()
+configurar_registro()
+log = obtener_logger("webhook")
+# El clasificador de intención se entrena al arrancar, no en la primera solicitud
+obtener_modelo()
 
-def debe_procesar_mensaje(numero, message_id, timestamp_mensaje):
-    ahora = time.time()
-    
-    if message_id in mensajes_procesados:
-        return False
-    
-    diferencia = ahora - timestamp_mensaje
-    if diferencia > TIEMPO_MENSAJE_ANTIGUO:
-        mensajes_procesados.add(message_id)
-        return False
-    
-    if numero in conversaciones_activas:
-        conv = conversaciones_activas[numero]
-        
-        if conv["estado"] == "cerrada":
-            tiempo_desde_cierre = ahora - conv["timestamp"]
-            if tiempo_desde_cierre < 5:
-                mensajes_procesados.add(message_id)
-                return False
-            else:
-                conv["estado"] = "activa"
-                conv["timestamp"] = ahora
-                conv["message_ids"] = [message_id]
-        
-        elif conv["estado"] == "activa":
-            tiempo_desde_ultimo = ahora - conv["timestamp"]
-            if tiempo_desde_ultimo < TIEMPO_AGRUPACION:
-                conv["message_ids"].append(message_id)
-                conv["timestamp"] = ahora
-                mensajes_procesados.add(message_id)
-                return False
-    else:
-        conversaciones_activas[numero] = {
-            "estado": "activa",
-            "timestamp": ahora,
-            "message_ids": [message_id]
-        }
-    
-    mensajes_procesados.add(message_id)
-    return True
-
-def cerrar_conversacion(numero):
-    if numero in conversaciones_activas:
-        conversaciones_activas[numero]["estado"] = "cerrada"
-        conversaciones_activas[numero]["timestamp"] = time.time()
-
-def limpiar_cache():
-    if len(mensajes_procesados) > 1000:
-        mensajes_procesados.clear()
-    
-    ahora = time.time()
-    for numero in list(conversaciones_activas.keys()):
-        if ahora - conversaciones_activas[numero]["timestamp"] > 3600:
-            del conversaciones_activas[numero]
+def post_evolution(url, payload, timeout=10):
+    """
+    POST a Evolution API. Lanza EnvioReintentable ante 429/5xx para que el
+    planificador reintente; los errores de red también se reintentan.
+    """
+    headers = {"Content-Type": "application/json", "apikey": API_KEY}
+    response = requests.post(url, headers=headers, json=payload, timeout=timeout)
+    if response.status_code == 429 or response.status_code >= 500:
+        raise EnvioReintentable(response.status_code)
+    return response.ok
 
 def marcar_como_leido(remote_jid, message_id, instance_name):
     url = f"{EVOLUTION_API_BASE}/chat/markMessageAsRead/{instance_name}"
-    headers = {"Content-Type": "application/json", "apikey": API_KEY}
     payload = {"remoteJid": remote_jid, "id": message_id}
-    try:
-        requests.post(url, headers=headers, json=payload, timeout=10)
-        return True
-    except Exception:
-        return False
+    numero = remote_jid.split('@')[0]
+    return planificador.encolar(instance_name, numero, post_evolution, url, payload)
 
 def mostrar_escribiendo(numero, instance_name, duracion=3):
     url = f"{EVOLUTION_API_BASE}/chat/sendPresence/{instance_name}"
-    headers = {"Content-Type": "application/json", "apikey": API_KEY}
     payload = {"number": numero, "presence": "composing", "delay": duracion * 1000}
-    try:
-        requests.post(url, headers=headers, json=payload, timeout=10)
-        time.sleep(duracion)
-        return True
-    except Exception:
-        return False
+    futuro = planificador.encolar(instance_name, numero, post_evolution, url, payload)
+    time.sleep(duracion)
+    return futuro
 
 def enviar_mensaje(numero, texto, instance_name):
     url = f"{EVOLUTION_API_BASE}/message/sendText/{instance_name}"
-    headers = {"Content-Type": "application/json", "apikey": API_KEY}
     payload = {"number": numero, "text": texto}
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        return True
-    except Exception:
-        return False
+    return planificador.encolar(instance_name, numero, post_evolution, url, payload)
 
 def enviar_pdf(numero, pdf_base64, instance_name, filename="cotizacion.pdf"):
     url = f"{EVOLUTION_API_BASE}/message/sendMedia/{instance_name}"
-    headers = {"Content-Type": "application/json", "apikey": API_KEY}
     payload = {
         "number": numero,
         "mediatype": "document",
         "media": pdf_base64,
         "fileName": filename
     }
+    return planificador.encolar(instance_name, numero, post_evolution, url, payload, 30)
+
+def procesar_mensaje(mensaje, perfil):
+    """
+    Procesa un mensaje ya filtrado: extrae la reserva y responde con la
+    cotizacion o pidiendo los datos faltantes
+    
+    Returns:
+        Estado para la respuesta del webhook
+    """
+    instance_name = mensaje['instance_name']
+    message_id = mensaje['message_id']
+    numero = mensaje['numero']
+    
+    limpiar_cache()
+    marcar_como_leido(mensaje['remote_jid'], message_id, instance_name)
+    
+    conocidos = obtener_reserva_parcial(numero)
+    
+    # Saludos, agradecimientos y consultas se responden sin llamar al LLM
+    perfil.etapa("intencion")
+    respuesta = responder_sin_extraccion(mensaje['texto'], conocidos)
+    if respuesta:
+        intencion, texto = respuesta
+        enviar_mensaje(numero, texto, instance_name)
+        cerrar_conversacion(numero)
+        return intencion
+    
+    # Si hay una reserva a medias, solo se piden los campos que faltan
+    perfil.etapa("extraccion")
+    info_reserva = extraer_informacion_reserva(mensaje['texto'], conocidos)
+    
+    campos_faltantes = obtener_campos_faltantes(info_reserva)
+    
+    if campos_faltantes:
+        perfil.etapa("respuesta_incompleta")
+        guardar_reserva_parcial(numero, info_reserva)
+        mostrar_escribiendo(numero, instance_name, duracion=DURACION_ESCRIBIENDO)
+        enviar_mensaje(numero, formatear_mensaje_faltantes(campos_faltantes), instance_name)
+        cerrar_conversacion(numero)
+        return "info_incompleta"
+    
+    descartar_reserva_parcial(numero)
+    completar_habitaciones(info_reserva)
+    
+    perfil.etapa("escribiendo")
+    mostrar_escribiendo(numero, instance_name, duracion=DURACION_ESCRIBIENDO)
+    
     try:
-        requests.post(url, headers=headers, json=payload, timeout=30)
-        return True
+        perfil.etapa("cotizacion")
+        cotizacion = generar_cotizacion(info_reserva)
+        
+        mensaje_exito = formatear_mensaje_exito(
+            info_reserva, cotizacion['cantidad_noches'], cotizacion['totales']
+        )
+        
+        # La cola de la conversacion garantiza que el texto llega antes que el PDF
+        perfil.etapa("envio")
+        enviar_mensaje(numero, mensaje_exito, instance_name)
+        enviar_pdf(numero, cotizacion['pdf_base64'], instance_name)
+        
     except Exception:
-        return False
+        log.exception("Error generando la cotizacion")
+        enviar_mensaje(numero, MENSAJE_ERROR_COTIZACION, instance_name)
+    
+    cerrar_conversacion(numero)
+    return "success"
+
+def atender_mensaje(mensaje):
+    """
+    Procesa el mensaje con su contexto de registro y perfilado; los mensajes
+    de un mismo número se procesan de a uno
+    """
+    inicio = time.perf_counter()
+    with contexto_solicitud(mensaje['message_id'], mensaje['numero']), \
+            procesando(mensaje['numero']), \
+            perfilar_solicitud(mensaje['message_id']) as perfil:
+        estado = procesar_mensaje(mensaje, perfil)
+        log.info("Mensaje procesado", extra={
+            "duracion_ms": ms_desde(inicio),
+            "datos": {"estado": estado}
+        })
+    return estado
+
+def avisar_demora(mensaje, motivo):
+    """Respuesta inmediata cuando el mensaje no se admite (ver admision.py)"""
+    enviar_mensaje(mensaje['numero'], MENSAJES_ADMISION[motivo], mensaje['instance_name'])
+
+admision = ControlAdmision(atender_mensaje, avisar_demora)
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
@@ -124,112 +171,43 @@ def webhook():
     if token != WEBHOOK_TOKEN:
         return jsonify({"error": "Token invalido"}), 401
     
-    data = request.json
+    cuerpo = request.get_data()
+    grabador.registrar(cuerpo)
     try:
-        event = data.get('event')
-        if event != 'messages.upsert':
+        # Eventos que no son mensajes, propios o de otros numeros se
+        # descartan sin parsear todo el JSON (ver decodificacion.py)
+        mensaje, motivo = decodificar(cuerpo)
+        if mensaje is None:
+            if motivo == RECHAZO_INVALIDO:
+                return jsonify({"error": "JSON invalido"}), 400
+            if motivo == RECHAZO_NO_AUTORIZADO:
+                return jsonify({"status": "no_autorizado"}), 200
             return jsonify({"status": "ok"}), 200
         
-        instance_name = data.get('instance')
-        mensaje_data = data.get('data', {})
+        numero = mensaje['numero']
         
-        if mensaje_data.get('key', {}).get('fromMe'):
+        if not debe_procesar_mensaje(numero, mensaje['message_id'], mensaje['timestamp']):
             return jsonify({"status": "ok"}), 200
         
-        key = mensaje_data.get('key', {})
-        remote_jid = key.get('remoteJid', '')
-        message_id = key.get('id', '')
-        numero = remote_jid.split('@')[0]
-        
-        # Filtro de numero autorizado
-        if numero != NUMERO_AUTORIZADO:
-            return jsonify({"status": "no_autorizado"}), 200
-            
-        timestamp_mensaje = mensaje_data.get('messageTimestamp', 0)
-        message = mensaje_data.get('message', {})
-        texto = (message.get('conversation') or 
-                message.get('extendedTextMessage', {}).get('text') or '')
-        
-        if not texto or not numero:
-            return jsonify({"status": "ok"}), 200
-        
-        if not debe_procesar_mensaje(numero, message_id, timestamp_mensaje):
-            return jsonify({"status": "ok"}), 200
-        
-        limpiar_cache()
-        marcar_como_leido(remote_jid, message_id, instance_name)
-        
-        info_reserva = extraer_informacion_reserva(texto)
-        
-        campos_requeridos = ['check_in', 'check_out', 'cant_personas', 
-                           'cantidad_habitaciones', 'tipo_habitaciones']
-        
-        campos_faltantes = [campo for campo in campos_requeridos 
-                          if not info_reserva.get(campo)]
-        
-        if campos_faltantes:
-            mostrar_escribiendo(numero, instance_name, duracion=DURACION_ESCRIBIENDO)
-            mensaje_error = (
-                "Necesito mas informacion para la cotizacion. Por favor indica: "
-                "Fecha de entrada, fecha de salida, cantidad de personas, "
-                "cantidad de habitaciones y tipo de habitaciones."
-            )
-            enviar_mensaje(numero, mensaje_error, instance_name)
-            cerrar_conversacion(numero)
-            return jsonify({"status": "info_incompleta"}), 200
-        
-        mostrar_escribiendo(numero, instance_name, duracion=DURACION_ESCRIBIENDO)
-        
-        try:
-            check_in = datetime.strptime(info_reserva['check_in'], '%Y-%m-%d')
-            check_out = datetime.strptime(info_reserva['check_out'], '%Y-%m-%d')
-            cantidad_noches = (check_out - check_in).days
-            
-            if cantidad_noches <= 0:
-                raise ValueError("Fechas invalidas")
-            
-            precios = obtener_precios_habitaciones()
-            totales = calcular_totales(
-                info_reserva['tipo_habitaciones'],
-                cantidad_noches,
-                precios
-            )
-            
-            pdf_base64 = generar_cotizacion_pdf(
-                info_reserva,
-                totales,
-                cantidad_noches
-            )
-            
-            mensaje_exito = (
-                f"Cotizacion generada:\n"
-                f"Check-in: {info_reserva['check_in']}\n"
-                f"Check-out: {info_reserva['check_out']}\n"
-                f"Noches: {cantidad_noches}\n"
-                f"Total: ${totales['total_bruto']:,} CLP\n"
-                f"Enviando PDF..."
-            )
-            
-            enviar_mensaje(numero, mensaje_exito, instance_name)
-            time.sleep(1)
-            enviar_pdf(numero, pdf_base64, instance_name)
-            
-        except Exception:
-            enviar_mensaje(
-                numero,
-                "Error generando la cotizacion. Intente nuevamente.",
-                instance_name
-            )
-        
-        cerrar_conversacion(numero)
-        return jsonify({"status": "success"}), 200
+        # Las conversaciones con una reserva a medias tienen prioridad
+        estado = admision.ejecutar(mensaje, tiene_reserva_parcial(numero))
+        return jsonify({"status": estado}), 200
         
     except Exception as e:
+        log.exception("Error en webhook")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "activo"}), 200
+    return jsonify({
+        "status": "activo",
+        "envios": planificador.estadisticas(),
+        "admision": admision.estadisticas(),
+        "eventos": estadisticas_decodificacion(),
+        "plantillas": cache_plantillas.estadisticas(),
+        "bitacora": bitacora.estadisticas(),
+        "grabacion": grabador.estadisticas()
+    }), 200
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+Modo de servicio ASGI del bot.
+
+Mismas rutas que app.py (/webhook y /health), pero todas las llamadas
+salientes (Evolution y OpenAI) se esperan sobre un httpx.AsyncClient
+compartido y la generación del PDF se ejecuta en un pool de hilos, de modo
+que un solo proceso puede atender miles de conversaciones en curso. El
+perfilado por solicitud (perfilado.py) es solo de app.py: aquí todas las
+solicitudes comparten el hilo del event loop.
+
+Ejecutar con:
+    hypercorn app_async:app --bind 0.0.0.0:5000
+"""
+from quart import Quart, request, jsonify
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import time
+import httpx
+from config import (
+    API_KEY, EVOLUTION_API_BASE, WEBHOOK_TOKEN,
+    DURACION_ESCRIBIENDO, MAX_CONEXIONES_HTTP, HILOS_PDF
+)
+from registro import configurar_registro, obtener_logger, contexto_solicitud, ms_desde
+from grabacion import grabador
+from bitacora import bitacora
+from decodificacion import (
+    decodificar, estadisticas as estadisticas_decodificacion,
+    RECHAZO_INVALIDO, RECHAZO_NO_AUTORIZADO
+)
+from envios import PlanificadorEnviosAsync, EnvioReintentable
+from admision import ControlAdmisionAsync
+from extractor import extraer_informacion_reserva_async
+from plantillas import cache_plantillas
+from asignacion import completar_habitaciones
+from conversaciones import (
+    debe_procesar_mensaje, cerrar_conversacion, limpiar_cache,
+    obtener_reserva_parcial, guardar_reserva_parcial, descartar_reserva_parcial,
+    tiene_reserva_parcial, procesando_async
+)
+from intenciones import obtener_modelo
+from cotizacion import (
+    obtener_campos_faltantes, generar_cotizacion,
+    formatear_mensaje_exito, formatear_mensaje_faltantes, responder_sin_extraccion,
+    MENSAJE_ERROR_COTIZACION, MENSAJES_ADMISION
+)
+
+app = Quart(__name__)
+
+cliente_http = None
+planificador = PlanificadorEnviosAsync()
+configurar_registro()
+log = obtener_logger("webhook")
+executor_pdf = ThreadPoolExecutor(max_workers=HILOS_PDF, thread_name_prefix="pdf")
+
+@app.before_serving
+async def iniciar_cliente():
+    global cliente_http
+    # Entrenar en la primera solicitud bloquearía el loop; se hace antes de servir
+    obtener_modelo()
+    cliente_http = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONEXIONES_HTTP,
+            max_keepalive_connections=MAX_CONEXIONES_HTTP
+        )
+    )
+
+@app.after_serving
+async def cerrar_cliente():
+    await cliente_http.aclose()
+    executor_pdf.shutdown(wait=False)
+
+async def post_evolution(url, payload, timeout=10):
+    headers = {"Content-Type": "application/json", "apikey": API_KEY}
+    response = await cliente_http.post(url, headers=headers, json=payload, timeout=timeout)
+    if response.status_code == 429 or response.status_code >= 500:
+        raise EnvioReintentable(response.status_code)
+    return response.is_success
+
+def marcar_como_leido(remote_jid, message_id, instance_name):
+    url = f"{EVOLUTION_API_BASE}/chat/markMessageAsRead/{instance_name}"
+    payload = {"remoteJid": remote_jid, "id": message_id}
+    numero = remote_jid.split('@')[0]
+    return planificador.encolar(instance_name, numero, post_evolution, url, payload)
+
+async def mostrar_escribiendo(numero, instance_name, duracion=3):
+    url = f"{EVOLUTION_API_BASE}/chat/sendPresence/{instance_name}"
+    payload = {"number": numero, "presence": "composing", "delay": duracion * 1000}
+    futuro = planificador.encolar(instance_name, numero, post_evolution, url, payload)
+    await asyncio.sleep(duracion)
+    return futuro
+
+def enviar_mensaje(numero, texto, instance_name):
+    url = f"{EVOLUTION_API_BASE}/message/sendText/{instance_name}"
+    payload = {"number": numero, "text": texto}
+    return planificador.encolar(instance_name, numero, post_evolution, url, payload)
+
+def enviar_pdf(numero, pdf_base64, instance_name, filename="cotizacion.pdf"):
+    url = f"{EVOLUTION_API_BASE}/message/sendMedia/{instance_name}"
+    payload = {
+        "number": numero,
+        "mediatype": "document",
+        "media": pdf_base64,
+        "fileName": filename
+    }
+    return planificador.encolar(instance_name, numero, post_evolution, url, payload, 30)
+
+async def procesar_mensaje(mensaje):
+    """
+    Procesa un mensaje ya filtrado: extrae la reserva y responde con la
+    cotizacion o pidiendo los datos faltantes
+
+    Returns:
+        Estado para la respuesta del webhook
+    """
+    instance_name = mensaje['instance_name']
+    message_id = mensaje['message_id']
+    numero = mensaje['numero']
+
+    limpiar_cache()
+    marcar_como_leido(mensaje['remote_jid'], message_id, instance_name)
+
+    conocidos = obtener_reserva_parcial(numero)
+
+    # Saludos, agradecimientos y consultas se responden sin llamar al LLM
+    respuesta = responder_sin_extraccion(mensaje['texto'], conocidos)
+    if respuesta:
+        intencion, texto = respuesta
+        enviar_mensaje(numero, texto, instance_name)
+        cerrar_conversacion(numero)
+        return intencion
+
+    # Si hay una reserva a medias, solo se piden los campos que faltan
+    info_reserva = await extraer_informacion_reserva_async(mensaje['texto'], cliente_http, conocidos)
+
+    campos_faltantes = obtener_campos_faltantes(info_reserva)
+
+    if campos_faltantes:
+        guardar_reserva_parcial(numero, info_reserva)
+        await mostrar_escribiendo(numero, instance_name, duracion=DURACION_ESCRIBIENDO)
+        enviar_mensaje(numero, formatear_mensaje_faltantes(campos_faltantes), instance_name)
+        cerrar_conversacion(numero)
+        return "info_incompleta"
+
+    descartar_reserva_parcial(numero)
+    completar_habitaciones(info_reserva)
+
+    # El PDF se genera mientras el cliente ve "escribiendo..."
+    loop = asyncio.get_running_loop()
+    # run_in_executor no propaga el contexto: sin copiarlo el PDF y la
+    # bitácora pierden el message_id de la solicitud
+    contexto = contextvars.copy_context()
+    cotizacion_en_curso = loop.run_in_executor(executor_pdf, contexto.run, generar_cotizacion, info_reserva)
+    await mostrar_escribiendo(numero, instance_name, duracion=DURACION_ESCRIBIENDO)
+
+    try:
+        cotizacion = await cotizacion_en_curso
+
+        mensaje_exito = formatear_mensaje_exito(
+            info_reserva, cotizacion['cantidad_noches'], cotizacion['totales']
+        )
+
+        # La cola de la conversacion garantiza que el texto llega antes que el PDF
+        enviar_mensaje(numero, mensaje_exito, instance_name)
+        enviar_pdf(numero, cotizacion['pdf_base64'], instance_name)
+
+    except Exception:
+        log.exception("Error generando la cotizacion")
+        enviar_mensaje(numero, MENSAJE_ERROR_COTIZACION, instance_name)
+
+    cerrar_conversacion(numero)
+    return "success"
+
+async def atender_mensaje(mensaje):
+    """
+    Procesa el mensaje con su contexto de registro; los mensajes de un mismo
+    número se procesan de a uno
+    """
+    inicio = time.perf_counter()
+    with contexto_solicitud(mensaje['message_id'], mensaje['numero']):
+        async with procesando_async(mensaje['numero']):
+            estado = await procesar_mensaje(mensaje)
+        log.info("Mensaje procesado", extra={
+            "duracion_ms": ms_desde(inicio),
+            "datos": {"estado": estado}
+        })
+    return estado
+
+def avisar_demora(mensaje, motivo):
+    """Respuesta inmediata cuando el mensaje no se admite (ver admision.py)"""
+    enviar_mensaje(mensaje['numero'], MENSAJES_ADMISION[motivo], mensaje['instance_name'])
+
+admision = ControlAdmisionAsync(atender_mensaje, avisar_demora)
+
+@app.route('/webhook', methods=['POST'])
+async def webhook():
+    token = request.args.get('token')
+    if token != WEBHOOK_TOKEN:
+        return jsonify({"error": "Token invalido"}), 401
+
+    cuerpo = await request.get_data()
+    grabador.registrar(cuerpo)
+    try:
+        # Eventos que no son mensajes, propios o de otros numeros se
+        # descartan sin parsear todo el JSON (ver decodificacion.py)
+        mensaje, motivo = decodificar(cuerpo)
+        if mensaje is None:
+            if motivo == RECHAZO_INVALIDO:
+                return jsonify({"error": "JSON invalido"}), 400
+            if motivo == RECHAZO_NO_AUTORIZADO:
+                return jsonify({"status": "no_autorizado"}), 200
+            return jsonify({"status": "ok"}), 200
+
+        numero = mensaje['numero']
+
+        if not debe_procesar_mensaje(numero, mensaje['message_id'], mensaje['timestamp']):
+            return jsonify({"status": "ok"}), 200
+
+        # Las conversaciones con una reserva a medias tienen prioridad
+        estado = await admision.ejecutar(mensaje, tiene_reserva_parcial(numero))
+        return jsonify({"status": estado}), 200
+
+    except Exception as e:
+        log.exception("Error en webhook")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/health', methods=['GET'])
+async def health():
+    return jsonify({
+        "status": "activo",
+        "envios": planificador.estadisticas(),
+        "admision": admision.estadisticas(),
+        "eventos": estadisticas_decodificacion(),
+        "plantillas": cache_plantillas.estadisticas(),
+        "bitacora": bitacora.estadisticas(),
+        "grabacion": grabador.estadisticas()
+    }), 200
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,294 @@
+"""
+Asignación de habitaciones a partir de la cantidad de personas.
+
+Cuando el cliente da solo la cantidad de personas ("somos 7"), o un tipo sin
+cantidad que no alcanza para todos ("somos 6, superior"), se busca la
+combinación de habitaciones más económica por noche que aloja a todos,
+según la capacidad de cada tipo (CAPACIDAD_HABITACIONES), la disponibilidad
+(DISPONIBILIDAD_HABITACIONES) y, si el cliente la indicó, la cantidad de
+habitaciones.
+
+Es una mochila acotada: se recorren los tipos y, para cada cantidad de
+personas ya cubierta (con tope en el tamaño del grupo), se conservan las k
+combinaciones más baratas; eso basta para obtener las k mejores globales.
+Los resultados se memorizan por catálogo (precios, capacidades y
+disponibilidad): un cambio de precios es otra llave y no hay que invalidar
+nada.
+
+Verificación contra fuerza bruta y tiempos:
+    python asignacion.py
+"""
+import heapq
+import itertools
+import random
+import time
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+from config import CAPACIDAD_HABITACIONES, DISPONIBILIDAD_HABITACIONES, ASIGNACION_ALTERNATIVAS
+from lexico import ORDEN_TIPOS, tokenizar, NUMERO
+from precios import NOMBRES_TIPO_HABITACION, obtener_precios_habitaciones, parsear_tipos_habitaciones
+
+Asignacion = namedtuple('Asignacion', ['habitaciones', 'costo_noche', 'capacidad'])
+
+def catalogo(precios, disponibilidad=None, tipos=None):
+    """
+    Catálogo inmutable para la búsqueda; es también la llave de la caché
+
+    Args:
+        precios: Precios por noche con los nombres de PRECIOS_HABITACIONES
+        disponibilidad: Habitaciones libres por tipo (DISPONIBILIDAD_HABITACIONES
+            por defecto); un tipo ausente no tiene límite
+        tipos: Restringe la búsqueda a estos tipos del léxico
+
+    Returns:
+        Tupla de (tipo, capacidad, precio, disponibles)
+    """
+    if disponibilidad is None:
+        disponibilidad = DISPONIBILIDAD_HABITACIONES
+    return tuple(
+        (tipo, CAPACIDAD_HABITACIONES[tipo], precios[NOMBRES_TIPO_HABITACION[tipo]], disponibilidad.get(tipo))
+        for tipo in ORDEN_TIPOS
+        if (tipos is None or tipo in tipos)
+        and tipo in CAPACIDAD_HABITACIONES
+        and NOMBRES_TIPO_HABITACION[tipo] in precios
+        and disponibilidad.get(tipo) != 0
+    )
+
+@lru_cache(maxsize=1024)
+def _mejores(catalogo, personas, habitaciones, k):
+    """
+    Las k opciones (costo, cantidad de habitaciones, capacidad, tipos
+    distintos, combinación) más baratas; a igual costo, menos habitaciones,
+    menos capacidad sobrante y menos tipos distintos.
+    La combinación es una tupla de (índice en el catálogo, cantidad).
+
+    Sin cantidad fija de habitaciones no se agrega ninguna una vez que el
+    grupo está cubierto (recorriendo los tipos en el orden del catálogo).
+    """
+    fija = habitaciones is not None
+    # Estado: (personas cubiertas con tope, habitaciones usadas si la cantidad es fija)
+    estados = {(0, 0): [(0, 0, 0, 0, ())]}
+    for indice, (_, capacidad, precio, disponibles) in enumerate(catalogo):
+        # Dentro de un tipo con disponibilidad limitada el estado incluye
+        # cuántas de ese tipo se usaron: si no, las opciones que ya agotaron
+        # el tipo desplazarían de las k mejores a las que aún pueden crecer
+        siguientes = defaultdict(list)
+        for (cubiertas, usadas), opciones in estados.items():
+            siguientes[(cubiertas, usadas, 0)].extend(opciones)
+        # Agregar una habitación lleva a un estado mayor, así que en orden
+        # creciente cada estado está completo cuando se expande
+        pendientes = sorted(siguientes)
+        vistos = set()
+        while pendientes:
+            clave = heapq.heappop(pendientes)
+            if clave in vistos:
+                continue
+            vistos.add(clave)
+            opciones = siguientes[clave] = heapq.nsmallest(k, siguientes[clave])
+            cubiertas, usadas, n = clave
+            if (usadas >= habitaciones) if fija else (cubiertas >= personas):
+                continue
+            if disponibles is not None and n >= disponibles:
+                continue
+            siguiente = (
+                min(personas, cubiertas + capacidad),
+                usadas + 1 if fija else 0,
+                n + 1 if disponibles is not None else 0,
+            )
+            for costo, cantidad, total, tipos, combinacion in opciones:
+                previas = combinacion[-1][1] if combinacion and combinacion[-1][0] == indice else 0
+                base = combinacion[:-1] if previas else combinacion
+                siguientes[siguiente].append((
+                    costo + precio, cantidad + 1, total + capacidad,
+                    tipos + (0 if previas else 1), base + ((indice, previas + 1),)
+                ))
+            if siguiente not in vistos:
+                heapq.heappush(pendientes, siguiente)
+
+        estados = defaultdict(list)
+        for (cubiertas, usadas, _), opciones in siguientes.items():
+            estados[(cubiertas, usadas)].extend(opciones)
+        estados = {clave: heapq.nsmallest(k, opciones) for clave, opciones in estados.items()}
+    return heapq.nsmallest(k, estados.get((personas, habitaciones if fija else 0), []))
+
+def asignar(personas, precios, disponibilidad=None, habitaciones=None, tipos=None, k=ASIGNACION_ALTERNATIVAS):
+    """
+    Combinaciones de habitaciones que alojan a `personas`
+
+    Args:
+        habitaciones: Cantidad exacta de habitaciones, si el cliente la indicó
+
+    Returns:
+        Lista de hasta k Asignacion, de la más barata a la más cara (a igual
+        costo, menos habitaciones, menos capacidad sobrante y menos tipos
+        distintos primero); vacía si ninguna combinación sirve
+    """
+    productos = catalogo(precios, disponibilidad, tipos)
+    return [
+        Asignacion([(productos[indice][0], n) for indice, n in combinacion], costo, capacidad)
+        for costo, _, capacidad, _, combinacion in _mejores(productos, personas, habitaciones, k)
+    ]
+
+def describir(habitaciones):
+    """[('estandar', 1), ('superior', 2)] -> "1 estandar, 2 superior" (formato de tipo_habitaciones)"""
+    return ", ".join(f"{n} {tipo}" for tipo, n in habitaciones)
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (ValueError, TypeError):
+        return None
+
+def _sumar(*combinaciones):
+    """Une listas de (tipo, cantidad) en el orden del léxico"""
+    total = defaultdict(int)
+    for combinacion in combinaciones:
+        for tipo, n in combinacion:
+            total[tipo] += n
+    return [(tipo, total[tipo]) for tipo in ORDEN_TIPOS if total[tipo]]
+
+def _agregar_a_pedidas(personas, pedidas, precios, disponibilidad):
+    """
+    Las habitaciones más económicas que faltan para alojar a todos junto a
+    las pedidas con cantidad explícita, que se conservan (primero entre los
+    mismos tipos). Lista de Asignacion con la reserva completa.
+    """
+    capacidad = sum(CAPACIDAD_HABITACIONES.get(tipo, 0) * n for tipo, n in pedidas)
+    costo = sum(precios[NOMBRES_TIPO_HABITACION[tipo]] * n for tipo, n in pedidas)
+    if disponibilidad is None:
+        disponibilidad = DISPONIBILIDAD_HABITACIONES
+    restantes = dict(disponibilidad)
+    for tipo, n in pedidas:
+        if restantes.get(tipo) is not None:
+            restantes[tipo] = max(0, restantes[tipo] - n)
+
+    tipos = frozenset(tipo for tipo, _ in pedidas)
+    for restriccion_tipos in (tipos, None):
+        agregadas = asignar(personas - capacidad, precios, restantes, tipos=restriccion_tipos)
+        if agregadas:
+            return [
+                Asignacion(_sumar(pedidas, asignacion.habitaciones), costo + asignacion.costo_noche,
+                           capacidad + asignacion.capacidad)
+                for asignacion in agregadas
+            ], agregadas[0].habitaciones
+    return [], []
+
+def completar_habitaciones(info_reserva, precios=None, disponibilidad=None):
+    """
+    Asigna las habitaciones más económicas si el cliente no indicó el tipo, o
+    si indicó tipos sin cantidades que no alcanzan para todas las personas
+    (se busca entre esos tipos primero). Las cantidades explícitas ("2
+    superior") se conservan; si no alcanzan ("5 personas, 2 estandar") se
+    agregan las habitaciones que faltan y habitaciones_agregadas las describe
+    para avisarle al cliente.
+
+    Completa tipo_habitaciones y cantidad_habitaciones de info_reserva y
+    agrega alternativas_habitaciones: [[descripción, costo por noche], ...]
+
+    Returns:
+        Lista de Asignacion (la primera es la aplicada); vacía si no se
+        modificó la reserva
+    """
+    personas = _entero(info_reserva.get('cant_personas'))
+    if not personas or personas <= 0:
+        return []
+
+    tipos = None
+    explicitas = False
+    tipo_habitaciones = info_reserva.get('tipo_habitaciones')
+    if tipo_habitaciones:
+        pedidas = parsear_tipos_habitaciones(tipo_habitaciones)
+        if sum(CAPACIDAD_HABITACIONES.get(tipo, 0) * n for tipo, n in pedidas) >= personas:
+            return []
+        tipos = frozenset(tipo for tipo, _ in pedidas)
+        explicitas = any(token.tipo == NUMERO for token in tokenizar(tipo_habitaciones))
+
+    precios = precios or obtener_precios_habitaciones()
+    if explicitas:
+        asignaciones, agregadas = _agregar_a_pedidas(personas, pedidas, precios, disponibilidad)
+        if not asignaciones:
+            return []
+        info_reserva['habitaciones_agregadas'] = describir(agregadas)
+    else:
+        habitaciones = _entero(info_reserva.get('cantidad_habitaciones'))
+        # La cantidad de habitaciones puede venir asumida por la extracción
+        # ("1" por defecto): si con ella no caben todos, se busca sin fijarla
+        intentos = [(tipos, habitaciones), (tipos, None), (None, habitaciones), (None, None)]
+        for restriccion_tipos, cantidad in dict.fromkeys(intentos):
+            asignaciones = asignar(personas, precios, disponibilidad, cantidad, restriccion_tipos)
+            if asignaciones:
+                break
+        else:
+            return []
+
+    elegida = asignaciones[0]
+    info_reserva['tipo_habitaciones'] = describir(elegida.habitaciones)
+    info_reserva['cantidad_habitaciones'] = str(sum(n for _, n in elegida.habitaciones))
+    info_reserva['alternativas_habitaciones'] = [
+        [describir(asignacion.habitaciones), asignacion.costo_noche] for asignacion in asignaciones
+    ]
+    return asignaciones
+
+def _fuerza_bruta(personas, productos, habitaciones, k):
+    """Referencia: todas las combinaciones de cantidades por tipo"""
+    tope = habitaciones if habitaciones is not None else personas
+    rangos = [range(min(tope, d if d is not None else tope) + 1) for _, _, _, d in productos]
+    soluciones = []
+    for cantidades in itertools.product(*rangos):
+        total = sum(cantidades)
+        capacidad = sum(n * c for n, (_, c, _, _) in zip(cantidades, productos))
+        if capacidad < personas or total == 0:
+            continue
+        if habitaciones is not None:
+            if total != habitaciones:
+                continue
+        else:
+            # La última habitación (en orden del catálogo) debe hacer falta
+            ultimo = max(i for i, n in enumerate(cantidades) if n)
+            if capacidad - productos[ultimo][1] >= personas:
+                continue
+        costo = sum(n * p for n, (_, _, p, _) in zip(cantidades, productos))
+        soluciones.append((costo, total, capacidad))
+    return sorted(soluciones)[:k]
+
+if __name__ == "__main__":
+    precios = obtener_precios_habitaciones()
+
+    # 1. Los costos de las k mejores coinciden con la fuerza bruta
+    azar = random.Random(3)
+    casos = 0
+    for personas in range(1, 13):
+        for _ in range(20):
+            disponibilidad = {tipo: azar.choice([None, 0, 1, 2, 4]) for tipo in ORDEN_TIPOS}
+            disponibilidad = {tipo: d for tipo, d in disponibilidad.items() if d is not None}
+            precios_azar = {nombre: azar.randint(40, 120) * 1000 for nombre in precios}
+            habitaciones = azar.choice([None, None, 1, 2, 3, 5])
+            productos = catalogo(precios_azar, disponibilidad)
+            esperado = _fuerza_bruta(personas, productos, habitaciones, 5)
+            obtenido = [opcion[:3] for opcion in _mejores(productos, personas, habitaciones, 5)]
+            assert obtenido == esperado, (personas, disponibilidad, habitaciones)
+            casos += 1
+    print(f"Fuerza bruta: {casos} casos OK\n")
+
+    # 2. Ejemplos
+    for personas, tipo, habitaciones in ((1, None, None), (2, None, None), (7, None, None),
+                                         (4, None, "1"), (6, "superior", None), (5, "2 estandar", None),
+                                         (7, "1 doble, 1 single", "2")):
+        reserva = {'cant_personas': str(personas), 'tipo_habitaciones': tipo, 'cantidad_habitaciones': habitaciones}
+        completar_habitaciones(reserva)
+        print(f"  {personas} personas, tipo={tipo!r}, habitaciones={habitaciones!r} -> "
+              f"{reserva['tipo_habitaciones']!r} | agregadas: {reserva.get('habitaciones_agregadas')!r} | "
+              f"alternativas: {reserva.get('alternativas_habitaciones')}")
+    print()
+
+    # 3. Tiempos: sin caché (catálogo nuevo en cada llamada) y con caché
+    for personas in (10, 50, 200, 1000):
+        _mejores.cache_clear()
+        inicio = time.perf_counter()
+        asignar(personas, precios)
+        frio = (time.perf_counter() - inicio) * 1000
+        inicio = time.perf_counter()
+        for _ in range(1000):
+            asignar(personas, precios)
+        caliente = (time.perf_counter() - inicio) * 1000
+        print(f"  {personas:4d} personas: {frio:7.2f} ms sin caché | {caliente:5.1f} µs con caché")
@@ -0,0 +1,129 @@
+"""
+Benchmark de la decodificación del webhook con una mezcla realista de
+eventos de Evolution (mayoría de presencia, acks y estados). Compara el
+camino anterior (json.loads del cuerpo completo + parsear_mensaje + filtros)
+con decodificacion.decodificar(), y mide solicitudes por segundo del
+webhook Flask completo con la mezcla (sin llamadas externas: los mensajes
+autorizados ya figuran como procesados).
+
+Uso:
+    python bench_decodificacion.py [solicitudes]
+"""
+import json
+import random
+import sys
+import time
+import config
+from decodificacion import clasificar, parsear_mensaje
+
+NUMERO = config.NUMERO_AUTORIZADO
+
+# (proporción, tipo de evento) de un día típico
+MEZCLA = [
+    (0.45, "presence.update"),
+    (0.25, "messages.update"),
+    (0.08, "chats.update"),
+    (0.07, "contacts.update"),
+    (0.05, "upsert_propio"),
+    (0.07, "upsert_otro"),
+    (0.03, "upsert_autorizado"),
+]
+
+def _contexto():
+    return {
+        "deviceListMetadata": {
+            "senderKeyHash": "pX0a4JcN3cZb5g==", "senderTimestamp": "1717000000",
+            "recipientKeyHash": "Qm9YxU7bQ2w0Aw==", "recipientTimestamp": "1717000100",
+        },
+        "deviceListMetadataVersion": 2,
+        "messageSecret": "b3U5c2ZkZ2hqa2xxd2VydHl1aW9wYXNkZmdoamtseno=",
+    }
+
+def generar_evento(tipo, i):
+    base = {
+        "instance": "hotel", "destination": "https://bot.example/webhook",
+        "date_time": "2026-10-18T12:00:00.000Z", "server_url": "https://evolution.example",
+        "apikey": "B6D711FCDE4D4FD5936544120E713976",
+    }
+    otro = f"569{i % 90000000:08d}"
+    if tipo == "presence.update":
+        base.update(event=tipo, data={"id": f"{otro}@s.whatsapp.net", "presences": {
+            f"{otro}@s.whatsapp.net": {"lastKnownPresence": random.choice(["composing", "available", "paused"])}}})
+    elif tipo == "messages.update":
+        base.update(event=tipo, data={"keyId": f"3EB0{i:016X}", "remoteJid": f"{otro}@s.whatsapp.net",
+                                      "fromMe": True, "status": random.choice(["DELIVERY_ACK", "READ", "SERVER_ACK"])})
+    elif tipo == "chats.update":
+        base.update(event=tipo, data=[{"remoteJid": f"{otro}@s.whatsapp.net", "unreadMessages": i % 5}])
+    elif tipo == "contacts.update":
+        base.update(event=tipo, data=[{"remoteJid": f"{otro}@s.whatsapp.net", "pushName": "Cliente",
+                                       "profilePicUrl": "https://pps.whatsapp.net/v/t61.24694-24/" + "x" * 120}])
+    else:
+        numero = NUMERO if tipo == "upsert_autorizado" else otro
+        base.update(event="messages.upsert", data={
+            "key": {"remoteJid": f"{numero}@s.whatsapp.net", "fromMe": tipo == "upsert_propio", "id": f"3EB0{i:016X}"},
+            "pushName": "Cliente",
+            "message": {
+                "conversation": "Hola, somos 4 personas, queremos 2 habitaciones estándar del 20 al 23",
+                "messageContextInfo": _contexto(),
+            },
+            "messageType": "conversation",
+            "messageTimestamp": int(time.time()),
+            "instanceId": "0b0e7a58-3c2f-4f4b-9f0e-3a1b2c3d4e5f",
+            "source": "android",
+        })
+    return json.dumps(base).encode()
+
+def generar_mezcla(cantidad, semilla=3):
+    random.seed(semilla)
+    tipos = random.choices([t for _, t in MEZCLA], weights=[p for p, _ in MEZCLA], k=cantidad)
+    return [generar_evento(tipo, i) for i, tipo in enumerate(tipos)]
+
+def decodificar_anterior(cuerpo):
+    """Camino anterior del webhook: parseo completo y luego filtros"""
+    mensaje = parsear_mensaje(json.loads(cuerpo))
+    if mensaje is None or mensaje['from_me']:
+        return None
+    if mensaje['numero'] != NUMERO or not mensaje['texto']:
+        return None
+    return mensaje
+
+def medir(funcion, cuerpos):
+    inicio = time.perf_counter()
+    aceptados = sum(1 for cuerpo in cuerpos if funcion(cuerpo) is not None)
+    return len(cuerpos) / (time.perf_counter() - inicio), aceptados
+
+def medir_webhook(cuerpos):
+    import app as servidor
+    from conversaciones import marcar_procesado
+
+    # Los mensajes autorizados ya figuran como procesados: el webhook llega
+    # hasta debe_procesar_mensaje pero no llama a OpenAI ni a Evolution
+    for cuerpo in cuerpos:
+        mensaje, _ = clasificar(cuerpo)
+        if mensaje:
+            marcar_procesado(mensaje['numero'], mensaje['message_id'])
+    servidor.limpiar_cache = lambda: None
+
+    cliente = servidor.app.test_client()
+    url = f"/webhook?token={config.WEBHOOK_TOKEN}"
+    inicio = time.perf_counter()
+    for cuerpo in cuerpos:
+        cliente.post(url, data=cuerpo, content_type="application/json")
+    return len(cuerpos) / (time.perf_counter() - inicio)
+
+if __name__ == "__main__":
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    cuerpos = generar_mezcla(cantidad)
+
+    por_segundo_antes, aceptados_antes = medir(decodificar_anterior, cuerpos)
+    por_segundo, aceptados = medir(lambda cuerpo: clasificar(cuerpo)[0], cuerpos)
+    assert aceptados == aceptados_antes, "Los filtros no aceptan los mismos mensajes"
+
+    print(f"Eventos: {cantidad} | aceptados: {aceptados} | "
+          f"bytes promedio: {sum(map(len, cuerpos)) // cantidad}")
+    print(f"{'decodificación anterior':<28} {por_segundo_antes:>12,.0f} eventos/s")
+    print(f"{'decodificación rápida':<28} {por_segundo:>12,.0f} eventos/s  "
+          f"(x{por_segundo / por_segundo_antes:.1f})")
+
+    muestra = cuerpos[:min(cantidad, 5000)]
+    print(f"{'webhook Flask completo':<28} {medir_webhook(muestra):>12,.0f} solicitudes/s")
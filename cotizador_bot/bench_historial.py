@@ -0,0 +1,89 @@
+"""
+Benchmark del historial de cotizaciones: escritura de a una cotización
+(como en producción), escritura por lotes de un historial sintético y
+análisis vectorizado sobre las columnas mapeadas en memoria.
+
+Uso:
+    python bench_historial.py [cotizaciones] [directorio]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+from historial import Historial, COLUMNAS, cargar, analizar, reporte, fila_cotizacion
+from lexico import ORDEN_TIPOS
+from precios import calcular_totales, obtener_precios_habitaciones
+
+LOTE = 500_000
+
+def lote_sintetico(azar, cantidad, desde, hasta):
+    """Columnas de `cantidad` cotizaciones hechas entre desde y hasta (epoch)"""
+    ts = np.sort(azar.uniform(desde, hasta, cantidad))
+    anticipacion = azar.gamma(2.0, 12.0, cantidad).astype(np.int64)
+    check_in = (ts // 86400).astype(np.int64) + anticipacion
+    noches = np.clip(azar.geometric(0.35, cantidad), 1, 30)
+    personas = np.clip(azar.geometric(0.3, cantidad) + 1, 1, 50)
+    por_tipo = {tipo: np.zeros(cantidad, dtype=np.int64) for tipo in ORDEN_TIPOS}
+    capacidad = {'single': 1, 'estandar': 2, 'superior': 3, 'doble': 2}
+    tipo = azar.choice(len(ORDEN_TIPOS), cantidad, p=[0.1, 0.5, 0.3, 0.1])
+    for i, nombre in enumerate(ORDEN_TIPOS):
+        elegidos = tipo == i
+        por_tipo[nombre][elegidos] = -(-personas[elegidos] // capacidad[nombre])
+    habitaciones = sum(por_tipo.values())
+    subtotal = habitaciones * noches * 80000
+    descuentos = np.where(azar.random(cantidad) < 0.2, subtotal // 10, 0)
+    neto = subtotal - descuentos
+    return [
+        ts, check_in, noches, personas, habitaciones,
+        *(por_tipo[nombre] for nombre in ORDEN_TIPOS),
+        subtotal, descuentos, neto, np.round(neto * 1.19).astype(np.int64),
+        (azar.random(cantidad) < 0.97).astype(np.uint8),
+    ]
+
+if __name__ == "__main__":
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    directorio = sys.argv[2] if len(sys.argv) > 2 else tempfile.mkdtemp(prefix="historial_")
+    temporal = len(sys.argv) <= 2
+
+    try:
+        # 1. Escritura de a una cotización
+        info_reserva = {"check_in": "2026-12-20", "check_out": "2026-12-23", "cant_personas": "4",
+                        "tipo_habitaciones": "1 estandar, 1 superior"}
+        totales = calcular_totales(info_reserva["tipo_habitaciones"], 3, obtener_precios_habitaciones())
+        escritor = Historial(os.path.join(directorio, "unitario"))
+        inicio = time.perf_counter()
+        for _ in range(10_000):
+            escritor.registrar(info_reserva, 3, totales, pdf=True)
+        print(f"Registrar una cotización: {(time.perf_counter() - inicio) / 10_000 * 1e6:.0f} µs")
+        assert len(cargar(escritor.directorio)["ts"]) == 10_000
+        assert tuple(v[0] for v in cargar(escritor.directorio).values())[1:] == \
+            fila_cotizacion(info_reserva, 3, totales, True)[1:]
+
+        # 2. Historial sintético por lotes
+        escritor = Historial(os.path.join(directorio, "sintetico"))
+        azar = np.random.default_rng(7)
+        desde = time.mktime(time.strptime("2025-01-01", "%Y-%m-%d"))
+        anio = 365 * 86400
+        inicio = time.perf_counter()
+        for i in range(0, cantidad, LOTE):
+            n = min(LOTE, cantidad - i)
+            escritor.agregar(lote_sintetico(azar, n, desde + anio * i / cantidad, desde + anio * (i + n) / cantidad))
+        bytes_fila = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNAS)
+        print(f"Escritura de {cantidad:,} cotizaciones: {time.perf_counter() - inicio:.2f} s "
+              f"({cantidad * bytes_fila / 2**20:.0f} MB, {bytes_fila} bytes por cotización)")
+
+        # 3. Análisis
+        for periodo in ("dia", "semana", "mes"):
+            inicio = time.perf_counter()
+            analizar(cargar(escritor.directorio), periodo)
+            print(f"Análisis por {periodo}: {time.perf_counter() - inicio:.2f} s")
+        inicio = time.perf_counter()
+        analizar(cargar(escritor.directorio), "mes", desde="2025-06-01", hasta="2025-08-31")
+        print(f"Análisis de un trimestre: {time.perf_counter() - inicio:.2f} s\n")
+
+        reporte(escritor.directorio, "mes", limite=6)
+    finally:
+        if temporal:
+            shutil.rmtree(directorio)
@@ -0,0 +1,190 @@
+"""
+Benchmark del costo de parseo por mensaje: léxico compartido (lexico.py)
+contra las cadenas de .replace() y re.search sin compilar que se usaban
+antes en precios.py y extractor.py.
+
+Uso:
+    python bench_lexico.py [repeticiones]
+"""
+import contextlib
+import io
+import logging
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from extractor import extraccion_fallback
+from lexico import normalizar_texto
+from precios import parsear_tipos_habitaciones, normalizar_tipo_habitacion
+
+MENSAJES = [
+    "Hola, somos 4 personas, queremos 2 habitaciones estándar del 20 al 23",
+    "para 3 mañana una doble",
+    "hoy 2 personas",
+    "quiero 1 cuarto superior para 2 del 5 al 7",
+    "necesito 3 piezas sencillas y 1 doble para 8 personas",
+    "hola, tienen disponibilidad?",
+]
+
+TIPOS = [
+    "2 estandar, 1 superior",
+    "estandar y doble",
+    "una superior",
+    "3 dobles",
+    "single",
+]
+
+# Solo para verificar que el resultado no cambió: "2 camas" nombra una doble
+# pero no es una habitación más
+TIPOS_EQUIVALENCIA = TIPOS + [
+    "2 camas",
+    "2 dobles, 2 camas",
+    "1 doble y 2 camas",
+    "2 camas y 1 superior",
+    "estandar 2 camas",
+    "matrimonial",
+]
+
+# --- Implementación anterior, como referencia ---
+
+def _normalizar_legacy(texto):
+    return (texto.lower()
+        .replace('á', 'a')
+        .replace('é', 'e')
+        .replace('í', 'i')
+        .replace('ó', 'o')
+        .replace('ú', 'u'))
+
+def _normalizar_tipo_legacy(tipo_str):
+    tipo_lower = _normalizar_legacy(tipo_str.strip())
+    if 'single' in tipo_lower or 'sencilla' in tipo_lower or 'individual' in tipo_lower:
+        return 'Habitación Single'
+    elif 'estandar' in tipo_lower or 'standard' in tipo_lower:
+        return 'Habitación Estándar'
+    elif 'superior' in tipo_lower or 'premium' in tipo_lower:
+        return 'Habitación Superior'
+    elif 'doble' in tipo_lower or 'matrimonial' in tipo_lower or '2 camas' in tipo_lower:
+        return 'Habitación Doble 2 Camas'
+    return 'Habitación Estándar'
+
+def _parsear_tipos_legacy(tipo_habitaciones_str):
+    habitaciones = []
+    palabras_a_numeros = {'un': 1, 'una': 1, 'dos': 2, 'tres': 3, 'cuatro': 4,
+                          'cinco': 5, 'seis': 6, 'siete': 7, 'ocho': 8,
+                          'nueve': 9, 'diez': 10}
+    for parte in re.split(r'[,;]|\s+y\s+|\s+e\s+', _normalizar_legacy(tipo_habitaciones_str.strip())):
+        parte = parte.strip()
+        if not parte:
+            continue
+        match_numero = re.search(r'^(\d+)\s*(single|estandar|standard|superior|doble|sencilla|individual|matrimonial)', parte)
+        match_palabra = re.search(r'^(un|una|dos|tres|cuatro|cinco|seis|siete|ocho|nueve|diez)\s*(single|estandar|standard|superior|doble|sencilla|individual|matrimonial)', parte)
+        if match_numero:
+            habitaciones.append((match_numero.group(2), int(match_numero.group(1))))
+        elif match_palabra:
+            habitaciones.append((match_palabra.group(2), palabras_a_numeros.get(match_palabra.group(1), 1)))
+        elif 'single' in parte or 'sencilla' in parte or 'individual' in parte:
+            habitaciones.append(('single', 1))
+        elif 'estandar' in parte or 'standard' in parte:
+            habitaciones.append(('estandar', 1))
+        elif 'superior' in parte or 'premium' in parte:
+            habitaciones.append(('superior', 1))
+        elif 'doble' in parte or 'matrimonial' in parte:
+            habitaciones.append(('doble', 1))
+    return habitaciones or [('estandar', 1)]
+
+def _fallback_legacy(mensaje):
+    mensaje_lower = _normalizar_legacy(mensaje)
+    resultado = {"check_in": None, "check_out": None, "cant_personas": None,
+                 "cantidad_habitaciones": None, "tipo_habitaciones": None}
+    for pattern in [r'(\d+)\s*persona', r'para\s+(\d+)', r'somos\s+(\d+)']:
+        match = re.search(pattern, mensaje_lower)
+        if match:
+            resultado['cant_personas'] = match.group(1)
+            break
+    for pattern in [r'(\d+)\s*habitaci', r'(\d+)\s*cuarto', r'(\d+)\s*pieza']:
+        match = re.search(pattern, mensaje_lower)
+        if match:
+            resultado['cantidad_habitaciones'] = match.group(1)
+            break
+    if resultado['cant_personas'] and not resultado['cantidad_habitaciones']:
+        resultado['cantidad_habitaciones'] = '1'
+    tipos = []
+    if 'single' in mensaje_lower or 'sencilla' in mensaje_lower:
+        tipos.append('single')
+    if 'estandar' in mensaje_lower or 'standard' in mensaje_lower:
+        tipos.append('estandar')
+    if 'superior' in mensaje_lower:
+        tipos.append('superior')
+    if 'doble' in mensaje_lower:
+        tipos.append('doble')
+    if tipos:
+        resultado['tipo_habitaciones'] = ', '.join(tipos)
+    fecha_actual = datetime.now()
+    if 'manana' in mensaje_lower or 'mañana' in mensaje_lower:
+        resultado['check_in'] = (fecha_actual + timedelta(days=1)).strftime('%Y-%m-%d')
+        resultado['check_out'] = (fecha_actual + timedelta(days=2)).strftime('%Y-%m-%d')
+    elif 'hoy' in mensaje_lower:
+        resultado['check_in'] = fecha_actual.strftime('%Y-%m-%d')
+        resultado['check_out'] = (fecha_actual + timedelta(days=1)).strftime('%Y-%m-%d')
+    match = re.search(r'del\s+(\d+)\s+al\s+(\d+)', mensaje_lower)
+    if match:
+        resultado['check_in'] = f"{fecha_actual.year}-{fecha_actual.month:02d}-{int(match.group(1)):02d}"
+        resultado['check_out'] = f"{fecha_actual.year}-{fecha_actual.month:02d}-{int(match.group(2)):02d}"
+    print(f"⚠️ Usando extracción fallback: {resultado}")
+    return resultado
+
+def _por_mensaje_legacy(tipo_habitaciones):
+    _normalizar_legacy(tipo_habitaciones)  # validar_datos
+    for tipo, _ in _parsear_tipos_legacy(tipo_habitaciones):
+        _normalizar_tipo_legacy(tipo)
+
+def _por_mensaje(tipo_habitaciones):
+    normalizar_texto(tipo_habitaciones)  # validar_datos
+    for tipo, _ in parsear_tipos_habitaciones(tipo_habitaciones):
+        normalizar_tipo_habitacion(tipo)
+
+# --- Medición ---
+
+def medir(funcion, entradas, repeticiones):
+    """Retorna microsegundos por llamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for entrada in entradas:
+            funcion(entrada)
+    total = time.perf_counter() - inicio
+    return total / (repeticiones * len(entradas)) * 1e6
+
+def reportar(titulo, antes, despues):
+    print(titulo)
+    print(f"  {'anterior':<12} {antes:8.2f} µs/llamada")
+    print(f"  {'lexico.py':<12} {despues:8.2f} µs/llamada")
+    print(f"  {'speedup':<12} {antes / despues:8.2f}x\n")
+
+if __name__ == "__main__":
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    for tipo in TIPOS_EQUIVALENCIA:
+        assert parsear_tipos_habitaciones(tipo) == _parsear_tipos_legacy(tipo), tipo
+        assert normalizar_tipo_habitacion(tipo) == _normalizar_tipo_legacy(tipo), tipo
+    assert parsear_tipos_habitaciones("2 dobles, 2 camas") == [("doble", 2)]
+    print(f"Mismo resultado que la implementación anterior: {len(TIPOS_EQUIVALENCIA)} tipos\n")
+
+    reportar("normalizar_tipo_habitacion",
+             medir(_normalizar_tipo_legacy, TIPOS, repeticiones),
+             medir(normalizar_tipo_habitacion, TIPOS, repeticiones))
+    reportar("parsear_tipos_habitaciones",
+             medir(_parsear_tipos_legacy, TIPOS, repeticiones),
+             medir(parsear_tipos_habitaciones, TIPOS, repeticiones))
+
+    reportar("por mensaje (validar_datos + calcular_totales)",
+             medir(_por_mensaje_legacy, TIPOS, repeticiones),
+             medir(_por_mensaje, TIPOS, repeticiones))
+
+    # Ambas versiones informan su resultado (print y log.info); se descartan
+    # para no medir la consola
+    logging.disable(logging.INFO)
+    with contextlib.redirect_stdout(io.StringIO()):
+        antes = medir(_fallback_legacy, MENSAJES, repeticiones)
+        despues = medir(extraccion_fallback, MENSAJES, repeticiones)
+    logging.disable(logging.NOTSET)
+    reportar("extraccion_fallback", antes, despues)
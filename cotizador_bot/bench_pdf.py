@@ -0,0 +1,59 @@
+"""
+Benchmark de la cotización en PDF: tamaño y tiempo de render del modo
+compacto contra la salida anterior (logo a su resolución original).
+
+Si no existe el logo configurado se genera uno sintético de 1200x1200 px,
+similar a un logo exportado sin reescalar.
+
+Uso:
+    python bench_pdf.py [repeticiones]
+"""
+import os
+import sys
+import tempfile
+import time
+from PIL import Image as PILImage, ImageDraw
+import pdf_generator
+from precios import calcular_totales, obtener_precios_habitaciones
+
+INFO_RESERVA = {
+    "check_in": "2026-12-20",
+    "check_out": "2026-12-23",
+    "cant_personas": "4",
+    "cantidad_habitaciones": "2",
+    "tipo_habitaciones": "1 estandar, 1 superior",
+}
+
+def crear_logo_sintetico(ruta):
+    imagen = PILImage.new('RGBA', (1200, 1200), (255, 255, 255, 0))
+    dibujo = ImageDraw.Draw(imagen)
+    for i in range(0, 600, 20):
+        dibujo.ellipse((i, i, 1200 - i, 1200 - i), outline=(i % 255, 40, 200 - i % 200, 255), width=8)
+    imagen.save(ruta)
+
+def medir(compacto, totales, repeticiones):
+    # Primera llamada fuera de la medición: carga de fuentes y del logo compacto
+    pdf = pdf_generator.renderizar_cotizacion_pdf(INFO_RESERVA, totales, 3, compacto)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        pdf_generator.renderizar_cotizacion_pdf(INFO_RESERVA, totales, 3, compacto)
+    ms = (time.perf_counter() - inicio) / repeticiones * 1000
+    return len(pdf), ms
+
+if __name__ == "__main__":
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    if not os.path.exists(pdf_generator.LOGO_PATH):
+        pdf_generator.LOGO_PATH = os.path.join(tempfile.mkdtemp(), "logo.png")
+        crear_logo_sintetico(pdf_generator.LOGO_PATH)
+        print(f"Logo sintético: {pdf_generator.LOGO_PATH}")
+
+    totales = calcular_totales(INFO_RESERVA["tipo_habitaciones"], 3, obtener_precios_habitaciones())
+
+    bytes_antes, ms_antes = medir(False, totales, repeticiones)
+    bytes_despues, ms_despues = medir(True, totales, repeticiones)
+
+    print(f"{'modo':<10} {'bytes':>10} {'base64':>10} {'ms/PDF':>8}")
+    print(f"{'anterior':<10} {bytes_antes:>10} {bytes_antes * 4 // 3:>10} {ms_antes:>8.1f}")
+    print(f"{'compacto':<10} {bytes_despues:>10} {bytes_despues * 4 // 3:>10} {ms_despues:>8.1f}")
+    print(f"Reducción de tamaño: {100 * (1 - bytes_despues / bytes_antes):.1f}%")
@@ -0,0 +1,93 @@
+"""
+Benchmark de las cotizaciones largas (grupos y eventos): detalle paginado
+con las líneas tomadas de un generador, contra una sola tabla con todas las
+líneas en memoria que ReportLab divide entre páginas.
+
+Mide tiempo de render y pico de memoria (tracemalloc, sin contar el PDF
+resultante) para distintas cantidades de líneas (habitaciones x noches).
+En el modo paginado la memoria solo crece con el contenido de las páginas
+ya dibujadas, que ReportLab conserva sin comprimir hasta guardar el
+documento (unos 13 KB por página); las tablas y líneas no se acumulan.
+
+Uso:
+    python bench_pdf_largo.py [líneas máximas de la tabla única]
+"""
+import io
+import sys
+import time
+import tracemalloc
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+import pdf_generator
+from precios import calcular_totales, obtener_precios_habitaciones, formatear_precio
+
+NOCHES = 10
+LINEAS = (100, 500, 1000, 2000, 5000)
+
+def reserva(lineas):
+    por_tipo = lineas // NOCHES // 2
+    info_reserva = {
+        "check_in": "2026-12-20",
+        "check_out": "2026-12-30",
+        "cant_personas": str(por_tipo * 4),
+        "cantidad_habitaciones": str(por_tipo * 2),
+        "tipo_habitaciones": f"{por_tipo} estandar, {por_tipo} superior",
+    }
+    totales = calcular_totales(info_reserva["tipo_habitaciones"], NOCHES, obtener_precios_habitaciones())
+    return info_reserva, totales
+
+def paginado(info_reserva, totales):
+    return pdf_generator.renderizar_cotizacion_pdf(info_reserva, totales, NOCHES)
+
+def tabla_unica(info_reserva, totales):
+    """Todas las líneas en una Table con el encabezado repetido por ReportLab"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=50, leftMargin=50,
+                            topMargin=40, bottomMargin=30, pageCompression=1)
+    estilos = pdf_generator._estilos()
+    elementos = pdf_generator._encabezado(info_reserva, NOCHES, True, estilos)
+    filas = [pdf_generator.ENCABEZADO_DETALLE]
+    for fecha, descripcion, cantidad, unitario in pdf_generator.lineas_detalle(
+            info_reserva["check_in"], NOCHES, totales["habitaciones"]):
+        filas.append([fecha, descripcion, str(cantidad), formatear_precio(unitario),
+                      formatear_precio(cantidad * unitario)])
+    tabla = Table(filas, colWidths=pdf_generator.ANCHOS_DETALLE, repeatRows=1)
+    tabla.setStyle(TableStyle([
+        ('FONTSIZE', (0,0), (-1,-1), 8),
+        ('BACKGROUND', (0,0), (-1,0), colors.black),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+        ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+    ]))
+    elementos.append(tabla)
+    elementos += pdf_generator._resumen(totales, estilos)
+    doc.build(elementos)
+    return buffer.getvalue()
+
+def medir(renderizar, lineas):
+    info_reserva, totales = reserva(lineas)
+    inicio = time.perf_counter()
+    pdf = renderizar(info_reserva, totales)
+    ms = (time.perf_counter() - inicio) * 1000
+
+    tracemalloc.start()
+    pdf = renderizar(info_reserva, totales)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ms, (pico - len(pdf)) / 1024, len(pdf) / 1024, pdf.count(b"/Type /Page\n")
+
+if __name__ == "__main__":
+    maximo_tabla_unica = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    # Carga de fuentes y del logo fuera de la medición
+    paginado(*reserva(100))
+
+    print(f"{'modo':<12} {'líneas':>6} {'páginas':>7} {'ms':>8} {'µs/línea':>8} "
+          f"{'memoria KB':>10} {'KB/página':>9} {'PDF KB':>7}")
+    for lineas in LINEAS:
+        for modo, renderizar in (("paginado", paginado), ("tabla única", tabla_unica)):
+            if renderizar is tabla_unica and lineas > maximo_tabla_unica:
+                continue
+            ms, memoria, tamano, paginas = medir(renderizar, lineas)
+            print(f"{modo:<12} {lineas:>6} {paginas:>7} {ms:>8.0f} {ms * 1000 / lineas:>8.0f} "
+                  f"{memoria:>10.0f} {memoria / paginas:>9.1f} {tamano:>7.0f}")
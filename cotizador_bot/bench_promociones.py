@@ -0,0 +1,134 @@
+"""
+Benchmark del motor de promociones con miles de reglas sintéticas: tiempo
+de compilación, evaluación por cotización (tabla compilada contra recorrer
+las reglas en Python) y evaluación vectorizada por lotes. Verifica además
+que los tres caminos entreguen el mismo descuento.
+
+Uso:
+    python bench_promociones.py [reglas] [cotizaciones]
+"""
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from config import DESCUENTO_MAXIMO
+from lexico import ORDEN_TIPOS
+from promociones import (
+    compilar_reglas, caracteristicas, evaluar, evaluar_lote, DIAS_SEMANA
+)
+
+HOY = date(2026, 10, 1)
+
+def generar_reglas(cantidad, semilla=7):
+    azar = random.Random(semilla)
+    reglas = []
+    for i in range(cantidad):
+        condiciones = {}
+        if azar.random() < 0.5:
+            minimo = azar.randint(1, 10)
+            condiciones['noches_min'] = minimo
+            if azar.random() < 0.5:
+                condiciones['noches_max'] = minimo + azar.randint(0, 7)
+        if azar.random() < 0.3:
+            condiciones['habitaciones_min'] = azar.randint(1, 5)
+        if azar.random() < 0.3:
+            condiciones['dias_semana'] = azar.sample(DIAS_SEMANA, azar.randint(1, 6))
+        if azar.random() < 0.3:
+            condiciones['anticipacion_min'] = azar.randint(0, 60)
+        if azar.random() < 0.2:
+            desde = HOY + timedelta(days=azar.randint(0, 200))
+            condiciones['check_in_desde'] = desde.strftime('%Y-%m-%d')
+            condiciones['check_in_hasta'] = (desde + timedelta(days=azar.randint(1, 60))).strftime('%Y-%m-%d')
+        if azar.random() < 0.1:
+            condiciones['codigo'] = f"PROMO{azar.randint(0, 50)}"
+        regla = {
+            "nombre": f"Regla {i}",
+            "grupo": f"g{azar.randint(0, 40)}",
+            "porcentaje": azar.choice([1, 2, 3, 5, 8, 10]),
+            "condiciones": condiciones,
+        }
+        if azar.random() < 0.2:
+            regla['aplica_a'] = azar.sample(ORDEN_TIPOS, azar.randint(1, 2))
+        reglas.append(regla)
+    return reglas
+
+def generar_cotizaciones(tabla, cantidad, semilla=11):
+    azar = random.Random(semilla)
+    filas = []
+    for _ in range(cantidad):
+        habitaciones = [
+            (tipo, n, n * 79980 * 3)
+            for tipo in azar.sample(ORDEN_TIPOS, azar.randint(1, 3))
+            for n in [azar.randint(1, 3)]
+        ]
+        check_in = (HOY + timedelta(days=azar.randint(0, 240))).strftime('%Y-%m-%d')
+        codigo = f"PROMO{azar.randint(0, 80)}" if azar.random() < 0.3 else None
+        filas.append(caracteristicas(
+            tabla, habitaciones, azar.randint(1, 14), check_in, codigo, HOY
+        ))
+    return filas
+
+def ordinales(reglas):
+    """Fechas de vigencia ya convertidas, para no medir strptime en la referencia"""
+    for regla in reglas:
+        c = regla['condiciones']
+        if 'check_in_desde' in c:
+            regla['_desde'] = datetime.strptime(c['check_in_desde'], '%Y-%m-%d').toordinal()
+            regla['_hasta'] = datetime.strptime(c['check_in_hasta'], '%Y-%m-%d').toordinal()
+    return reglas
+
+def evaluar_ingenuo(reglas, fila, codigos):
+    """Referencia: recorre las reglas en Python sin compilar"""
+    noches, habitaciones, dia, anticipacion, ordinal, tiene_fecha, codigo, subtotales = fila
+    mejores = {}
+    for regla in reglas:
+        c = regla['condiciones']
+        if not (c.get('noches_min', 0) <= noches <= c.get('noches_max', noches)):
+            continue
+        if habitaciones < c.get('habitaciones_min', 0):
+            continue
+        if 'codigo' in c and codigos.get(c['codigo']) != codigo:
+            continue
+        if {'dias_semana', 'anticipacion_min', 'check_in_desde'} & set(c):
+            if not tiene_fecha:
+                continue
+            if 'dias_semana' in c and DIAS_SEMANA[dia] not in c['dias_semana']:
+                continue
+            if anticipacion < c.get('anticipacion_min', anticipacion):
+                continue
+            if '_desde' in regla and not regla['_desde'] <= ordinal <= regla['_hasta']:
+                continue
+        tipos = regla.get('aplica_a') or ORDEN_TIPOS
+        base = sum(subtotales[ORDEN_TIPOS.index(tipo)] for tipo in tipos)
+        monto = int(base * regla['porcentaje'] / 100)
+        mejores[regla['grupo']] = max(mejores.get(regla['grupo'], 0), monto)
+    return min(sum(mejores.values()), int(sum(subtotales) * DESCUENTO_MAXIMO / 100))
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000, resultado
+
+if __name__ == "__main__":
+    cantidad_reglas = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    cantidad_cotizaciones = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    reglas = generar_reglas(cantidad_reglas)
+    ms_compilar, tabla = medir(lambda: compilar_reglas(reglas), 3)
+    filas = generar_cotizaciones(tabla, cantidad_cotizaciones)
+    muestra = filas[:200]
+    ordinales(reglas)
+
+    ms_ingenuo, ingenuos = medir(lambda: [evaluar_ingenuo(reglas, f, tabla.codigos) for f in muestra], 1)
+    ms_tabla, por_cotizacion = medir(lambda: [sum(d['monto'] for d in evaluar(tabla, f)) for f in muestra], 3)
+    ms_lote, lote = medir(lambda: evaluar_lote(tabla, filas), 3)
+
+    assert ingenuos == por_cotizacion == lote[:len(muestra)].tolist(), "Los descuentos no coinciden"
+
+    print(f"Reglas: {cantidad_reglas} ({len(tabla.grupos)} grupos) | cotizaciones: {cantidad_cotizaciones}")
+    print(f"Compilación:                 {ms_compilar:8.1f} ms")
+    print(f"Reglas en Python:            {ms_ingenuo / len(muestra) * 1000:8.1f} µs/cotización")
+    print(f"Tabla compilada:             {ms_tabla / len(muestra) * 1000:8.1f} µs/cotización")
+    print(f"Tabla compilada, por lotes:  {ms_lote / len(filas) * 1000:8.1f} µs/cotización")
+    print(f"Con descuento: {sum(1 for d in lote if d)} de {len(filas)}")
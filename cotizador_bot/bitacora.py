@@ -0,0 +1,273 @@
+"""
+Bitácora de las llamadas al LLM en una base SQLite local, activa con
+COTIZADOR_BITACORA_LLM=<base>.
+
+Cada extracción registra tokens del prompt y de la respuesta, latencia,
+estado HTTP, motivo de término, si se usó la extracción fallback y un hash
+del prompt completo (prompts idénticos repetidos son candidatos a caché).
+Las cotizaciones generadas también se anotan para calcular los tokens por
+cotización.
+
+La solicitud solo encola la respuesta ya recibida; un hilo escritor lee el
+bloque `usage`, arma la fila y la inserta en lotes de hasta BITACORA_LOTE
+filas por transacción (o lo que se junte en BITACORA_INTERVALO segundos).
+
+Reporte:
+    python bitacora.py [base] [--periodo hora|dia] [--desde YYYY-MM-DD]
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from config import BITACORA_LLM, BITACORA_LOTE, BITACORA_INTERVALO, BITACORA_MAX_COLA
+from registro import obtener_logger, solicitud_actual
+from estadisticas import percentil
+
+log = obtener_logger("bitacora")
+
+ESTADO_OK = "ok"
+ESTADO_JSON_INVALIDO = "json_invalido"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS llamadas (
+    ts REAL NOT NULL,
+    message_id TEXT,
+    numero_hash TEXT,
+    modelo TEXT,
+    tipo TEXT,
+    prompt_hash TEXT,
+    prompt_chars INTEGER,
+    max_tokens INTEGER,
+    tokens_prompt INTEGER,
+    tokens_respuesta INTEGER,
+    latencia_ms REAL,
+    http INTEGER,
+    fin TEXT,
+    estado TEXT,
+    fallback INTEGER
+);
+CREATE INDEX IF NOT EXISTS llamadas_ts ON llamadas (ts);
+CREATE TABLE IF NOT EXISTS cotizaciones (
+    ts REAL NOT NULL,
+    message_id TEXT,
+    numero_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS cotizaciones_ts ON cotizaciones (ts);
+"""
+
+INSERTAR = {
+    "llamadas": "INSERT INTO llamadas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "cotizaciones": "INSERT INTO cotizaciones VALUES (?, ?, ?)",
+}
+
+def conectar(ruta):
+    conexion = sqlite3.connect(ruta)
+    # WAL: el reporte puede leer mientras la aplicación escribe
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.executescript(ESQUEMA)
+    return conexion
+
+def hash_prompt(solicitud):
+    """Hash estable de los mensajes enviados al modelo"""
+    contenido = json.dumps(solicitud.get('messages'), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(contenido.encode()).hexdigest()[:16]
+
+def _estado(response, error):
+    if error is not None:
+        if isinstance(error, json.JSONDecodeError):
+            return ESTADO_JSON_INVALIDO
+        return f"excepcion:{type(error).__name__}"
+    if response.status_code != 200:
+        return f"http_{response.status_code}"
+    return ESTADO_OK
+
+def fila_llamada(evento):
+    """Arma la fila de la tabla llamadas a partir de lo encolado"""
+    ts, message_id, numero_hash, tipo, solicitud, latencia_ms, response, error = evento
+    usage, fin = {}, None
+    if response is not None and response.status_code == 200:
+        try:
+            data = response.json()
+            usage = data.get('usage') or {}
+            fin = data['choices'][0].get('finish_reason')
+        except (ValueError, KeyError, IndexError, AttributeError):
+            pass
+    estado = _estado(response, error)
+    prompt = "".join(m.get('content', '') for m in solicitud.get('messages', []))
+    return (
+        ts, message_id, numero_hash, solicitud.get('model'), tipo,
+        hash_prompt(solicitud), len(prompt), solicitud.get('max_tokens'),
+        usage.get('prompt_tokens'), usage.get('completion_tokens'), latencia_ms,
+        response.status_code if response is not None else None,
+        fin, estado, int(estado != ESTADO_OK),
+    )
+
+class Bitacora:
+    """Escritor en segundo plano de la bitácora"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.cola = queue.Queue(maxsize=BITACORA_MAX_COLA)
+        self.hilo = None
+        self.lock = threading.Lock()
+        self.descartados = 0
+
+    def _encolar(self, tabla, evento):
+        if self.hilo is None:
+            self._iniciar()
+        try:
+            self.cola.put_nowait((tabla, evento))
+        except queue.Full:
+            with self.lock:
+                self.descartados += 1
+
+    def registrar_llamada(self, tipo, solicitud, latencia_ms, response=None, error=None):
+        """
+        Anota una llamada al LLM; no bloquea ni parsea nada en la solicitud
+
+        Args:
+            tipo: "completa" o "faltantes" (prompt reducido)
+            solicitud: Cuerpo enviado a OpenAI
+            latencia_ms: Duración de la llamada
+            response: Respuesta HTTP (requests o httpx) o None si no llegó
+            error: Excepción que llevó a la extracción fallback, si hubo
+        """
+        self._encolar("llamadas", (
+            time.time(), *solicitud_actual(), tipo, solicitud, latencia_ms, response, error
+        ))
+
+    def registrar_cotizacion(self):
+        """Anota una cotización generada (PDF enviado al cliente)"""
+        self._encolar("cotizaciones", (time.time(), *solicitud_actual()))
+
+    def estadisticas(self):
+        with self.lock:
+            descartados = self.descartados
+        return {"activa": True, "pendientes": self.cola.qsize(), "descartados_cola_llena": descartados}
+
+    def _iniciar(self):
+        with self.lock:
+            if self.hilo is not None:
+                return
+            self.hilo = threading.Thread(target=self._escribir, name="bitacora", daemon=True)
+            self.hilo.start()
+            atexit.register(self._detener)
+
+    def _lote(self):
+        """Espera el primer evento y junta los que lleguen hasta llenar el lote"""
+        lote = [self.cola.get()]
+        limite = time.monotonic() + BITACORA_INTERVALO
+        while len(lote) < BITACORA_LOTE and lote[-1][0] is not None:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self.cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self):
+        conexion = conectar(self.ruta)
+        while True:
+            lote = self._lote()
+            filas = defaultdict(list)
+            for tabla, evento in lote:
+                if tabla is None:
+                    continue
+                try:
+                    filas[tabla].append(fila_llamada(evento) if tabla == "llamadas" else evento)
+                except Exception:
+                    log.exception("Evento no registrable")
+            try:
+                with conexion:
+                    for tabla, valores in filas.items():
+                        conexion.executemany(INSERTAR[tabla], valores)
+            except sqlite3.Error:
+                log.exception("Error escribiendo la bitácora", extra={"datos": {"filas": len(lote)}})
+            if lote[-1][0] is None:
+                conexion.close()
+                return
+
+    def _detener(self):
+        self.cola.put((None, None))
+        self.hilo.join(timeout=5)
+
+class _BitacoraNula:
+    def registrar_llamada(self, tipo, solicitud, latencia_ms, response=None, error=None):
+        pass
+
+    def registrar_cotizacion(self):
+        pass
+
+    def estadisticas(self):
+        return {"activa": False}
+
+bitacora = Bitacora(BITACORA_LLM) if BITACORA_LLM else _BitacoraNula()
+
+FORMATOS_PERIODO = {"hora": "%Y-%m-%d %H:00", "dia": "%Y-%m-%d"}
+
+def reporte(ruta, periodo="dia", desde=None):
+    """Imprime latencia, tokens y fallback por período y por tipo de prompt"""
+    conexion = conectar(ruta)
+    formato = FORMATOS_PERIODO[periodo]
+    inicio = time.mktime(time.strptime(desde, "%Y-%m-%d")) if desde else 0
+
+    por_periodo = defaultdict(list)
+    por_tipo = defaultdict(list)
+    for fila in conexion.execute(
+        "SELECT strftime(?, ts, 'unixepoch', 'localtime'), tipo, prompt_hash, max_tokens,"
+        " tokens_prompt, tokens_respuesta, latencia_ms, fin, fallback"
+        " FROM llamadas WHERE ts >= ? ORDER BY ts", (formato, inicio)
+    ):
+        por_periodo[fila[0]].append(fila)
+        por_tipo[fila[1]].append(fila)
+    cotizaciones = dict(conexion.execute(
+        "SELECT strftime(?, ts, 'unixepoch', 'localtime'), COUNT(*) FROM cotizaciones"
+        " WHERE ts >= ? GROUP BY 1", (formato, inicio)
+    ).fetchall())
+    conexion.close()
+
+    print(f"{'periodo':16} {'llamadas':>8} {'p50 ms':>7} {'p95 ms':>7} {'fallback':>8} "
+          f"{'tok in':>7} {'tok out':>7} {'repetidos':>9} {'cotiz.':>6} {'tok/cotiz.':>10}")
+    for clave in sorted(set(por_periodo) | set(cotizaciones)):
+        filas = por_periodo.get(clave, [])
+        latencias = [f[6] for f in filas if f[6] is not None]
+        entrada = [f[4] for f in filas if f[4] is not None]
+        salida = [f[5] for f in filas if f[5] is not None]
+        hashes = [f[2] for f in filas]
+        cantidad = len(filas)
+        n_cotiz = cotizaciones.get(clave, 0)
+        tokens = sum(entrada) + sum(salida)
+        print(
+            f"{clave:16} {cantidad:8d} {percentil(latencias, 50):7.0f} {percentil(latencias, 95):7.0f} "
+            f"{sum(f[8] for f in filas) / max(cantidad, 1):8.1%} "
+            f"{sum(entrada) / max(len(entrada), 1):7.0f} {sum(salida) / max(len(salida), 1):7.0f} "
+            f"{(cantidad - len(set(hashes))) / max(cantidad, 1):9.1%} {n_cotiz:6d} "
+            f"{tokens / n_cotiz if n_cotiz else 0:10.0f}"
+        )
+
+    # Para ajustar max_tokens y el largo de cada prompt
+    print(f"\n{'tipo':10} {'llamadas':>8} {'max_tokens':>10} {'out p50':>7} {'out p95':>7} "
+          f"{'out máx':>7} {'cortadas':>8} {'in p50':>7}")
+    for tipo, filas in sorted(por_tipo.items(), key=lambda item: str(item[0])):
+        salida = [f[5] for f in filas if f[5] is not None]
+        entrada = [f[4] for f in filas if f[4] is not None]
+        max_tokens = max((f[3] or 0) for f in filas)
+        cortadas = sum(1 for f in filas if f[7] == "length")
+        print(f"{str(tipo):10} {len(filas):8d} {max_tokens:10d} {percentil(salida, 50):7d} "
+              f"{percentil(salida, 95):7d} {max(salida, default=0):7d} {cortadas:8d} "
+              f"{percentil(entrada, 50):7d}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reporte de la bitácora de llamadas al LLM")
+    parser.add_argument("base", nargs="?", default=BITACORA_LLM or "bitacora_llm.db")
+    parser.add_argument("--periodo", choices=sorted(FORMATOS_PERIODO), default="dia")
+    parser.add_argument("--desde", help="Fecha YYYY-MM-DD")
+    args = parser.parse_args()
+    reporte(args.base, args.periodo, args.desde)
@@ -1,3 +1,9 @@
+import os
+
+# Los archivos de datos del bot (promociones, logo, dataset de intenciones)
+# se buscan junto a este archivo, sin importar el directorio de trabajo
+DIRECTORIO_BOT = os.path.dirname(os.path.abspath(__file__))
+
 # Evolution API Configuration
 EVOLUTION_API_BASE = "URL DE EVOLUTIONAPI"
 API_KEY = "APIKEY"
@@ -7,6 +13,9 @@ WEBHOOK_TOKEN = "TOKEN"
 DURACION_ESCRIBIENDO = 3  # Segundos mostrando "escribiendo..."
 TIEMPO_MENSAJE_ANTIGUO = 60  # Ignorar mensajes más antiguos (segundos)
 TIEMPO_AGRUPACION = 1  # Agrupar mensajes en ventana de N segundos
+TTL_RESERVA_PARCIAL = 900  # Conservar datos de una reserva incompleta (segundos)
+CONVERSACIONES_FRANJAS = 64  # Locks en que se reparte el estado de las conversaciones
+CONVERSACIONES_LIMPIEZA = 30  # Segundos mínimos entre barridos del estado vencido
 
 OPENAI_API_KEY = "KEY DE OPENAI"  
 
@@ -18,8 +27,38 @@ PRECIOS_HABITACIONES = {
     "Habitación Doble 2 Camas": 79980,
 }
 
-NUMERO_AUTORIZADO = "NUMERO AUTORIZADP"
+# Asignación de habitaciones por cantidad de personas (asignacion.py)
+CAPACIDAD_HABITACIONES = {  # Personas por habitación, por tipo del léxico
+    "single": 1,
+    "estandar": 2,
+    "superior": 3,
+    "doble": 2,
+}
+DISPONIBILIDAD_HABITACIONES = {}  # Habitaciones libres por tipo; un tipo ausente no tiene límite
+ASIGNACION_ALTERNATIVAS = 3  # Combinaciones que se ofrecen al cliente
+
+# Clasificador de intención (intenciones.py)
+INTENCIONES_DATASET = os.path.join(DIRECTORIO_BOT, "intenciones.tsv")
+INTENCION_UMBRAL = 0.6  # Probabilidad mínima para responder sin pasar por el LLM
+
+# Caché de extracción por plantilla (plantillas.py)
+PLANTILLAS_MAX = 5000  # Plantillas en memoria, se descartan las menos usadas (0 desactiva la caché)
+PLANTILLAS_MIN_ACIERTOS = 2  # Predicciones confirmadas por el LLM antes de responder localmente
+PLANTILLAS_PRECISION_MIN = 0.9  # Precisión mínima de la plantilla para responder localmente
+PLANTILLAS_MUESTREO = 0.05  # Fracción de respuestas locales que igual se verifican con el LLM
 
+# Promociones (promociones.py)
+PROMOCIONES_PATH = os.path.join(DIRECTORIO_BOT, "promociones.json")
+DESCUENTO_MAXIMO = 30  # % máximo de descuento acumulado sobre el subtotal
+
+NUMERO_AUTORIZADO = os.environ.get("COTIZADOR_NUMERO_AUTORIZADO", "NUMERO AUTORIZADP")  # "*": todos
+
+
+# PDF de cotización
+LOGO_PATH = os.path.join(DIRECTORIO_BOT, "logo.png")
+PDF_COMPACTO = True  # Compresión de streams y logo reescalado a su tamaño impreso
+LOGO_DPI = 150  # Resolución del logo en modo compacto
+PDF_DETALLE_MIN_LINEAS = 60  # Habitaciones x noches desde las que se detalla por noche, en páginas
 
 HOTEL_INFO = {
     "nombre": "Hotel BYTE GOD",
@@ -27,4 +66,54 @@ HOTEL_INFO = {
     "telefono": "NIMEROMSUPER REAL",
     "email": "contacto@CONTACTO.cOl",
     "rut": "12.345.678-9"
-}
\ No newline at end of file
+}
+
+# Modo asíncrono (app_async.py)
+MAX_CONEXIONES_HTTP = 500  # Conexiones simultáneas del cliente HTTP compartido
+HILOS_PDF = 4  # Hilos para generar PDFs fuera del event loop
+
+# Control de admisión del webhook (admision.py)
+ADMISION_MAX_EN_CURSO = 20  # Cotizaciones procesándose a la vez
+ADMISION_MAX_ESPERA = 2  # Segundos que una solicitud espera cupo antes de diferirse
+ADMISION_MAX_EN_ESPERA = 50  # Solicitudes esperando cupo por carril; más allá se difieren de inmediato
+ADMISION_MAX_DIFERIDOS = 500  # Con la cola de diferidos llena, los mensajes se descartan
+ADMISION_TTL_DIFERIDO = 600  # Segundos; un diferido más antiguo se descarta
+
+# Envíos a Evolution API (envios.py)
+ENVIOS_TASA_INSTANCIA = 5  # Envíos por segundo por instancia
+ENVIOS_RAFAGA_INSTANCIA = 10
+ENVIOS_TASA_DESTINATARIO = 1  # Envíos por segundo por número
+ENVIOS_RAFAGA_DESTINATARIO = 2
+ENVIOS_MAX_REINTENTOS = 3
+ENVIOS_BACKOFF_BASE = 1  # Segundos, se duplica en cada reintento
+ENVIOS_MAX_COLA = 50  # Envíos pendientes por conversación
+ENVIOS_HILOS = 16
+
+# Perfilado por solicitud (perfilado.py); apagado si COTIZADOR_PERFIL no está definido
+PERFIL_PORCENTAJE = float(os.environ.get("COTIZADOR_PERFIL", "0"))  # % de solicitudes a perfilar
+PERFIL_UMBRAL_MS = float(os.environ.get("COTIZADOR_PERFIL_UMBRAL_MS", "5000"))  # Perfilar siempre las más lentas
+PERFIL_DIR = os.environ.get("COTIZADOR_PERFIL_DIR", "perfiles")
+PERFIL_MAX_ARCHIVOS = 200
+PERFIL_INTERVALO_MS = 5
+
+# Registro estructurado (registro.py)
+LOG_ARCHIVO = os.environ.get("COTIZADOR_LOG_ARCHIVO", "logs/cotizador.log")
+LOG_MAX_BYTES = 10 * 1024 * 1024  # Rotar al llegar a 10 MB
+LOG_RESPALDOS = 5
+LOG_CONSOLA = True
+LOG_NIVEL = os.environ.get("COTIZADOR_LOG_NIVEL", "INFO")
+LOG_NIVELES = os.environ.get("COTIZADOR_LOG_NIVELES", "")  # Ej: "extraccion=DEBUG,envio=WARNING"
+NUMERO_SAL = os.environ.get("COTIZADOR_NUMERO_SAL", "")  # Sal del hash de números en registros y capturas
+
+# Grabación del tráfico del webhook (grabacion.py); apagada si COTIZADOR_GRABACION no está definido
+GRABACION_DIR = os.environ.get("COTIZADOR_GRABACION")  # Directorio de las capturas
+GRABACION_MAX_COLA = 10000  # Payloads pendientes de escribir; más allá se descartan
+
+# Bitácora de llamadas al LLM (bitacora.py); apagada si COTIZADOR_BITACORA_LLM no está definido
+BITACORA_LLM = os.environ.get("COTIZADOR_BITACORA_LLM", "")  # Base SQLite
+BITACORA_LOTE = 200  # Filas por transacción
+BITACORA_INTERVALO = 1.0  # Segundos máximos que una fila espera su lote
+BITACORA_MAX_COLA = 10000  # Filas pendientes de escribir; más allá se descartan
+
+# Historial de cotizaciones en columnas (historial.py); apagado si COTIZADOR_HISTORIAL no está definido
+HISTORIAL_DIR = os.environ.get("COTIZADOR_HISTORIAL", "")  # Directorio de las columnas (ruta absoluta)
@@ -0,0 +1,356 @@
+"""
+Estado de las conversaciones por número.
+
+El estado (conversación activa, mensajes ya vistos y reserva a medias) se
+reparte en CONVERSACIONES_FRANJAS franjas según el número; cada franja tiene
+su propio lock, que solo se toma durante la lectura o modificación del
+estado. Dos números en franjas distintas nunca compiten por el mismo lock, y
+la limpieza recorre las franjas de a una, como mucho cada
+CONVERSACIONES_LIMPIEZA segundos.
+
+Aparte, procesando(numero) serializa el procesamiento completo de los
+mensajes de un mismo número (extracción, cotización y envío) con un lock por
+número que se crea al primer mensaje y se elimina cuando nadie lo usa: dos
+mensajes del mismo cliente no se pisan la reserva a medias, mientras que
+clientes distintos se procesan en paralelo. procesando_async es la versión
+para app_async.py.
+
+Prueba de estrés:
+    python conversaciones.py [hilos] [numeros]
+"""
+import asyncio
+import threading
+import time
+import zlib
+from contextlib import contextmanager, asynccontextmanager
+from config import (
+    TIEMPO_MENSAJE_ANTIGUO, TIEMPO_AGRUPACION, TTL_RESERVA_PARCIAL,
+    CONVERSACIONES_FRANJAS, CONVERSACIONES_LIMPIEZA
+)
+
+# Campos que se conservan de una reserva a medias (los de
+# extractor.DESCRIPCION_CAMPOS); el resto, como el código de promoción o las
+# alternativas de habitaciones, se recalcula en cada mensaje
+CAMPOS_RESERVA = ('check_in', 'check_out', 'cant_personas',
+                  'cantidad_habitaciones', 'tipo_habitaciones')
+
+class _Franja:
+    __slots__ = ('lock', 'conversaciones', 'procesados', 'reservas', 'turnos')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.conversaciones = {}
+        # message_id -> hora en que se vio; pasado TIEMPO_MENSAJE_ANTIGUO el
+        # mensaje se descartaría igual por antiguo, así que se puede olvidar
+        self.procesados = {}
+        # Reservas incompletas: los campos ya extraídos se conservan entre
+        # mensajes para que el cliente solo complete lo que falta
+        self.reservas = {}
+        # Locks de procesamiento por número: [lock, usuarios]
+        self.turnos = {}
+
+_franjas = [_Franja() for _ in range(CONVERSACIONES_FRANJAS)]
+
+def _franja(numero):
+    # crc32 y no hash(): el reparto no cambia entre procesos
+    return _franjas[zlib.crc32(str(numero).encode()) % CONVERSACIONES_FRANJAS]
+
+def debe_procesar_mensaje(numero, message_id, timestamp_mensaje, ahora=None):
+    ahora = time.time() if ahora is None else ahora
+    franja = _franja(numero)
+
+    with franja.lock:
+        if message_id in franja.procesados:
+            return False
+        franja.procesados[message_id] = ahora
+
+        diferencia = ahora - timestamp_mensaje
+        if diferencia > TIEMPO_MENSAJE_ANTIGUO:
+            return False
+
+        conv = franja.conversaciones.get(numero)
+        if conv is None:
+            franja.conversaciones[numero] = {
+                "estado": "activa",
+                "timestamp": ahora,
+                "message_ids": [message_id]
+            }
+        elif conv["estado"] == "cerrada":
+            tiempo_desde_cierre = ahora - conv["timestamp"]
+            if tiempo_desde_cierre < 5:
+                return False
+            conv["estado"] = "activa"
+            conv["timestamp"] = ahora
+            conv["message_ids"] = [message_id]
+        elif conv["estado"] == "activa":
+            tiempo_desde_ultimo = ahora - conv["timestamp"]
+            if tiempo_desde_ultimo < TIEMPO_AGRUPACION:
+                conv["message_ids"].append(message_id)
+                conv["timestamp"] = ahora
+                return False
+
+        return True
+
+def marcar_procesado(numero, message_id):
+    """Registra el mensaje como visto sin procesarlo"""
+    franja = _franja(numero)
+    with franja.lock:
+        franja.procesados[message_id] = time.time()
+
+def cerrar_conversacion(numero, ahora=None):
+    franja = _franja(numero)
+    with franja.lock:
+        conv = franja.conversaciones.get(numero)
+        if conv is not None:
+            conv["estado"] = "cerrada"
+            conv["timestamp"] = time.time() if ahora is None else ahora
+
+_limpieza = threading.Lock()
+_ultima_limpieza = 0.0
+
+def limpiar_cache(forzar=False):
+    """
+    Olvida el estado vencido. Se llama en cada webhook, pero recorre las
+    franjas a lo más cada CONVERSACIONES_LIMPIEZA segundos y nunca en dos
+    hilos a la vez; forzar=True barre igual
+    """
+    global _ultima_limpieza
+    ahora = time.time()
+    if not forzar and ahora - _ultima_limpieza < CONVERSACIONES_LIMPIEZA:
+        return
+    if not _limpieza.acquire(blocking=False):
+        return
+    try:
+        _ultima_limpieza = ahora
+        _barrer(ahora)
+    finally:
+        _limpieza.release()
+
+def _barrer(ahora):
+    for franja in _franjas:
+        with franja.lock:
+            franja.procesados = {
+                message_id: visto for message_id, visto in franja.procesados.items()
+                if ahora - visto <= 2 * TIEMPO_MENSAJE_ANTIGUO
+            }
+            franja.conversaciones = {
+                numero: conv for numero, conv in franja.conversaciones.items()
+                if ahora - conv["timestamp"] <= 3600
+            }
+            franja.reservas = {
+                numero: parcial for numero, parcial in franja.reservas.items()
+                if ahora - parcial["timestamp"] <= TTL_RESERVA_PARCIAL
+            }
+
+def reiniciar():
+    """Olvida todo el estado (pruebas y benchmarks)"""
+    for franja in _franjas:
+        with franja.lock:
+            franja.conversaciones.clear()
+            franja.procesados.clear()
+            franja.reservas.clear()
+
+def guardar_reserva_parcial(numero, info_reserva):
+    campos = {campo: info_reserva[campo] for campo in CAMPOS_RESERVA if info_reserva.get(campo)}
+    franja = _franja(numero)
+    with franja.lock:
+        franja.reservas[numero] = {"info": campos, "timestamp": time.time()}
+
+def obtener_reserva_parcial(numero):
+    """Retorna los campos conocidos de la reserva en curso o None si expiró"""
+    franja = _franja(numero)
+    with franja.lock:
+        parcial = franja.reservas.get(numero)
+        if not parcial:
+            return None
+        if time.time() - parcial["timestamp"] > TTL_RESERVA_PARCIAL:
+            del franja.reservas[numero]
+            return None
+        return dict(parcial["info"])
+
+def tiene_reserva_parcial(numero):
+    """Indica si el número está completando una reserva (carril prioritario)"""
+    franja = _franja(numero)
+    with franja.lock:
+        parcial = franja.reservas.get(numero)
+    return bool(parcial) and time.time() - parcial["timestamp"] <= TTL_RESERVA_PARCIAL
+
+def descartar_reserva_parcial(numero):
+    franja = _franja(numero)
+    with franja.lock:
+        franja.reservas.pop(numero, None)
+
+def _tomar_turno(numero, crear_lock):
+    franja = _franja(numero)
+    with franja.lock:
+        turno = franja.turnos.get(numero)
+        if turno is None:
+            turno = franja.turnos[numero] = [crear_lock(), 0]
+        turno[1] += 1
+    return turno
+
+def _soltar_turno(numero, turno):
+    franja = _franja(numero)
+    with franja.lock:
+        turno[1] -= 1
+        if turno[1] == 0 and franja.turnos.get(numero) is turno:
+            del franja.turnos[numero]
+
+@contextmanager
+def procesando(numero):
+    """Procesamiento exclusivo de los mensajes de un número (app.py)"""
+    turno = _tomar_turno(numero, threading.Lock)
+    try:
+        with turno[0]:
+            yield
+    finally:
+        _soltar_turno(numero, turno)
+
+@asynccontextmanager
+async def procesando_async(numero):
+    """Igual que procesando(), con asyncio.Lock (app_async.py)"""
+    turno = _tomar_turno(numero, asyncio.Lock)
+    try:
+        async with turno[0]:
+            yield
+    finally:
+        _soltar_turno(numero, turno)
+
+def turnos_activos():
+    """Cantidad de números con mensajes procesándose o esperando turno"""
+    return sum(len(franja.turnos) for franja in _franjas)
+
+def _estres(hilos, numeros, mensajes_por_hilo=2000):
+    """
+    Muchos hilos procesan mensajes de muchos números a la vez. Verifica que
+    todo mensaje nuevo fuera de la ventana de agrupación se acepte, que un
+    message_id repetido (reintentos del webhook, aun en paralelo) se acepte
+    una sola vez, que un número nunca tenga dos mensajes procesándose a la
+    vez y que números distintos sí corran en paralelo.
+
+    El reloj es simulado: el mensaje n de cada número llega n * paso segundos
+    después del inicio, más que TIEMPO_AGRUPACION y que la espera tras cerrar
+    la conversación.
+    """
+    import random
+
+    reiniciar()
+    base = time.time()
+    paso = TIEMPO_AGRUPACION + 5
+    en_curso = {}
+    conteo = {}
+    lock_prueba = threading.Lock()
+    maximo_paralelo = [0]
+    aceptados = []
+    repetidos = []
+    errores = []
+    inicio_barrera = threading.Barrier(hilos)
+
+    def trabajar(semilla):
+        azar = random.Random(semilla)
+        inicio_barrera.wait()
+        try:
+            for i in range(mensajes_por_hilo):
+                numero = f"569{azar.randrange(numeros):08d}"
+                with procesando(numero):
+                    with lock_prueba:
+                        en_curso[numero] = en_curso.get(numero, 0) + 1
+                        if en_curso[numero] > 1:
+                            errores.append(f"{numero} procesado en paralelo")
+                        maximo_paralelo[0] = max(maximo_paralelo[0], sum(en_curso.values()))
+                    # Lectura-modificación-escritura que solo es segura con el turno
+                    valor = conteo.get(numero, 0)
+                    ahora = base + valor * paso
+                    message_id = f"{numero}-{valor}"
+                    if debe_procesar_mensaje(numero, message_id, ahora, ahora):
+                        aceptados.append(message_id)
+                    conocidos = obtener_reserva_parcial(numero) or {}
+                    time.sleep(0)
+                    conteo[numero] = valor + 1
+                    guardar_reserva_parcial(numero, {"cant_personas": int(conocidos.get("cant_personas", 0)) + 1})
+                    cerrar_conversacion(numero, ahora)
+                    with lock_prueba:
+                        en_curso[numero] -= 1
+
+                # Otro hilo ya pudo haber entregado este mismo mensaje
+                repetido = f"repetido-{i}"
+                if debe_procesar_mensaje(repetido, repetido, base, base):
+                    repetidos.append(repetido)
+
+                if i % 200 == 0:
+                    limpiar_cache(forzar=True)
+        except Exception as e:
+            errores.append(repr(e))
+
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=trabajar, args=(s,)) for s in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    duracion = time.perf_counter() - inicio
+
+    total = hilos * mensajes_por_hilo
+    assert not errores, errores[:5]
+    assert len(aceptados) == total, f"Mensajes nuevos rechazados: {total - len(aceptados)}"
+    assert len(set(aceptados)) == total, "Un message_id se aceptó dos veces"
+    assert sorted(repetidos) == sorted(f"repetido-{i}" for i in range(mensajes_por_hilo)), \
+        "Un mensaje repetido se aceptó más o menos de una vez"
+    assert sum(conteo.values()) == total, f"Actualizaciones perdidas: {total - sum(conteo.values())}"
+    for numero, cantidad in conteo.items():
+        parcial = obtener_reserva_parcial(numero)
+        assert parcial and parcial["cant_personas"] == cantidad, f"Reserva a medias inconsistente: {numero}"
+    ultimo = base + max(conteo.values()) * paso
+    reenviados = sum(debe_procesar_mensaje(m.rpartition("-")[0], m, ultimo, ultimo) for m in aceptados)
+    assert reenviados == 0, f"Mensajes ya procesados aceptados de nuevo: {reenviados}"
+    assert turnos_activos() == 0, "Quedaron locks de número sin liberar"
+    assert maximo_paralelo[0] > 1, "Los números distintos no se procesaron en paralelo"
+
+    print(f"Hilos: {hilos} | números: {numeros} | mensajes: {total} | "
+          f"{total / duracion:,.0f} mensajes/s | paralelo máx: {maximo_paralelo[0]} | "
+          f"aceptados: {len(aceptados)} + {len(repetidos)} repetidos")
+
+async def _estres_async(tareas, numeros, mensajes_por_tarea=500):
+    """Como _estres, con corrutinas que ceden el control dentro del turno"""
+    import random
+
+    reiniciar()
+    en_curso = {}
+    conteo = {}
+    errores = []
+
+    async def trabajar(semilla):
+        azar = random.Random(semilla)
+        for _ in range(mensajes_por_tarea):
+            numero = f"569{azar.randrange(numeros):08d}"
+            async with procesando_async(numero):
+                en_curso[numero] = en_curso.get(numero, 0) + 1
+                if en_curso[numero] > 1:
+                    errores.append(f"{numero} procesado en paralelo")
+                valor = conteo.get(numero, 0)
+                await asyncio.sleep(0)
+                conteo[numero] = valor + 1
+                en_curso[numero] -= 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[trabajar(s) for s in range(tareas)])
+    duracion = time.perf_counter() - inicio
+
+    total = tareas * mensajes_por_tarea
+    assert not errores, errores[:5]
+    assert sum(conteo.values()) == total, f"Actualizaciones perdidas: {total - sum(conteo.values())}"
+    assert turnos_activos() == 0, "Quedaron locks de número sin liberar"
+    print(f"Tareas: {tareas} | números: {numeros} | mensajes: {total} | {total / duracion:,.0f} mensajes/s")
+
+if __name__ == "__main__":
+    import sys
+
+    hilos = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    numeros = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    # Cambios de hilo muy frecuentes para provocar las carreras
+    sys.setswitchinterval(1e-6)
+    _estres(hilos, numeros)
+    _estres(hilos, 3)
+    asyncio.run(_estres_async(hilos * 4, numeros))
+    print("OK")
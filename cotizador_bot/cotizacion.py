@@ -0,0 +1,180 @@
+import base64
+import time
+from datetime import datetime
+from config import HOTEL_INFO
+from precios import obtener_precios_habitaciones, calcular_totales, generar_resumen_precios
+from bitacora import bitacora
+from historial import historial
+from intenciones import enrutar, RESERVA, PRECIOS, SALUDO, GRACIAS, SERVICIOS
+from pdf_generator import renderizar_cotizacion_pdf
+from registro import obtener_logger, ms_desde
+
+log = obtener_logger("cotizacion")
+
+CAMPOS_REQUERIDOS = ['check_in', 'check_out', 'cant_personas',
+                     'cantidad_habitaciones', 'tipo_habitaciones']
+
+# Campos que asignacion.py completa a partir de cant_personas
+CAMPOS_ASIGNABLES = ('cantidad_habitaciones', 'tipo_habitaciones')
+
+NOMBRES_CAMPOS = {
+    'check_in': 'fecha de entrada',
+    'check_out': 'fecha de salida',
+    'cant_personas': 'cantidad de personas',
+    'cantidad_habitaciones': 'cantidad de habitaciones',
+    'tipo_habitaciones': 'tipo de habitaciones',
+}
+
+MENSAJE_ERROR_COTIZACION = "Error generando la cotizacion. Intente nuevamente."
+
+INSTRUCCIONES_COTIZACION = (
+    "Para cotizar indicanos fecha de entrada y salida, cantidad de personas, "
+    "cantidad de habitaciones y tipo (single, estandar, superior o doble)."
+)
+
+# Respuestas locales según la intención del mensaje (intenciones.py)
+RESPUESTAS_INTENCION = {
+    SALUDO: f"Hola! Soy el asistente de {HOTEL_INFO['nombre']}. {INSTRUCCIONES_COTIZACION}",
+    GRACIAS: f"Gracias a ti! Si necesitas otra cotizacion estamos aqui. {INSTRUCCIONES_COTIZACION}",
+    SERVICIOS: (
+        f"Para consultas sobre servicios escribenos a {HOTEL_INFO['email']} "
+        f"o llama al {HOTEL_INFO['telefono']}. {INSTRUCCIONES_COTIZACION}"
+    ),
+}
+
+# Respuestas del control de admisión (admision.py) según el motivo
+MENSAJES_ADMISION = {
+    "diferido": "Estamos recibiendo muchas consultas. En unos minutos te enviamos tu cotizacion.",
+    "descartado": "Estamos con mucha demanda en este momento. Por favor escribenos nuevamente en unos minutos.",
+    "expirado": "No alcanzamos a preparar tu cotizacion. Por favor escribenos nuevamente.",
+}
+
+def responder_sin_extraccion(texto, conocidos=None):
+    """
+    Respuesta local para los mensajes que no son una reserva
+    
+    Args:
+        texto: Texto del cliente
+        conocidos: Reserva a medias del número; si existe, todo mensaje
+            va a la extracción (ej: "somos 2" completa la reserva)
+    
+    Returns:
+        Tupla (intencion, respuesta), o None si el mensaje va a la extracción
+    """
+    if conocidos:
+        return None
+    intencion = enrutar(texto)
+    if intencion == RESERVA:
+        return None
+    if intencion == PRECIOS:
+        return intencion, generar_resumen_precios()
+    return intencion, RESPUESTAS_INTENCION[intencion]
+
+def obtener_campos_faltantes(info_reserva):
+    """
+    Retorna la lista de campos requeridos que no fueron extraídos. Con la
+    cantidad de personas, las habitaciones se asignan sin preguntar
+    (asignacion.completar_habitaciones).
+    """
+    faltantes = [campo for campo in CAMPOS_REQUERIDOS if not info_reserva.get(campo)]
+    if info_reserva.get('cant_personas'):
+        faltantes = [campo for campo in faltantes if campo not in CAMPOS_ASIGNABLES]
+    return faltantes
+
+def formatear_mensaje_faltantes(campos_faltantes):
+    """
+    Pide al cliente solo los campos que faltan
+
+    Ejemplo: "... Por favor indica: Fecha de salida y cantidad de personas."
+    """
+    nombres = [NOMBRES_CAMPOS[campo] for campo in campos_faltantes]
+    if len(nombres) > 1:
+        lista = ", ".join(nombres[:-1]) + " y " + nombres[-1]
+    else:
+        lista = nombres[0]
+    return (
+        "Necesito mas informacion para la cotizacion. Por favor indica: "
+        f"{lista[0].upper()}{lista[1:]}."
+    )
+
+def generar_cotizacion(info_reserva):
+    """
+    Calcula totales y genera el PDF de la cotización (trabajo de CPU). La
+    cotización se anota en el historial (historial.py), aunque falle el PDF
+
+    Args:
+        info_reserva: Diccionario con los campos requeridos completos
+
+    Returns:
+        Diccionario con totales, cantidad_noches, pdf_base64 y las métricas
+        del PDF: pdf_bytes (tamaño en bytes) y pdf_ms (tiempo de render)
+
+    Raises:
+        ValueError si las fechas son inválidas
+    """
+    check_in = datetime.strptime(info_reserva['check_in'], '%Y-%m-%d')
+    check_out = datetime.strptime(info_reserva['check_out'], '%Y-%m-%d')
+    cantidad_noches = (check_out - check_in).days
+
+    if cantidad_noches <= 0:
+        raise ValueError("Fechas invalidas")
+
+    precios = obtener_precios_habitaciones()
+    totales = calcular_totales(
+        info_reserva['tipo_habitaciones'],
+        cantidad_noches,
+        precios,
+        check_in=info_reserva['check_in'],
+        codigo_promocion=info_reserva.get('codigo_promocion')
+    )
+
+    inicio = time.perf_counter()
+    try:
+        pdf_bytes = renderizar_cotizacion_pdf(
+            info_reserva,
+            totales,
+            cantidad_noches
+        )
+    except Exception:
+        historial.registrar(info_reserva, cantidad_noches, totales, pdf=False)
+        raise
+    pdf_ms = ms_desde(inicio)
+
+    log.info("PDF generado", extra={"duracion_ms": pdf_ms, "datos": {"pdf_bytes": len(pdf_bytes)}})
+    bitacora.registrar_cotizacion()
+    historial.registrar(info_reserva, cantidad_noches, totales, pdf=True)
+
+    return {
+        "totales": totales,
+        "cantidad_noches": cantidad_noches,
+        "pdf_base64": base64.b64encode(pdf_bytes).decode('utf-8'),
+        "pdf_bytes": len(pdf_bytes),
+        "pdf_ms": pdf_ms,
+    }
+
+def formatear_mensaje_exito(info_reserva, cantidad_noches, totales):
+    """Texto que acompaña al PDF de la cotización"""
+    habitaciones = ""
+    alternativas = info_reserva.get('alternativas_habitaciones')
+    if alternativas:
+        habitaciones = f"Habitaciones para {info_reserva['cant_personas']} personas: {alternativas[0][0]}\n"
+        if info_reserva.get('habitaciones_agregadas'):
+            habitaciones += (f"Las habitaciones pedidas no alcanzan para todos; "
+                             f"agregamos {info_reserva['habitaciones_agregadas']}\n")
+        if len(alternativas) > 1:
+            habitaciones += "Otras opciones: " + "; ".join(
+                f"{descripcion} (${costo:,} por noche)" for descripcion, costo in alternativas[1:]
+            ) + "\n"
+    descuentos = ""
+    if totales.get('total_descuentos'):
+        descuentos = f"Descuentos: -${totales['total_descuentos']:,} CLP\n"
+    return (
+        f"Cotizacion generada:\n"
+        f"Check-in: {info_reserva['check_in']}\n"
+        f"Check-out: {info_reserva['check_out']}\n"
+        f"Noches: {cantidad_noches}\n"
+        f"{habitaciones}"
+        f"{descuentos}"
+        f"Total: ${totales['total_bruto']:,} CLP\n"
+        f"Enviando PDF..."
+    )
@@ -0,0 +1,124 @@
+"""
+Decodificación rápida del cuerpo del webhook.
+
+Evolution envía muchos más eventos de presencia, estado y ack que mensajes.
+Antes de parsear el JSON se descartan sobre los bytes crudos los eventos que
+no son messages.upsert y los mensajes cuyo remoteJid no es el del número
+autorizado; ambos filtros solo buscan subcadenas que un mensaje válido
+siempre contiene, así que no rechazan nada que el parseo completo aceptaría.
+Lo que pasa el filtro se parsea (con orjson si está instalado) y se valida
+igual que antes.
+
+estadisticas() cuenta los eventos aceptados y rechazados por motivo.
+"""
+import json
+import threading
+from typing import Optional, TypedDict
+from config import NUMERO_AUTORIZADO
+
+try:
+    import orjson
+    _cargar_json = orjson.loads
+except ImportError:
+    _cargar_json = json.loads
+
+ACEPTADO = "aceptado"
+RECHAZO_EVENTO = "evento"
+RECHAZO_NO_AUTORIZADO = "no_autorizado"
+RECHAZO_PROPIO = "propio"
+RECHAZO_SIN_TEXTO = "sin_texto"
+RECHAZO_INVALIDO = "invalido"
+
+_EVENTO_MENSAJE = b'"messages.upsert"'
+_JID_AUTORIZADO = f'"{NUMERO_AUTORIZADO}@'.encode()
+
+_lock = threading.Lock()
+_contadores = dict.fromkeys([
+    ACEPTADO, RECHAZO_EVENTO, RECHAZO_NO_AUTORIZADO,
+    RECHAZO_PROPIO, RECHAZO_SIN_TEXTO, RECHAZO_INVALIDO,
+], 0)
+
+class MensajeEntrante(TypedDict):
+    """Mensaje de WhatsApp tal como lo usa el resto del bot"""
+    instance_name: str
+    remote_jid: str
+    message_id: str
+    numero: str
+    from_me: bool
+    timestamp: int
+    texto: str
+
+def parsear_mensaje(data) -> Optional[MensajeEntrante]:
+    """
+    Extrae los datos relevantes de un evento messages.upsert de Evolution
+
+    Args:
+        data: Diccionario con el payload del webhook
+
+    Returns:
+        MensajeEntrante, o None si el evento no es un mensaje
+    """
+    if data.get('event') != 'messages.upsert':
+        return None
+
+    mensaje_data = data.get('data', {})
+    key = mensaje_data.get('key', {})
+    remote_jid = key.get('remoteJid', '')
+    message = mensaje_data.get('message', {})
+
+    return {
+        "instance_name": data.get('instance'),
+        "remote_jid": remote_jid,
+        "message_id": key.get('id', ''),
+        "numero": remote_jid.split('@')[0],
+        "from_me": bool(key.get('fromMe')),
+        "timestamp": mensaje_data.get('messageTimestamp', 0),
+        "texto": (message.get('conversation') or
+                  message.get('extendedTextMessage', {}).get('text') or '')
+    }
+
+def _contar(motivo):
+    with _lock:
+        _contadores[motivo] += 1
+
+def clasificar(cuerpo):
+    """
+    Decodifica el cuerpo crudo del webhook
+
+    Args:
+        cuerpo: bytes del POST
+
+    Returns:
+        Tupla (mensaje, motivo): el MensajeEntrante y ACEPTADO, o None y el
+        motivo del rechazo
+    """
+    if _EVENTO_MENSAJE not in cuerpo:
+        return None, RECHAZO_EVENTO
+    if NUMERO_AUTORIZADO != "*" and _JID_AUTORIZADO not in cuerpo:
+        return None, RECHAZO_NO_AUTORIZADO
+
+    try:
+        data = _cargar_json(cuerpo)
+        mensaje = parsear_mensaje(data) if isinstance(data, dict) else None
+    except (ValueError, AttributeError):
+        return None, RECHAZO_INVALIDO
+
+    if mensaje is None:
+        return None, RECHAZO_EVENTO
+    if mensaje['from_me']:
+        return None, RECHAZO_PROPIO
+    if NUMERO_AUTORIZADO != "*" and mensaje['numero'] != NUMERO_AUTORIZADO:
+        return None, RECHAZO_NO_AUTORIZADO
+    if not mensaje['texto'] or not mensaje['numero']:
+        return None, RECHAZO_SIN_TEXTO
+    return mensaje, ACEPTADO
+
+def decodificar(cuerpo):
+    """clasificar() que además actualiza los contadores"""
+    mensaje, motivo = clasificar(cuerpo)
+    _contar(motivo)
+    return mensaje, motivo
+
+def estadisticas():
+    with _lock:
+        return dict(_contadores)
@@ -0,0 +1,254 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from registro import obtener_logger, hash_numero
+from config import (
+    ENVIOS_TASA_INSTANCIA, ENVIOS_RAFAGA_INSTANCIA,
+    ENVIOS_TASA_DESTINATARIO, ENVIOS_RAFAGA_DESTINATARIO,
+    ENVIOS_MAX_REINTENTOS, ENVIOS_BACKOFF_BASE, ENVIOS_MAX_COLA, ENVIOS_HILOS
+)
+
+log = obtener_logger("envio")
+
+class EnvioReintentable(Exception):
+    """Error transitorio de Evolution (429, 5xx): el envío se reintenta"""
+
+class CuboTokens:
+    """
+    Token bucket: `tasa` envíos por segundo con ráfagas de hasta `capacidad`
+    """
+    def __init__(self, tasa, capacidad):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = capacidad
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reservar(self):
+        """
+        Toma un token (aunque sea a futuro)
+
+        Returns:
+            Segundos que hay que esperar antes de usarlo
+        """
+        with self.lock:
+            ahora = time.monotonic()
+            self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+            self.ultimo = ahora
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.tasa
+
+    def lleno(self):
+        with self.lock:
+            return self.tokens + (time.monotonic() - self.ultimo) * self.tasa >= self.capacidad
+
+class _BasePlanificador:
+    """Cubos y contadores compartidos por las versiones con hilos y asyncio"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cubos_instancia = {}
+        self.cubos_destinatario = {}
+        self.contadores = {
+            "encolados": 0,
+            "enviados": 0,
+            "reintentos": 0,
+            "fallidos": 0,
+            "descartados_cola_llena": 0,
+        }
+
+    def _contar(self, nombre, cantidad=1):
+        with self.lock:
+            self.contadores[nombre] += cantidad
+
+    def _espera(self, instance_name, numero):
+        """Reserva un token de la instancia y otro del destinatario"""
+        with self.lock:
+            cubo_instancia = self.cubos_instancia.get(instance_name)
+            if cubo_instancia is None:
+                cubo_instancia = CuboTokens(ENVIOS_TASA_INSTANCIA, ENVIOS_RAFAGA_INSTANCIA)
+                self.cubos_instancia[instance_name] = cubo_instancia
+
+            clave = (instance_name, numero)
+            cubo_destinatario = self.cubos_destinatario.get(clave)
+            if cubo_destinatario is None:
+                if len(self.cubos_destinatario) > 1000:
+                    self._podar_cubos()
+                cubo_destinatario = CuboTokens(ENVIOS_TASA_DESTINATARIO, ENVIOS_RAFAGA_DESTINATARIO)
+                self.cubos_destinatario[clave] = cubo_destinatario
+
+        return max(cubo_instancia.reservar(), cubo_destinatario.reservar())
+
+    def _podar_cubos(self):
+        # Un cubo lleno equivale a uno nuevo: se puede descartar sin efecto
+        for clave in [c for c, cubo in self.cubos_destinatario.items() if cubo.lleno()]:
+            del self.cubos_destinatario[clave]
+
+    def _backoff(self, intento):
+        return ENVIOS_BACKOFF_BASE * (2 ** intento)
+
+    def _registrar_fallo(self, instance_name, numero, error):
+        self._contar("fallidos")
+        log.warning("Envío a Evolution fallido", extra={"datos": {
+            "instance": instance_name,
+            "numero_hash": hash_numero(numero),
+            "error": repr(error) if error else "rechazado"
+        }})
+
+class PlanificadorEnvios(_BasePlanificador):
+    """
+    Planificador de envíos a Evolution API con hilos
+
+    Cada conversación (instancia, número) tiene una cola FIFO que se drena
+    en orden, de modo que el texto siempre llega antes que el PDF. Las
+    conversaciones distintas se drenan en paralelo en un pool de hilos.
+    """
+
+    def __init__(self, hilos=ENVIOS_HILOS):
+        super().__init__()
+        self.executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="envios")
+        self.colas = {}
+
+    def encolar(self, instance_name, numero, funcion, *args):
+        """
+        Agrega un envío a la cola de la conversación
+
+        Args:
+            funcion: Callable que realiza el envío. Retorna True si se entregó,
+                False si falló de forma definitiva; cualquier excepción se
+                considera transitoria y se reintenta con backoff.
+
+        Returns:
+            Future que se resuelve con True/False al terminar el envío
+        """
+        futuro = Future()
+        clave = (instance_name, numero)
+
+        with self.lock:
+            cola = self.colas.get(clave)
+            if cola is not None and len(cola) >= ENVIOS_MAX_COLA:
+                self.contadores["descartados_cola_llena"] += 1
+                futuro.set_result(False)
+                return futuro
+
+            self.contadores["encolados"] += 1
+            if cola is None:
+                self.colas[clave] = deque([(funcion, args, futuro)])
+                self.executor.submit(self._drenar, clave)
+            else:
+                cola.append((funcion, args, futuro))
+
+        return futuro
+
+    def _drenar(self, clave):
+        instance_name, numero = clave
+        while True:
+            with self.lock:
+                cola = self.colas[clave]
+                if not cola:
+                    del self.colas[clave]
+                    return
+                funcion, args, futuro = cola.popleft()
+
+            futuro.set_result(self._ejecutar(instance_name, numero, funcion, args))
+
+    def _ejecutar(self, instance_name, numero, funcion, args):
+        for intento in range(ENVIOS_MAX_REINTENTOS + 1):
+            espera = self._espera(instance_name, numero)
+            if espera:
+                time.sleep(espera)
+            error = None
+            try:
+                if funcion(*args):
+                    self._contar("enviados")
+                    return True
+                break
+            except Exception as e:
+                error = e
+                if intento < ENVIOS_MAX_REINTENTOS:
+                    self._contar("reintentos")
+                    time.sleep(self._backoff(intento))
+
+        self._registrar_fallo(instance_name, numero, error)
+        return False
+
+    def estadisticas(self):
+        with self.lock:
+            estadisticas = dict(self.contadores)
+            estadisticas["conversaciones_en_cola"] = len(self.colas)
+            estadisticas["pendientes"] = sum(len(cola) for cola in self.colas.values())
+        return estadisticas
+
+class PlanificadorEnviosAsync(_BasePlanificador):
+    """
+    Versión asyncio del planificador: una tarea por conversación con envíos
+    pendientes, que drena su cola en orden
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.colas = {}
+        self.tareas = set()
+
+    def encolar(self, instance_name, numero, corrutina, *args):
+        """
+        Igual que PlanificadorEnvios.encolar, pero `corrutina` es una función
+        async. Retorna un asyncio.Future.
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        clave = (instance_name, numero)
+
+        cola = self.colas.get(clave)
+        if cola is not None and len(cola) >= ENVIOS_MAX_COLA:
+            self._contar("descartados_cola_llena")
+            futuro.set_result(False)
+            return futuro
+
+        self._contar("encolados")
+        if cola is None:
+            self.colas[clave] = deque([(corrutina, args, futuro)])
+            tarea = asyncio.create_task(self._drenar(clave))
+            self.tareas.add(tarea)
+            tarea.add_done_callback(self.tareas.discard)
+        else:
+            cola.append((corrutina, args, futuro))
+
+        return futuro
+
+    async def _drenar(self, clave):
+        instance_name, numero = clave
+        cola = self.colas[clave]
+        while cola:
+            corrutina, args, futuro = cola.popleft()
+            futuro.set_result(await self._ejecutar(instance_name, numero, corrutina, args))
+        del self.colas[clave]
+
+    async def _ejecutar(self, instance_name, numero, corrutina, args):
+        for intento in range(ENVIOS_MAX_REINTENTOS + 1):
+            espera = self._espera(instance_name, numero)
+            if espera:
+                await asyncio.sleep(espera)
+            error = None
+            try:
+                if await corrutina(*args):
+                    self._contar("enviados")
+                    return True
+                break
+            except Exception as e:
+                error = e
+                if intento < ENVIOS_MAX_REINTENTOS:
+                    self._contar("reintentos")
+                    await asyncio.sleep(self._backoff(intento))
+
+        self._registrar_fallo(instance_name, numero, error)
+        return False
+
+    def estadisticas(self):
+        estadisticas = dict(self.contadores)
+        estadisticas["conversaciones_en_cola"] = len(self.colas)
+        estadisticas["pendientes"] = sum(len(cola) for cola in self.colas.values())
+        return estadisticas
@@ -0,0 +1,12 @@
+"""
+Estadísticas compartidas por los reportes de los scripts de análisis
+(grabacion.py, bitacora.py, perfilado.py). Sin dependencias: importarlo no
+arrastra el módulo de ningún reporte.
+"""
+
+def percentil(valores, p):
+    """Percentil p (0-100) por rango más cercano; 0 si no hay valores"""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
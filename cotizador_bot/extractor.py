@@ -1,17 +1,64 @@
 import requests
 import json
+import time
 from datetime import datetime, timedelta
 from config import OPENAI_API_KEY
+from registro import obtener_logger, ms_desde
+from bitacora import bitacora
+from plantillas import cache_plantillas
+from promociones import detectar_codigo_promocion
+from lexico import (
+    tokenizar, normalizar_texto, tipos_mencionados, firma,
+    compilar_secuencia, buscar_secuencia, NUMERO, UNIDAD, CLAVE, FECHA
+)
 
-def extraer_informacion_reserva(mensaje):
+log = obtener_logger("extraccion")
+
+OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+OPENAI_MODELO = "gpt-4o-mini"
+
+DESCRIPCION_CAMPOS = {
+    "check_in": "Fecha de entrada (formato YYYY-MM-DD)",
+    "check_out": "Fecha de salida (formato YYYY-MM-DD)",
+    "cant_personas": "Cantidad de personas",
+    "cantidad_habitaciones": "Cantidad de habitaciones",
+    "tipo_habitaciones": "Tipo de habitaciones (single, estandar, superior, doble)",
+}
+
+# Secuencias de tokens para la extracción fallback: (patrón, índice del número)
+# "para N" va al final y solo en cifras: "para una noche" y "para un grupo
+# de 5" no dicen cuántas personas son
+SECUENCIAS_PERSONAS = [
+    (compilar_secuencia((NUMERO, None), (UNIDAD, 'persona')), 0),
+    (compilar_secuencia((CLAVE, 'somos'), (NUMERO, None)), 1),
+    (compilar_secuencia((CLAVE, 'para'), (NUMERO, 'cifras')), 1),
+]
+SECUENCIA_HABITACIONES = compilar_secuencia((NUMERO, None), (UNIDAD, 'habitacion'))
+SECUENCIA_RANGO = compilar_secuencia((CLAVE, 'del'), (NUMERO, None), (CLAVE, 'al'), (NUMERO, None))
+
+def encabezados_openai():
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {OPENAI_API_KEY}"
+    }
+
+def construir_solicitud_openai(mensaje, fecha_actual_obj, conocidos=None):
     """
-    Extrae información de reserva usando OpenAI GPT-4
-    Retorna diccionario con: check_in, check_out, cant_personas, 
-    cantidad_habitaciones, tipo_habitaciones
+    Arma el cuerpo de la solicitud a OpenAI para extraer la reserva
+    
+    Args:
+        mensaje: Texto del cliente
+        fecha_actual_obj: datetime de referencia para fechas relativas
+        conocidos: Campos ya extraídos en mensajes anteriores. Si se entregan,
+            el prompt solo pide los campos que faltan.
+    
+    Returns:
+        Diccionario listo para enviar como JSON
     """
+    if conocidos:
+        return construir_solicitud_faltantes(mensaje, fecha_actual_obj, conocidos)
     
-    fecha_actual = datetime.now().strftime('%Y-%m-%d')
-    fecha_actual_obj = datetime.now()
+    fecha_actual = fecha_actual_obj.strftime('%Y-%m-%d')
     
     # Calcular fechas de referencia
     manana = (fecha_actual_obj + timedelta(days=1)).strftime('%Y-%m-%d')
@@ -58,57 +105,240 @@ Reemplaza null con los valores encontrados o mantén null si no se mencionan."""
 
     user_prompt = f'Mensaje del cliente: "{mensaje}"'
 
+    return {
+        "model": OPENAI_MODELO,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 500
+    }
+
+def construir_solicitud_faltantes(mensaje, fecha_actual_obj, conocidos):
+    """
+    Prompt reducido para continuar una reserva: entrega los datos conocidos
+    como contexto y pide solo los campos faltantes
+    """
+    fecha_actual = fecha_actual_obj.strftime('%Y-%m-%d')
+    faltantes = [campo for campo in DESCRIPCION_CAMPOS if not conocidos.get(campo)]
+    
+    lineas_campos = "\n".join(f"- {campo}: {DESCRIPCION_CAMPOS[campo]}" for campo in faltantes)
+    reglas = []
+    
+    if 'check_in' in faltantes or 'check_out' in faltantes:
+        manana = (fecha_actual_obj + timedelta(days=1)).strftime('%Y-%m-%d')
+        pasado_manana = (fecha_actual_obj + timedelta(days=2)).strftime('%Y-%m-%d')
+        reglas.append(
+            f'- "mañana" = {manana}, "pasado mañana" = {pasado_manana}, "hoy" = {fecha_actual}. '
+            'Día de semana: la fecha más cercana. Día sin mes ya pasado: mes siguiente. '
+            'Sin rango, la salida es el día siguiente a la entrada.'
+        )
+    if 'cantidad_habitaciones' in faltantes:
+        reglas.append('- cantidad_habitaciones: asume 1 solo si la reserva ya tiene fechas y personas.')
+    if 'tipo_habitaciones' in faltantes:
+        reglas.append('- tipo_habitaciones: normaliza a "single", "estandar", "superior", "doble", con cantidad si son varias ("2 estandar").')
+    
+    plantilla = json.dumps({campo: None for campo in faltantes})
+    
+    system_prompt = f"""Hoy es {fecha_actual}. Zona horaria: America/Santiago (UTC-3)
+
+Eres un extractor de información para reservas de hotel. El cliente está completando una reserva de la que ya conocemos: {json.dumps(conocidos, ensure_ascii=False)}
+
+Extrae ÚNICAMENTE estos datos si el cliente los menciona, sin inventarlos:
+{lineas_campos}
+
+Si el cliente corrige un dato ya conocido, agrégalo al JSON con el valor nuevo.
+{chr(10).join(reglas)}
+
+RESPONDE SOLO CON UN JSON VÁLIDO (sin markdown, sin backticks, sin explicaciones):
+{plantilla}"""
+
+    return {
+        "model": OPENAI_MODELO,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f'Mensaje del cliente: "{mensaje}"'}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 150
+    }
+
+def tipo_solicitud(conocidos):
+    """Prompt usado para la bitácora: completo o solo de campos faltantes"""
+    return "faltantes" if conocidos else "completa"
+
+def combinar_con_conocidos(resultado, conocidos):
+    """
+    Completa el resultado con los campos ya conocidos de la reserva. Lo que
+    trae el mensaje nuevo reemplaza a lo conocido: es una corrección del
+    cliente ("mejor somos 4")
+    """
+    if not conocidos:
+        return resultado
+    combinado = dict(conocidos)
+    combinado.update({campo: valor for campo, valor in resultado.items()
+                      if campo in DESCRIPCION_CAMPOS and valor})
+    for campo in DESCRIPCION_CAMPOS:
+        combinado.setdefault(campo, None)
+    return combinado
+
+def agregar_codigo_promocion(resultado, mensaje):
+    """
+    Agrega el código de promoción mencionado en el mensaje. Los códigos se
+    reconocen contra las reglas vigentes, sin pasar por el modelo. No se
+    guarda con la reserva a medias: el cliente lo repite al completarla.
+    """
+    codigo = detectar_codigo_promocion(mensaje)
+    if codigo:
+        resultado['codigo_promocion'] = codigo
+    return resultado
+
+def procesar_respuesta_openai(response, mensaje, fecha_actual, conocidos=None):
+    """
+    Interpreta la respuesta HTTP de OpenAI (requests o httpx)
+    
+    Returns:
+        Diccionario con la información de la reserva; usa la extracción
+        fallback si la API respondió con error
+    
+    Raises:
+        json.JSONDecodeError si el modelo no devolvió un JSON válido
+    """
+    if response.status_code == 200:
+        data = response.json()
+        texto_respuesta = data['choices'][0]['message']['content'].strip()
+        
+        # Limpiar markdown si existe
+        texto_respuesta = texto_respuesta.replace('```json', '').replace('```', '').strip()
+        
+        # Parsear JSON y completar con lo ya conocido de la reserva
+        resultado = combinar_con_conocidos(json.loads(texto_respuesta), conocidos)
+        
+        # Procesar y validar fechas
+        resultado = procesar_fechas(resultado, fecha_actual)
+        
+        # Validar y limpiar datos
+        resultado = validar_datos(resultado)
+        
+        log.debug("Información extraída por OpenAI", extra={"datos": resultado})
+        return resultado
+        
+    log.warning("Error en API OpenAI", extra={"datos": {
+        "status": response.status_code,
+        "respuesta": response.text[:500]
+    }})
+    return combinar_con_conocidos(extraccion_fallback(mensaje, conocidos), conocidos)
+
+def extraccion_local(mensaje, fecha_actual_obj, conocidos=None):
+    """
+    Resultado de la caché de plantillas para mensajes que inician una
+    reserva, o None si hay que llamar al modelo
+    """
+    if conocidos:
+        return None
+    resultado = cache_plantillas.buscar(mensaje, fecha_actual_obj)
+    if resultado is not None:
+        log.debug("Información extraída por plantilla", extra={"datos": resultado})
+    return resultado
+
+def aprender_plantilla(mensaje, resultado, fecha_actual_obj, conocidos, response, error):
+    """Enseña a la caché de plantillas las extracciones exitosas del modelo"""
+    if conocidos or error is not None or response.status_code != 200:
+        return
+    cache_plantillas.aprender(mensaje, resultado, fecha_actual_obj)
+
+def manejar_error_extraccion(error, mensaje, conocidos=None):
+    """Registra el error de la llamada a OpenAI y usa la extracción fallback"""
+    if isinstance(error, json.JSONDecodeError):
+        log.warning("Error parseando JSON de OpenAI", extra={"datos": {"error": str(error)}})
+    else:
+        log.error("Error extrayendo información", exc_info=error)
+    return combinar_con_conocidos(extraccion_fallback(mensaje, conocidos), conocidos)
+
+def extraer_informacion_reserva(mensaje, conocidos=None):
+    """
+    Extrae información de reserva usando OpenAI GPT-4
+    Retorna diccionario con: check_in, check_out, cant_personas, 
+    cantidad_habitaciones, tipo_habitaciones
+    
+    Si se entregan `conocidos` (campos de mensajes anteriores), solo se
+    piden al modelo los campos faltantes y el resultado los incluye. Los
+    mensajes con una plantilla ya aprendida se resuelven sin llamar al
+    modelo (ver plantillas.py)
+    """
+    fecha_actual_obj = datetime.now()
+    fecha_actual = fecha_actual_obj.strftime('%Y-%m-%d')
+    
+    resultado = extraccion_local(mensaje, fecha_actual_obj, conocidos)
+    if resultado is not None:
+        return agregar_codigo_promocion(resultado, mensaje)
+    
+    solicitud = construir_solicitud_openai(mensaje, fecha_actual_obj, conocidos)
+    response, error = None, None
+    inicio = time.perf_counter()
     try:
         response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {OPENAI_API_KEY}"
-            },
-            json={
-                "model": "gpt-4o-mini",
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": 0.3,
-                "max_tokens": 500
-            },
+            OPENAI_URL,
+            headers=encabezados_openai(),
+            json=solicitud,
             timeout=15
         )
-        
-        if response.status_code == 200:
-            data = response.json()
-            texto_respuesta = data['choices'][0]['message']['content'].strip()
-            
-            # Limpiar markdown si existe
-            texto_respuesta = texto_respuesta.replace('```json', '').replace('```', '').strip()
-            
-            # Parsear JSON
-            resultado = json.loads(texto_respuesta)
-            
-            # Procesar y validar fechas
-            resultado = procesar_fechas(resultado, fecha_actual)
-            
-            # Validar y limpiar datos
-            resultado = validar_datos(resultado)
-            
-            print(f"✅ Información extraída por OpenAI: {resultado}")
-            return resultado
-            
-        else:
-            print(f"⚠️ Error en API OpenAI: {response.status_code}")
-            print(f"Respuesta: {response.text}")
-            return extraccion_fallback(mensaje)
-            
-    except json.JSONDecodeError as e:
-        print(f"⚠️ Error parseando JSON de OpenAI: {e}")
-        return extraccion_fallback(mensaje)
+        latencia_ms = ms_desde(inicio)
+        log.info("Llamada a OpenAI", extra={
+            "duracion_ms": latencia_ms,
+            "datos": {"status": response.status_code}
+        })
+        resultado = procesar_respuesta_openai(response, mensaje, fecha_actual, conocidos)
     except Exception as e:
-        print(f"⚠️ Error extrayendo información: {e}")
-        import traceback
-        traceback.print_exc()
-        return extraccion_fallback(mensaje)
+        if response is None:
+            latencia_ms = ms_desde(inicio)
+        error = e
+        resultado = manejar_error_extraccion(e, mensaje, conocidos)
+    aprender_plantilla(mensaje, resultado, fecha_actual_obj, conocidos, response, error)
+    bitacora.registrar_llamada(tipo_solicitud(conocidos), solicitud, latencia_ms, response, error)
+    return agregar_codigo_promocion(resultado, mensaje)
+
+async def extraer_informacion_reserva_async(mensaje, cliente, conocidos=None):
+    """
+    Versión asíncrona de extraer_informacion_reserva
+    
+    Args:
+        mensaje: Texto del cliente
+        cliente: httpx.AsyncClient compartido por el proceso
+        conocidos: Campos ya extraídos en mensajes anteriores
+    """
+    fecha_actual_obj = datetime.now()
+    fecha_actual = fecha_actual_obj.strftime('%Y-%m-%d')
+    
+    resultado = extraccion_local(mensaje, fecha_actual_obj, conocidos)
+    if resultado is not None:
+        return agregar_codigo_promocion(resultado, mensaje)
+    
+    solicitud = construir_solicitud_openai(mensaje, fecha_actual_obj, conocidos)
+    response, error = None, None
+    inicio = time.perf_counter()
+    try:
+        response = await cliente.post(
+            OPENAI_URL,
+            headers=encabezados_openai(),
+            json=solicitud,
+            timeout=15
+        )
+        latencia_ms = ms_desde(inicio)
+        log.info("Llamada a OpenAI", extra={
+            "duracion_ms": latencia_ms,
+            "datos": {"status": response.status_code}
+        })
+        resultado = procesar_respuesta_openai(response, mensaje, fecha_actual, conocidos)
+    except Exception as e:
+        if response is None:
+            latencia_ms = ms_desde(inicio)
+        error = e
+        resultado = manejar_error_extraccion(e, mensaje, conocidos)
+    aprender_plantilla(mensaje, resultado, fecha_actual_obj, conocidos, response, error)
+    bitacora.registrar_llamada(tipo_solicitud(conocidos), solicitud, latencia_ms, response, error)
+    return agregar_codigo_promocion(resultado, mensaje)
 
 def procesar_fechas(resultado, fecha_actual_str):
     """Procesa y normaliza las fechas extraídas"""
@@ -216,33 +446,17 @@ def validar_datos(resultado):
     
     # Normalizar tipo_habitaciones
     if resultado.get('tipo_habitaciones'):
-        tipo_str = resultado['tipo_habitaciones'].lower()
-        
-        # Normalizar caracteres
-        tipo_str = (tipo_str
-            .replace('á', 'a')
-            .replace('é', 'e')
-            .replace('í', 'i')
-            .replace('ó', 'o')
-            .replace('ú', 'u'))
-        
-        resultado['tipo_habitaciones'] = tipo_str
+        resultado['tipo_habitaciones'] = normalizar_texto(resultado['tipo_habitaciones'])
     
     return resultado
 
-def extraccion_fallback(mensaje):
-    """Extracción básica sin IA cuando falla la API"""
-    import re
-    
-    mensaje_lower = mensaje.lower()
-    
-    # Normalizar caracteres
-    mensaje_lower = (mensaje_lower
-        .replace('á', 'a')
-        .replace('é', 'e')
-        .replace('í', 'i')
-        .replace('ó', 'o')
-        .replace('ú', 'u'))
+def extraccion_fallback(mensaje, conocidos=None):
+    """
+    Extracción básica sin IA cuando falla la API. Con `conocidos` no se
+    asume la cantidad de habitaciones si ya se conoce, para no pisarla
+    """
+    tokens = tokenizar(mensaje)
+    firma_tokens = firma(tokens)
     
     resultado = {
         "check_in": None,
@@ -252,71 +466,44 @@ def extraccion_fallback(mensaje):
         "tipo_habitaciones": None
     }
     
-    # Intentar extraer cantidad de personas
-    personas_patterns = [
-        r'(\d+)\s*persona',
-        r'para\s+(\d+)',
-        r'somos\s+(\d+)'
-    ]
-    
-    for pattern in personas_patterns:
-        match = re.search(pattern, mensaje_lower)
-        if match:
-            resultado['cant_personas'] = match.group(1)
+    # Intentar extraer cantidad de personas: "4 personas", "para 4", "somos 4"
+    for secuencia, indice in SECUENCIAS_PERSONAS:
+        encontrada = buscar_secuencia(tokens, secuencia, firma_tokens)
+        if encontrada:
+            resultado['cant_personas'] = str(encontrada[indice].valor)
             break
     
-    # Intentar extraer habitaciones
-    habitaciones_patterns = [
-        r'(\d+)\s*habitaci',
-        r'(\d+)\s*cuarto',
-        r'(\d+)\s*pieza'
-    ]
-    
-    for pattern in habitaciones_patterns:
-        match = re.search(pattern, mensaje_lower)
-        if match:
-            resultado['cantidad_habitaciones'] = match.group(1)
-            break
+    # Intentar extraer habitaciones: "2 habitaciones", "2 cuartos", "2 piezas"
+    encontrada = buscar_secuencia(tokens, SECUENCIA_HABITACIONES, firma_tokens)
+    if encontrada:
+        resultado['cantidad_habitaciones'] = str(encontrada[0].valor)
     
     # Si no encontró habitaciones pero encontró personas, asumir 1 habitación
-    if resultado['cant_personas'] and not resultado['cantidad_habitaciones']:
+    if (resultado['cant_personas'] and not resultado['cantidad_habitaciones']
+            and not (conocidos or {}).get('cantidad_habitaciones')):
         resultado['cantidad_habitaciones'] = '1'
     
     # Detectar tipos de habitaciones
-    tipos = []
-    
-    if 'single' in mensaje_lower or 'sencilla' in mensaje_lower:
-        tipos.append('single')
-    if 'estandar' in mensaje_lower or 'standard' in mensaje_lower:
-        tipos.append('estandar')
-    if 'superior' in mensaje_lower:
-        tipos.append('superior')
-    if 'doble' in mensaje_lower:
-        tipos.append('doble')
+    tipos = tipos_mencionados(tokens)
     
     if tipos:
         resultado['tipo_habitaciones'] = ', '.join(tipos)
     
-    # Intentar detectar fechas con "mañana", "hoy", etc.
+    # Intentar detectar fechas con "mañana", "hoy", "pasado mañana"
     fecha_actual = datetime.now()
     
-    if 'manana' in mensaje_lower or 'mañana' in mensaje_lower:
-        resultado['check_in'] = (fecha_actual + timedelta(days=1)).strftime('%Y-%m-%d')
-        resultado['check_out'] = (fecha_actual + timedelta(days=2)).strftime('%Y-%m-%d')
-    elif 'hoy' in mensaje_lower:
-        resultado['check_in'] = fecha_actual.strftime('%Y-%m-%d')
-        resultado['check_out'] = (fecha_actual + timedelta(days=1)).strftime('%Y-%m-%d')
-    elif 'pasado manana' in mensaje_lower:
-        resultado['check_in'] = (fecha_actual + timedelta(days=2)).strftime('%Y-%m-%d')
-        resultado['check_out'] = (fecha_actual + timedelta(days=3)).strftime('%Y-%m-%d')
+    for token in tokens:
+        if token.tipo == FECHA:
+            resultado['check_in'] = (fecha_actual + timedelta(days=token.valor)).strftime('%Y-%m-%d')
+            resultado['check_out'] = (fecha_actual + timedelta(days=token.valor + 1)).strftime('%Y-%m-%d')
+            break
     
     # Intentar detectar rangos de fechas (del X al Y)
-    rango_pattern = r'del\s+(\d+)\s+al\s+(\d+)'
-    match = re.search(rango_pattern, mensaje_lower)
+    encontrada = buscar_secuencia(tokens, SECUENCIA_RANGO, firma_tokens)
     
-    if match:
-        dia_inicio = int(match.group(1))
-        dia_fin = int(match.group(2))
+    if encontrada:
+        dia_inicio = encontrada[1].valor
+        dia_fin = encontrada[3].valor
         
         mes_actual = fecha_actual.month
         año_actual = fecha_actual.year
@@ -328,11 +515,8 @@ def extraccion_fallback(mensaje):
                 mes_actual = 1
                 año_actual += 1
         
-        try:
-            resultado['check_in'] = f"{año_actual}-{mes_actual:02d}-{dia_inicio:02d}"
-            resultado['check_out'] = f"{año_actual}-{mes_actual:02d}-{dia_fin:02d}"
-        except:
-            pass
+        resultado['check_in'] = f"{año_actual}-{mes_actual:02d}-{dia_inicio:02d}"
+        resultado['check_out'] = f"{año_actual}-{mes_actual:02d}-{dia_fin:02d}"
     
-    print(f"⚠️ Usando extracción fallback: {resultado}")
-    return resultado
\ No newline at end of file
+    log.info("Usando extracción fallback", extra={"datos": resultado})
+    return resultado
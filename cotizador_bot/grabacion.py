@@ -0,0 +1,302 @@
+"""
+Grabación y reproducción del tráfico del webhook para pruebas de capacidad.
+
+Grabación: con COTIZADOR_GRABACION=<directorio>, cada payload que llega al
+webhook se encola junto con su hora de llegada; un hilo escritor lo redacta
+y lo agrega a un archivo JSONL comprimido (captura_<inicio>.jsonl.gz). La
+redacción elimina claves sensibles (apikey, pushName, ...), reemplaza los
+números de teléfono por seudónimos estables (el mismo número siempre da el
+mismo seudónimo, así se conserva qué mensajes son de la misma conversación)
+y oculta los correos.
+
+Reproducción contra una instancia local:
+    python grabacion.py reproducir captura.jsonl.gz --velocidad 10 --salida run_b.json
+    python grabacion.py comparar run_a.json run_b.json
+
+La velocidad es 1, 10 (o cualquier factor) o "max". Los mensajes de un mismo
+número se envían en orden y cada uno espera la respuesta del anterior; los
+números distintos van en paralelo. Cada reproducción usa message_id nuevos y
+timestamps actuales para que la instancia no los descarte como duplicados o
+antiguos. Los eventos que no son mensajes (contacts.update, presence.update,
+...) van todos en un grupo propio, en su orden de llegada. Los seudónimos no
+coinciden con NUMERO_AUTORIZADO: la instancia de prueba debe correr con
+COTIZADOR_NUMERO_AUTORIZADO="*".
+"""
+import argparse
+import asyncio
+import atexit
+import copy
+import gzip
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from config import GRABACION_DIR, GRABACION_MAX_COLA, WEBHOOK_TOKEN
+from registro import obtener_logger, digest_numero
+from estadisticas import percentil
+
+log = obtener_logger("grabacion")
+
+CLAVES_REDACTADAS = {'apikey', 'pushName', 'sender', 'server_url', 'owner', 'profilePicUrl'}
+PATRON_TELEFONO = re.compile(r'\d{7,}')
+# Correos, sin tocar los JID de WhatsApp (numero@s.whatsapp.net, grupo@g.us)
+PATRON_CORREO = re.compile(r'[\w.+-]+@(?!s\.whatsapp\.net|g\.us)[\w-]+\.[\w.]+')
+
+def seudonimo(numero):
+    """Reemplazo estable de un número, con la misma cantidad de dígitos"""
+    digitos = str(int(digest_numero(numero), 16))
+    return digitos[:len(numero)]
+
+def redactar(valor):
+    """Copia del payload sin claves sensibles, con teléfonos y correos ocultos"""
+    if isinstance(valor, dict):
+        return {clave: redactar(v) for clave, v in valor.items() if clave not in CLAVES_REDACTADAS}
+    if isinstance(valor, list):
+        return [redactar(v) for v in valor]
+    if isinstance(valor, str):
+        valor = PATRON_CORREO.sub('correo@redactado', valor)
+        return PATRON_TELEFONO.sub(lambda m: seudonimo(m.group()), valor)
+    return valor
+
+class Grabador:
+    """Escritor en segundo plano de la captura del webhook"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.cola = queue.Queue(maxsize=GRABACION_MAX_COLA)
+        self.hilo = None
+        self.lock = threading.Lock()
+        self.descartados = 0
+
+    def registrar(self, payload):
+        """
+        Encola el payload tal como llegó (bytes crudos o ya parseado); no
+        bloquea la solicitud: el parseo y la redacción ocurren en el escritor
+        """
+        if self.hilo is None:
+            self._iniciar()
+        try:
+            self.cola.put_nowait((time.time(), payload))
+        except queue.Full:
+            with self.lock:
+                self.descartados += 1
+
+    def estadisticas(self):
+        with self.lock:
+            descartados = self.descartados
+        return {"activa": True, "pendientes": self.cola.qsize(), "descartados_cola_llena": descartados}
+
+    def _iniciar(self):
+        with self.lock:
+            if self.hilo is not None:
+                return
+            os.makedirs(self.directorio, exist_ok=True)
+            self.ruta = os.path.join(self.directorio, f"captura_{int(time.time())}.jsonl.gz")
+            self.hilo = threading.Thread(target=self._escribir, name="grabacion", daemon=True)
+            self.hilo.start()
+            atexit.register(self._detener)
+
+    def _escribir(self):
+        with gzip.open(self.ruta, 'at', encoding='utf-8') as archivo:
+            while True:
+                llegada, payload = self.cola.get()
+                if payload is None:
+                    return
+                try:
+                    if isinstance(payload, (bytes, bytearray)):
+                        payload = json.loads(payload)
+                    linea = json.dumps({"t": llegada, "payload": redactar(payload)}, ensure_ascii=False)
+                except (TypeError, ValueError):
+                    log.exception("Payload no grabable")
+                    continue
+                archivo.write(linea + "\n")
+                # Sin más payloads pendientes se vacía el buffer, así la
+                # captura es legible aunque el proceso termine abruptamente
+                if self.cola.empty():
+                    archivo.flush()
+
+    def _detener(self):
+        self.cola.put((None, None))
+        self.hilo.join(timeout=5)
+
+class _GrabadorNulo:
+    def registrar(self, payload):
+        pass
+
+    def estadisticas(self):
+        return {"activa": False}
+
+grabador = Grabador(GRABACION_DIR) if GRABACION_DIR else _GrabadorNulo()
+
+def leer_captura(ruta):
+    """
+    Retorna la lista de (llegada, payload) de una captura, en orden de llegada.
+    Tolera una última línea truncada (captura de un proceso en curso).
+    """
+    eventos = []
+    with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+        try:
+            for linea in archivo:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    continue
+                eventos.append((registro["t"], registro["payload"]))
+        except EOFError:
+            pass
+    eventos.sort(key=lambda evento: evento[0])
+    return eventos
+
+def _clave(payload):
+    """key del mensaje, o {} si el evento no es un mensaje (contacts.update trae una lista en data)"""
+    datos = payload.get('data') if isinstance(payload, dict) else None
+    clave = datos.get('key') if isinstance(datos, dict) else None
+    return clave if isinstance(clave, dict) else {}
+
+def _numero(payload):
+    """Número del remitente; "" para los eventos que no son mensajes"""
+    remote_jid = _clave(payload).get('remoteJid') or ''
+    return remote_jid.split('@')[0]
+
+def _preparar(payload, sufijo):
+    """Copia del payload con message_id único para esta corrida y timestamp actual"""
+    payload = copy.deepcopy(payload)
+    datos = payload.get('data') if isinstance(payload, dict) else None
+    if isinstance(datos, dict):
+        key = datos.get('key')
+        if isinstance(key, dict) and key.get('id'):
+            key['id'] = f"{key['id']}{sufijo}"
+        if 'messageTimestamp' in datos:
+            datos['messageTimestamp'] = int(time.time())
+    return payload
+
+async def _reproducir_conversacion(cliente, url, eventos, inicio, t0, velocidad, sufijo, resultados):
+    for llegada, payload in eventos:
+        if velocidad:
+            espera = inicio + (llegada - t0) / velocidad - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+
+        enviado = time.monotonic()
+        resultado = {
+            "id": _clave(payload).get('id'),
+            "numero": _numero(payload),
+            "offset_ms": round((enviado - inicio) * 1000, 1),
+        }
+        try:
+            response = await cliente.post(url, json=_preparar(payload, sufijo))
+            resultado["http"] = response.status_code
+            try:
+                cuerpo = response.json()
+                resultado["estado"] = cuerpo.get("status") or cuerpo.get("error")
+            except ValueError:
+                resultado["estado"] = None
+        except Exception as e:
+            resultado["http"] = None
+            resultado["estado"] = f"excepcion:{type(e).__name__}"
+        resultado["latencia_ms"] = round((time.monotonic() - enviado) * 1000, 1)
+        resultados.append(resultado)
+
+async def reproducir(ruta, url, token=WEBHOOK_TOKEN, velocidad=1.0, conexiones=100, timeout=120):
+    """
+    Envía la captura al webhook respetando los tiempos originales divididos
+    por `velocidad` (None: lo más rápido posible)
+
+    Returns:
+        Lista de resultados por mensaje: id, numero, offset_ms, http,
+        estado y latencia_ms
+    """
+    import httpx  # Solo la reproducción lo necesita; app.py no depende de httpx
+
+    eventos = leer_captura(ruta)
+    if not eventos:
+        return []
+
+    por_numero = defaultdict(list)
+    for evento in eventos:
+        por_numero[_numero(evento[1])].append(evento)
+
+    resultados = []
+    sufijo = f"-r{int(time.time())}"
+    limites = httpx.Limits(max_connections=conexiones, max_keepalive_connections=conexiones)
+    async with httpx.AsyncClient(limits=limites, timeout=timeout, params={"token": token}) as cliente:
+        inicio = time.monotonic()
+        await asyncio.gather(*[
+            _reproducir_conversacion(cliente, url, lista, inicio, eventos[0][0], velocidad, sufijo, resultados)
+            for lista in por_numero.values()
+        ])
+    return resultados
+
+def resumir(resultados):
+    latencias = [r["latencia_ms"] for r in resultados]
+    print(f"Mensajes: {len(resultados)}")
+    if latencias:
+        print("Latencia ms: " + " | ".join(
+            f"p{p}: {percentil(latencias, p):.0f}" for p in (50, 90, 95, 99)
+        ) + f" | máx: {max(latencias):.0f}")
+    print("HTTP:    " + ", ".join(f"{k}: {v}" for k, v in Counter(r["http"] for r in resultados).most_common()))
+    print("Estados: " + ", ".join(f"{k}: {v}" for k, v in Counter(r["estado"] for r in resultados).most_common()))
+
+def comparar(base, nuevo):
+    """Imprime la diferencia de latencias y resultados entre dos corridas"""
+    for titulo, resultados in (("Base", base), ("Nuevo", nuevo)):
+        print(f"--- {titulo}")
+        resumir(resultados)
+
+    print("--- Latencia (nuevo - base)")
+    for p in (50, 95, 99):
+        a = percentil([r["latencia_ms"] for r in base], p)
+        b = percentil([r["latencia_ms"] for r in nuevo], p)
+        print(f"  p{p}: {b - a:+.0f} ms")
+
+    anteriores = {r["id"]: r for r in base}
+    cambios = Counter()
+    for r in nuevo:
+        anterior = anteriores.get(r["id"])
+        if anterior is None:
+            cambios[("(nuevo)", f"{r['http']}/{r['estado']}")] += 1
+        elif (anterior["http"], anterior["estado"]) != (r["http"], r["estado"]):
+            cambios[(f"{anterior['http']}/{anterior['estado']}", f"{r['http']}/{r['estado']}")] += 1
+
+    print(f"--- Resultados distintos: {sum(cambios.values())} de {len(nuevo)}")
+    for (antes, despues), cantidad in cambios.most_common():
+        print(f"  {antes} -> {despues}: {cantidad}")
+
+def _leer_resultados(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)["resultados"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproducción de capturas del webhook")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    rep = comandos.add_parser("reproducir")
+    rep.add_argument("captura")
+    rep.add_argument("--url", default="http://localhost:5000/webhook")
+    rep.add_argument("--token", default=WEBHOOK_TOKEN)
+    rep.add_argument("--velocidad", default="1", help='Factor (1, 10, ...) o "max"')
+    rep.add_argument("--conexiones", type=int, default=100)
+    rep.add_argument("--salida", help="Guarda los resultados para comparar corridas")
+
+    comp = comandos.add_parser("comparar")
+    comp.add_argument("base")
+    comp.add_argument("nuevo")
+
+    args = parser.parse_args()
+
+    if args.comando == "reproducir":
+        velocidad = None if args.velocidad == "max" else float(args.velocidad)
+        resultados = asyncio.run(reproducir(args.captura, args.url, args.token, velocidad, args.conexiones))
+        resumir(resultados)
+        if args.salida:
+            with open(args.salida, 'w', encoding='utf-8') as archivo:
+                json.dump({
+                    "captura": args.captura,
+                    "velocidad": args.velocidad,
+                    "resultados": resultados,
+                }, archivo, ensure_ascii=False)
+    else:
+        comparar(_leer_resultados(args.base), _leer_resultados(args.nuevo))
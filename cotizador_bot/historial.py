@@ -0,0 +1,331 @@
+"""
+Historial de cotizaciones en columnas, para analizar demanda y precios.
+
+Cada cotización generada agrega una fila: fechas, noches, personas, mezcla
+de habitaciones, totales de calcular_totales y si se generó el PDF. Cada
+columna es un archivo de valores binarios de ancho fijo (HISTORIAL_DIR/
+<columna>.<tipo numpy>) al que solo se agrega al final; la fila i es el
+elemento i de todos los archivos. Son 59 bytes por cotización.
+
+Para leer, las columnas se mapean en memoria con numpy.memmap y el análisis
+es vectorizado: millones de cotizaciones se agregan en segundos sin pasar
+por diccionarios de Python.
+
+Si una escritura falla a mitad de una fila las columnas ya escritas se
+recortan en el momento; si el proceso muere, la lectura usa solo las filas
+completas y la siguiente apertura recorta el resto. Entre procesos las filas se escriben con un lock de archivo (fcntl).
+
+Análisis:
+    python historial.py [directorio] [--periodo dia|semana|mes] [--desde YYYY-MM-DD] [--hasta YYYY-MM-DD]
+"""
+import argparse
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+from config import HISTORIAL_DIR
+from lexico import ORDEN_TIPOS
+from precios import NOMBRES_TIPO_HABITACION, formatear_precio
+from registro import obtener_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo el lock entre hilos
+    fcntl = None
+
+log = obtener_logger("historial")
+
+COLUMNAS = (
+    ("ts", "<f8"),  # Hora de la cotización (epoch)
+    ("check_in", "<i4"),  # Días desde 1970-01-01
+    ("noches", "<u2"),
+    ("personas", "<u2"),
+    ("habitaciones", "<u2"),
+    *((f"hab_{tipo}", "<u2") for tipo in ORDEN_TIPOS),
+    ("subtotal", "<i8"),
+    ("descuentos", "<i8"),
+    ("total_neto", "<i8"),
+    ("total_bruto", "<i8"),
+    ("pdf", "u1"),  # 1 si el PDF se generó
+)
+
+TIPO_POR_NOMBRE = {nombre: tipo for tipo, nombre in NOMBRES_TIPO_HABITACION.items()}
+
+def archivo_columna(directorio, nombre, dtype):
+    return os.path.join(directorio, f"{nombre}.{np.dtype(dtype).str[1:]}")
+
+def fila_cotizacion(info_reserva, cantidad_noches, totales, pdf, ts=None):
+    """Valores de una cotización en el orden de COLUMNAS"""
+    check_in = datetime.strptime(info_reserva['check_in'], '%Y-%m-%d')
+    por_tipo = dict.fromkeys(ORDEN_TIPOS, 0)
+    for hab in totales['habitaciones']:
+        tipo = TIPO_POR_NOMBRE.get(hab['tipo'])
+        if tipo:
+            por_tipo[tipo] += hab['cantidad']
+    try:
+        personas = int(info_reserva.get('cant_personas') or 0)
+    except ValueError:
+        personas = 0
+    return (
+        time.time() if ts is None else ts,
+        (check_in - datetime(1970, 1, 1)).days,
+        cantidad_noches,
+        personas,
+        sum(hab['cantidad'] for hab in totales['habitaciones']),
+        *(por_tipo[tipo] for tipo in ORDEN_TIPOS),
+        totales['subtotal'],
+        totales.get('total_descuentos', 0),
+        totales['total_neto'],
+        totales['total_bruto'],
+        int(pdf),
+    )
+
+class Historial:
+    """Escritor del historial; los archivos se abren en la primera cotización"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.lock = threading.Lock()
+        self.archivos = None
+        self.archivo_lock = None
+
+    def _abrir(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        self.archivo_lock = open(os.path.join(self.directorio, ".lock"), "a")
+        with self._exclusivo():
+            reparar(self.directorio)
+            # Sin buffer: lo que falla al escribir no queda pendiente para después
+            self.archivos = [
+                open(archivo_columna(self.directorio, nombre, dtype), "ab", buffering=0)
+                for nombre, dtype in COLUMNAS
+            ]
+
+    @contextmanager
+    def _exclusivo(self):
+        """Lock entre procesos para que las filas no se intercalen"""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self.archivo_lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.archivo_lock.fileno(), fcntl.LOCK_UN)
+
+    def agregar(self, columnas):
+        """
+        Agrega filas al historial
+
+        Args:
+            columnas: Una secuencia de valores por columna, en el orden de
+                COLUMNAS y todas del mismo largo
+        """
+        datos = [np.asarray(valores, dtype=dtype).tobytes() for (_, dtype), valores in zip(COLUMNAS, columnas)]
+        with self.lock:
+            if self.archivos is None:
+                self._abrir()
+            with self._exclusivo():
+                filas = self._filas_escritas()
+                try:
+                    for archivo, bloque in zip(self.archivos, datos):
+                        vista = memoryview(bloque)
+                        while vista:
+                            vista = vista[archivo.write(vista):]
+                except OSError:
+                    # Las columnas ya escritas quedarían una fila adelantadas
+                    # y desalinearían todas las siguientes
+                    recortar(self.directorio, filas)
+                    raise
+
+    def _filas_escritas(self):
+        """
+        Filas completas según la última columna, la última que se escribe;
+        con el lock tomado. Un fstat del archivo ya abierto en vez de revisar
+        todas las columnas, y cuenta también las filas de otros procesos
+        """
+        _, dtype = COLUMNAS[-1]
+        return os.fstat(self.archivos[-1].fileno()).st_size // np.dtype(dtype).itemsize
+
+    def registrar(self, info_reserva, cantidad_noches, totales, pdf):
+        """
+        Anota una cotización; un error de disco o un valor fuera del rango de
+        su columna (más de 65535 noches) no afecta la respuesta al cliente
+        """
+        try:
+            self.agregar([[valor] for valor in fila_cotizacion(info_reserva, cantidad_noches, totales, pdf)])
+        except (OSError, ValueError, KeyError, TypeError, OverflowError):
+            log.exception("Error escribiendo el historial de cotizaciones")
+
+class _HistorialNulo:
+    def agregar(self, columnas):
+        pass
+
+    def registrar(self, info_reserva, cantidad_noches, totales, pdf):
+        pass
+
+historial = Historial(HISTORIAL_DIR) if HISTORIAL_DIR else _HistorialNulo()
+
+def filas_completas(directorio):
+    """Filas presentes en todas las columnas"""
+    filas = []
+    for nombre, dtype in COLUMNAS:
+        ruta = archivo_columna(directorio, nombre, dtype)
+        filas.append(os.path.getsize(ruta) // np.dtype(dtype).itemsize if os.path.exists(ruta) else 0)
+    return min(filas)
+
+def reparar(directorio):
+    """Recorta las columnas a las filas completas (escritura interrumpida)"""
+    recortar(directorio, filas_completas(directorio))
+
+def recortar(directorio, filas):
+    """Deja todas las columnas con `filas` filas"""
+    for nombre, dtype in COLUMNAS:
+        ruta = archivo_columna(directorio, nombre, dtype)
+        largo = filas * np.dtype(dtype).itemsize
+        if os.path.exists(ruta) and os.path.getsize(ruta) != largo:
+            log.warning("Columna recortada", extra={"datos": {"columna": nombre, "bytes": os.path.getsize(ruta) - largo}})
+            os.truncate(ruta, largo)
+
+def cargar(directorio):
+    """
+    Returns:
+        Diccionario columna -> arreglo de solo lectura (numpy.memmap)
+    """
+    filas = filas_completas(directorio)
+    if not filas:
+        return {nombre: np.empty(0, dtype=dtype) for nombre, dtype in COLUMNAS}
+    return {
+        nombre: np.memmap(archivo_columna(directorio, nombre, dtype), dtype=dtype, mode="r", shape=(filas,))
+        for nombre, dtype in COLUMNAS
+    }
+
+def _dias(fecha):
+    return (datetime.strptime(fecha, "%Y-%m-%d") - datetime(1970, 1, 1)).days
+
+def agrupar_fechas(dias, periodo):
+    """Días desde 1970 -> inicio del día, semana (lunes) o mes, como datetime64[D]"""
+    if periodo == "semana":
+        # 1970-01-01 fue jueves
+        dias = dias - (dias + 3) % 7
+    fechas = dias.astype("datetime64[D]")
+    if periodo == "mes":
+        fechas = fechas.astype("datetime64[M]").astype("datetime64[D]")
+    return fechas
+
+def analizar(columnas, periodo="mes", desde=None, hasta=None):
+    """
+    Agregados del historial; todas las operaciones son sobre arreglos
+
+    Args:
+        desde, hasta: Filtran por fecha de la cotización (YYYY-MM-DD, inclusive)
+
+    Returns:
+        Diccionario con los totales, la demanda por período de check-in, la
+        mezcla de habitaciones y la distribución de noches
+    """
+    dia_cotizacion = (columnas["ts"] // 86400).astype(np.int32)
+    filtro = np.ones(len(dia_cotizacion), dtype=bool)
+    if desde:
+        filtro &= dia_cotizacion >= _dias(desde)
+    if hasta:
+        filtro &= dia_cotizacion <= _dias(hasta)
+    if not filtro.all():
+        columnas = {nombre: valores[filtro] for nombre, valores in columnas.items()}
+        dia_cotizacion = dia_cotizacion[filtro]
+
+    cantidad = len(dia_cotizacion)
+    if not cantidad:
+        return {"cotizaciones": 0}
+
+    noches = columnas["noches"].astype(np.int64)
+    habitaciones = columnas["habitaciones"].astype(np.int64)
+    check_in = columnas["check_in"].astype(np.int64)
+    total_bruto = columnas["total_bruto"]
+
+    periodos, indice, conteo = np.unique(
+        agrupar_fechas(check_in, periodo), return_inverse=True, return_counts=True
+    )
+    demanda = {
+        "periodos": periodos,
+        "cotizaciones": conteo,
+        "noches_habitacion": np.bincount(indice, weights=habitaciones * noches),
+        "personas": np.bincount(indice, weights=columnas["personas"]),
+        "total_promedio": np.bincount(indice, weights=total_bruto) / conteo,
+    }
+
+    mezcla = {}
+    for tipo in ORDEN_TIPOS:
+        por_tipo = columnas[f"hab_{tipo}"].astype(np.int64)
+        mezcla[tipo] = {
+            "habitaciones": int(por_tipo.sum()),
+            "noches_habitacion": int((por_tipo * noches).sum()),
+            "cotizaciones": int(np.count_nonzero(por_tipo)),
+        }
+
+    anticipacion = check_in - dia_cotizacion
+    subtotal = int(columnas["subtotal"].sum())
+    return {
+        "cotizaciones": cantidad,
+        "con_pdf": int(columnas["pdf"].sum()),
+        "noches_promedio": float(noches.mean()),
+        "noches_mediana": float(np.median(noches)),
+        "personas_promedio": float(columnas["personas"].mean()),
+        "habitaciones_promedio": float(habitaciones.mean()),
+        "anticipacion_promedio": float(anticipacion.mean()),
+        "anticipacion_mediana": float(np.median(anticipacion)),
+        "total_promedio": float(total_bruto.mean()),
+        "descuento_promedio": int(columnas["descuentos"].sum()) / subtotal if subtotal else 0.0,
+        "noches": np.bincount(np.minimum(noches, 15), minlength=16),
+        "demanda": demanda,
+        "mezcla": mezcla,
+    }
+
+def reporte(directorio, periodo="mes", desde=None, hasta=None, limite=24):
+    inicio = time.perf_counter()
+    resultado = analizar(cargar(directorio), periodo, desde, hasta)
+    duracion = time.perf_counter() - inicio
+
+    cantidad = resultado["cotizaciones"]
+    print(f"Cotizaciones: {cantidad:,} (analizadas en {duracion:.2f} s)")
+    if not cantidad:
+        return
+
+    print(f"Con PDF: {resultado['con_pdf']:,} ({resultado['con_pdf'] / cantidad:.1%})")
+    print(f"Estadía: {resultado['noches_promedio']:.2f} noches promedio, mediana {resultado['noches_mediana']:.0f}")
+    print(f"Grupo: {resultado['personas_promedio']:.2f} personas, {resultado['habitaciones_promedio']:.2f} habitaciones")
+    print(f"Anticipación: {resultado['anticipacion_promedio']:.1f} días promedio, mediana {resultado['anticipacion_mediana']:.0f}")
+    print(f"Total promedio: {formatear_precio(round(resultado['total_promedio']))} | "
+          f"descuento promedio: {resultado['descuento_promedio']:.1%} del subtotal")
+
+    demanda = resultado["demanda"]
+    print(f"\nDemanda por {periodo} de check-in (últimos {limite})")
+    print(f"{'desde':12} {'cotiz.':>9} {'hab-noche':>10} {'personas':>9} {'total prom.':>12}")
+    for i in range(max(0, len(demanda["periodos"]) - limite), len(demanda["periodos"])):
+        print(f"{str(demanda['periodos'][i]):12} {demanda['cotizaciones'][i]:9,d} "
+              f"{demanda['noches_habitacion'][i]:10,.0f} {demanda['personas'][i]:9,.0f} "
+              f"{formatear_precio(round(demanda['total_promedio'][i])):>12}")
+
+    mezcla = resultado["mezcla"]
+    total_habitaciones = sum(m["habitaciones"] for m in mezcla.values()) or 1
+    total_noches = sum(m["noches_habitacion"] for m in mezcla.values()) or 1
+    print(f"\n{'tipo':10} {'habitaciones':>12} {'%':>6} {'hab-noche':>10} {'%':>6} {'cotiz.':>9}")
+    for tipo, m in mezcla.items():
+        print(f"{tipo:10} {m['habitaciones']:12,d} {m['habitaciones'] / total_habitaciones:6.1%} "
+              f"{m['noches_habitacion']:10,d} {m['noches_habitacion'] / total_noches:6.1%} {m['cotizaciones']:9,d}")
+
+    print("\nNoches: " + " | ".join(
+        f"{n if n < 15 else '15+'}: {c / cantidad:.1%}"
+        for n, c in enumerate(resultado["noches"]) if c
+    ))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análisis del historial de cotizaciones")
+    parser.add_argument("directorio", nargs="?", default=HISTORIAL_DIR or "historial_cotizaciones")
+    parser.add_argument("--periodo", choices=("dia", "semana", "mes"), default="mes")
+    parser.add_argument("--desde", help="Fecha de cotización YYYY-MM-DD")
+    parser.add_argument("--hasta", help="Fecha de cotización YYYY-MM-DD")
+    parser.add_argument("--limite", type=int, default=24, help="Períodos a mostrar")
+    args = parser.parse_args()
+    reporte(args.directorio, args.periodo, args.desde, args.hasta, args.limite)
@@ -0,0 +1,191 @@
+"""
+Clasificador local de intención para no enviar al LLM los mensajes que no
+son una reserva ("hola", "gracias", "¿tienen estacionamiento?").
+
+Modelo: regresión logística multiclase sobre n-gramas hasheados (palabras,
+bigramas, trigramas de caracteres y los tipos de token del léxico). Se
+entrena una sola vez con el dataset etiquetado INTENCIONES_DATASET (TSV
+"etiqueta<TAB>texto"); app.py y app_async.py lo entrenan al arrancar y
+clasificar un mensaje toma microsegundos. Sin dataset todo mensaje va a la
+extracción.
+
+Solo se responde sin LLM cuando la intención no es reserva y su probabilidad
+supera INTENCION_UMBRAL; en cualquier otro caso el mensaje sigue a la
+extracción. Para calibrar el umbral:
+    python intenciones.py
+"""
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+from config import INTENCIONES_DATASET, INTENCION_UMBRAL
+from lexico import normalizar_texto, tokenizar, UNIDAD
+from registro import obtener_logger
+
+log = obtener_logger("intenciones")
+
+RESERVA = "reserva"
+PRECIOS = "precios"
+SALUDO = "saludo"
+GRACIAS = "gracias"
+SERVICIOS = "servicios"
+
+ETIQUETAS = [RESERVA, PRECIOS, SALUDO, GRACIAS, SERVICIOS]
+
+DIMENSION = 2 ** 14
+EPOCAS = 40
+TASA_APRENDIZAJE = 0.5
+REGULARIZACION = 1e-4
+
+_PALABRAS = re.compile(r'\w+')
+
+Modelo = namedtuple('Modelo', ['pesos', 'etiquetas'])
+
+@lru_cache(maxsize=65536)
+def _hash(caracteristica):
+    # crc32 es estable entre procesos (hash() de str no lo es)
+    return zlib.crc32(caracteristica.encode()) % DIMENSION
+
+def caracteristicas(texto):
+    """Índices hasheados de las características del texto"""
+    normalizado = normalizar_texto(texto).strip()
+    palabras = _PALABRAS.findall(normalizado)
+
+    nombres = ["sesgo"]
+    nombres += [f"w:{p}" for p in palabras]
+    nombres += [f"b:{a}_{b}" for a, b in zip(palabras, palabras[1:])]
+    for palabra in palabras:
+        relleno = f" {palabra} "
+        nombres += [f"c:{relleno[i:i + 3]}" for i in range(len(relleno) - 2)]
+    for token in tokenizar(normalizado):
+        nombres.append(f"t:{token.tipo}:{token.valor}" if token.tipo == UNIDAD else f"t:{token.tipo}")
+    if not palabras and normalizado:
+        # Solo emojis o signos
+        nombres.append(f"s:{normalizado[:8]}")
+
+    return np.array([_hash(nombre) for nombre in nombres], dtype=np.intp)
+
+def _probabilidades(pesos, indices):
+    puntajes = pesos[indices].sum(axis=0) / np.sqrt(len(indices))
+    puntajes = np.exp(puntajes - puntajes.max())
+    return puntajes / puntajes.sum()
+
+def leer_dataset(ruta):
+    """Lista de (etiqueta, texto) del TSV; ignora líneas vacías y comentarios"""
+    ejemplos = []
+    with open(ruta, encoding='utf-8') as archivo:
+        for linea in archivo:
+            if not linea.strip() or linea.startswith('#'):
+                continue
+            etiqueta, _, texto = linea.rstrip('\n').partition('\t')
+            if etiqueta not in ETIQUETAS:
+                raise ValueError(f"Etiqueta desconocida en {ruta}: {etiqueta!r}")
+            ejemplos.append((etiqueta, texto))
+    return ejemplos
+
+def entrenar(ejemplos, epocas=EPOCAS, semilla=0):
+    """
+    Entrena el modelo por descenso de gradiente estocástico
+
+    Args:
+        ejemplos: Lista de (etiqueta, texto)
+
+    Returns:
+        Modelo
+    """
+    pesos = np.zeros((DIMENSION, len(ETIQUETAS)))
+    datos = [(caracteristicas(texto), ETIQUETAS.index(etiqueta)) for etiqueta, texto in ejemplos]
+    azar = np.random.default_rng(semilla)
+
+    for epoca in range(epocas):
+        tasa = TASA_APRENDIZAJE / (1 + epoca * 0.1)
+        for i in azar.permutation(len(datos)):
+            indices, clase = datos[i]
+            gradiente = _probabilidades(pesos, indices)
+            gradiente[clase] -= 1
+            escala = 1 / np.sqrt(len(indices))
+            np.add.at(pesos, indices, -tasa * escala * gradiente)
+        pesos *= 1 - REGULARIZACION
+
+    return Modelo(pesos, ETIQUETAS)
+
+def clasificar(texto, modelo=None):
+    """
+    Returns:
+        Tupla (etiqueta, probabilidad)
+    """
+    modelo = modelo or obtener_modelo()
+    if modelo is None:
+        return RESERVA, 1.0
+    probabilidades = _probabilidades(modelo.pesos, caracteristicas(texto))
+    mejor = int(probabilidades.argmax())
+    return modelo.etiquetas[mejor], float(probabilidades[mejor])
+
+def enrutar(texto, umbral=INTENCION_UMBRAL, modelo=None):
+    """
+    Intención con la que se responde el mensaje: RESERVA (va a la extracción
+    con LLM) salvo que otra intención supere el umbral
+    """
+    etiqueta, probabilidad = clasificar(texto, modelo)
+    if etiqueta != RESERVA and probabilidad >= umbral:
+        return etiqueta
+    return RESERVA
+
+RUTA_DATASET = INTENCIONES_DATASET
+
+_modelo = None
+_modelo_cargado = False
+_lock_modelo = threading.Lock()
+
+def obtener_modelo():
+    """Modelo entrenado con RUTA_DATASET, o None si no existe; se entrena una sola vez"""
+    global _modelo, _modelo_cargado
+    if not _modelo_cargado:
+        with _lock_modelo:
+            if not _modelo_cargado:
+                if os.path.exists(RUTA_DATASET):
+                    _modelo = entrenar(leer_dataset(RUTA_DATASET))
+                else:
+                    log.warning("Sin dataset de intenciones, todos los mensajes van a la extracción",
+                                extra={"datos": {"ruta": RUTA_DATASET}})
+                _modelo_cargado = True
+    return _modelo
+
+def _validacion_cruzada(ejemplos, pliegues=5):
+    """Predicciones (etiqueta real, predicha, probabilidad) fuera de muestra"""
+    orden = np.random.default_rng(1).permutation(len(ejemplos))
+    resultados = []
+    for pliegue in range(pliegues):
+        prueba = set(orden[pliegue::pliegues].tolist())
+        modelo = entrenar([e for i, e in enumerate(ejemplos) if i not in prueba])
+        for i in prueba:
+            etiqueta, texto = ejemplos[i]
+            resultados.append((etiqueta, *clasificar(texto, modelo)))
+    return resultados
+
+if __name__ == "__main__":
+    ejemplos = leer_dataset(sys.argv[1] if len(sys.argv) > 1 else RUTA_DATASET)
+    resultados = _validacion_cruzada(ejemplos)
+    aciertos = sum(1 for real, predicha, _ in resultados if real == predicha)
+    print(f"Ejemplos: {len(ejemplos)} | exactitud (validación cruzada): {aciertos / len(resultados):.1%}\n")
+
+    print("umbral  sin LLM  errores sin LLM  reservas desviadas")
+    for umbral in (0.4, 0.5, 0.6, 0.7, 0.8, 0.9):
+        locales = [(r, p) for r, p, prob in resultados if p != RESERVA and prob >= umbral]
+        errores = sum(1 for r, p in locales if r != p)
+        desviadas = sum(1 for r, _ in locales if r == RESERVA)
+        marca = "  <- INTENCION_UMBRAL" if umbral == INTENCION_UMBRAL else ""
+        print(f"{umbral:6.1f}  {len(locales) / len(resultados):7.1%}  {errores:15d}  {desviadas:18d}{marca}")
+
+    mensajes = [texto for _, texto in ejemplos]
+    # Se entrena antes de medir: el tiempo es el de un mensaje con el modelo cargado
+    obtener_modelo()
+    inicio = time.perf_counter()
+    for texto in mensajes:
+        clasificar(texto)
+    print(f"\nClasificación: {(time.perf_counter() - inicio) / len(mensajes) * 1e6:.0f} µs/mensaje")
@@ -0,0 +1,241 @@
+"""
+Analizador léxico en español compartido por extractor.py y precios.py
+
+Todo se construye una sola vez al importar: la tabla de normalización
+(minúsculas sin tildes), una única expresión regular que separa el texto en
+palabras y las tablas de palabras clave. Una sola pasada reconoce números,
+números en palabras, tipos de habitación, referencias de fecha, unidades y
+palabras de enlace; la clasificación de cada palabra se memoiza.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Tokens
+NUMERO = 'numero'            # valor: int ("2", "dos"); cifras: True si venía en dígitos
+TIPO_HABITACION = 'tipo'     # valor: tipo canónico ("single", "estandar", ...)
+FECHA = 'fecha'              # valor: días desde hoy (0, 1, 2)
+UNIDAD = 'unidad'            # valor: "persona" o "habitacion"
+CLAVE = 'clave'              # valor: "del", "al", "para", "somos"
+SEPARADOR = 'separador'      # valor: ",", ";", "y", "e"
+
+# contiguo: True si entre el token anterior y este solo hay espacios
+Token = namedtuple('Token', ['tipo', 'valor', 'contiguo', 'cifras'], defaults=(False,))
+
+# Tabla de normalización. Se aplica con str.replace porque en CPython
+# str.translate con caracteres no ASCII resulta ~15x más lento.
+TABLA_NORMALIZACION = (
+    ('á', 'a'), ('é', 'e'), ('í', 'i'), ('ó', 'o'), ('ú', 'u'),
+    ('ü', 'u'), ('ñ', 'n'),
+)
+
+NUMEROS_PALABRA = {
+    'un': 1, 'una': 1,
+    'dos': 2,
+    'tres': 3,
+    'cuatro': 4,
+    'cinco': 5,
+    'seis': 6,
+    'siete': 7,
+    'ocho': 8,
+    'nueve': 9,
+    'diez': 10
+}
+
+SINONIMOS_HABITACION = {
+    'single': 'single', 'sencilla': 'single', 'individual': 'single',
+    'estandar': 'estandar', 'standard': 'estandar',
+    'superior': 'superior', 'premium': 'superior',
+    'doble': 'doble', 'matrimonial': 'doble',
+}
+
+# Frases que solo nombran un tipo (normalizar_tipo_habitacion): "2 camas" es
+# una doble, pero en una lista de habitaciones no cuenta como una habitación
+# más ("2 dobles, 2 camas" son dos) y sola no fija el tipo de la cotización
+FRASES_TIPO = {'2 camas': 'doble'}
+
+# Orden de prioridad cuando un texto menciona varios tipos
+ORDEN_TIPOS = ['single', 'estandar', 'superior', 'doble']
+
+PALABRAS_FECHA = {'hoy': 0, 'manana': 1, 'pasado manana': 2}
+
+UNIDADES = {
+    'persona': 'persona',
+    'habitaci': 'habitacion', 'cuarto': 'habitacion', 'pieza': 'habitacion',
+}
+
+CLAVES = ('del', 'al', 'para', 'somos')
+
+# Palabras, números y signos de puntuación: un solo escaneo en C
+_PALABRAS = re.compile(r'[a-z]+|\d+|[^\sa-z\d]')
+
+# Tipos y unidades se reconocen como prefijo ("dobles", "habitaciones"),
+# todos con una sola expresión compilada; gana el primero en este orden
+_PREFIJOS = {sinonimo: (TIPO_HABITACION, tipo) for sinonimo, tipo in SINONIMOS_HABITACION.items()}
+_PREFIJOS.update({prefijo: (UNIDAD, unidad) for prefijo, unidad in UNIDADES.items()})
+_PREFIJO = re.compile('|'.join(map(re.escape, _PREFIJOS)))
+
+# Palabras completas
+_EXACTAS = {}
+_EXACTAS.update({palabra: (NUMERO, valor) for palabra, valor in NUMEROS_PALABRA.items()})
+_EXACTAS.update({palabra: (FECHA, valor) for palabra, valor in PALABRAS_FECHA.items()
+                 if ' ' not in palabra})
+_EXACTAS.update({palabra: (CLAVE, palabra) for palabra in CLAVES})
+_EXACTAS.update({signo: (SEPARADOR, signo) for signo in (',', ';', 'y', 'e')})
+
+# Código de un carácter por token para firma(); los tipos con valor
+# numérico o abierto comparten un código. Los números en cifras y en
+# palabras se distinguen: "para 2" es una cantidad, "para una noche" no
+_CODIGOS = {
+    (NUMERO, 'cifras'): 'N',
+    (NUMERO, 'palabra'): 'n',
+    (TIPO_HABITACION, None): 'T',
+    (FECHA, None): 'F',
+    (UNIDAD, 'persona'): 'P',
+    (UNIDAD, 'habitacion'): 'H',
+    (CLAVE, 'del'): 'd',
+    (CLAVE, 'al'): 'a',
+    (CLAVE, 'para'): 'p',
+    (CLAVE, 'somos'): 's',
+    (SEPARADOR, ','): ',',
+    (SEPARADOR, ';'): ';',
+    (SEPARADOR, 'y'): 'y',
+    (SEPARADOR, 'e'): 'e',
+}
+
+class _TablaFirmas(dict):
+    """Token -> 2 caracteres de firma; se completa la primera vez que aparece"""
+    def __missing__(self, token):
+        if token.tipo == NUMERO:
+            codigo = _CODIGOS[(NUMERO, 'cifras' if token.cifras else 'palabra')]
+        else:
+            codigo = _CODIGOS.get((token.tipo, token.valor)) or _CODIGOS[(token.tipo, None)]
+        valor = (' ' if token.contiguo else '|') + codigo
+        self[token] = valor
+        return valor
+
+_FIRMAS = _TablaFirmas()
+
+_TOKEN_PASADO_MANANA = (Token(FECHA, 2, False), Token(FECHA, 2, True))
+
+@lru_cache(maxsize=4096)
+def _clasificar_palabra(palabra):
+    """
+    Tokens de una palabra como par (no contiguo, contiguo), o None si la
+    palabra no es relevante. Se memoiza: el vocabulario de los mensajes es
+    chico y repetitivo, así que el escaneo no crea tokens nuevos.
+    """
+    if palabra.isdigit():
+        valor = int(palabra)
+        return (Token(NUMERO, valor, False, True), Token(NUMERO, valor, True, True))
+    if palabra in _EXACTAS:
+        tipo, valor = _EXACTAS[palabra]
+    else:
+        prefijo = _PREFIJO.match(palabra)
+        if prefijo is None:
+            return None
+        tipo, valor = _PREFIJOS[prefijo.group()]
+    return (Token(tipo, valor, False), Token(tipo, valor, True))
+
+def normalizar_texto(texto):
+    """Minúsculas y sin tildes"""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    for original, reemplazo in TABLA_NORMALIZACION:
+        texto = texto.replace(original, reemplazo)
+    return texto
+
+def tokenizar(texto):
+    """
+    Recorre el texto una sola vez y genera los tokens reconocidos
+
+    Args:
+        texto: Texto libre (se normaliza internamente)
+
+    Returns:
+        Lista de Token
+    """
+    tokens = []
+    contiguo = True
+    anterior = None
+
+    for palabra in _PALABRAS.findall(normalizar_texto(texto)):
+        par = _clasificar_palabra(palabra)
+
+        if par is None:
+            # Frase de dos palabras: "pasado mañana"
+            contiguo_antes = contiguo
+            contiguo = False
+            anterior = palabra
+            continue
+
+        if anterior == 'pasado' and par[0].tipo == FECHA and par[0].valor == 1:
+            tokens.append(_TOKEN_PASADO_MANANA[contiguo_antes])
+        else:
+            tokens.append(par[contiguo])
+        contiguo = True
+        anterior = palabra
+
+    return tokens
+
+def tipos_mencionados(tokens):
+    """Tipos de habitación presentes, en orden de prioridad y sin repetir"""
+    presentes = {token.valor for token in tokens if token.tipo == TIPO_HABITACION}
+    return [tipo for tipo in ORDEN_TIPOS if tipo in presentes]
+
+def dividir_por_separador(tokens):
+    """Separa la lista de tokens en partes delimitadas por ",", ";", "y", "e" """
+    partes = [[]]
+    for token in tokens:
+        if token.tipo == SEPARADOR:
+            partes.append([])
+        else:
+            partes[-1].append(token)
+    return [parte for parte in partes if parte]
+
+def firma(tokens):
+    """
+    Codifica los tokens como texto, dos caracteres por token: " " o "|"
+    según si es contiguo al anterior, y el código de su tipo/valor. Permite
+    buscar secuencias con expresiones regulares compiladas.
+    """
+    return ''.join([_FIRMAS[token] for token in tokens])
+
+def compilar_secuencia(*patron):
+    """
+    Compila un patrón de tokens contiguos para usar con buscar_secuencia
+
+    Args:
+        patron: Pares (tipo, valor) donde valor None acepta cualquiera.
+            Solo CLAVE, UNIDAD y SEPARADOR distinguen valores; NUMERO
+            distingue 'cifras' ("2") de 'palabra' ("dos", "una").
+    """
+    partes = []
+    for i, (tipo, valor) in enumerate(patron):
+        codigos = ''.join(codigo for (t, v), codigo in _CODIGOS.items()
+                          if t == tipo and (valor is None or v == valor))
+        if not codigos:
+            raise ValueError(f"Token no codificable en secuencia: {tipo}={valor}")
+        # El primer token puede venir tras cualquier separación; el resto debe ser contiguo
+        partes.append(('[ |]' if i == 0 else ' ') + '[' + re.escape(codigos) + ']')
+    return re.compile(''.join(partes))
+
+def buscar_secuencia(tokens, secuencia, firma_tokens=None):
+    """
+    Busca la primera secuencia de tokens contiguos que calce con el patrón
+
+    Args:
+        tokens: Lista de Token
+        secuencia: Patrón de compilar_secuencia
+        firma_tokens: firma(tokens) ya calculada, para reutilizarla entre búsquedas
+
+    Returns:
+        Lista de tokens calzados o None
+    """
+    if firma_tokens is None:
+        firma_tokens = firma(tokens)
+    match = secuencia.search(firma_tokens)
+    if match is None:
+        return None
+    return tokens[match.start() // 2:match.end() // 2]
@@ -1,50 +1,133 @@
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+from PIL import Image as PILImage
 import io
 import base64
 import os
-from config import HOTEL_INFO
+from config import HOTEL_INFO, LOGO_PATH, PDF_COMPACTO, LOGO_DPI, PDF_DETALLE_MIN_LINEAS
 from precios import formatear_precio
 
-def generar_cotizacion_pdf(info_reserva, totales, cantidad_noches):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=letter,
-        rightMargin=50,
-        leftMargin=50,
-        topMargin=40,
-        bottomMargin=30,
-    )
+LOGO_LADO = 1.2*inch  # Tamaño impreso del logo
+
+# Detalle por noche de las cotizaciones largas: filas de alto fijo para saber
+# de antemano cuántas caben en cada página
+ALTO_FILA_DETALLE = 14
+MIN_FILAS_PRIMERA_PAGINA = 5  # Con menos espacio el detalle empieza en la página siguiente
+ANCHOS_DETALLE = [1.0*inch, 2.7*inch, 0.6*inch, 1.1*inch, 1.1*inch]
+
+@lru_cache(maxsize=4)
+def cargar_logo_compacto(logo_path, dpi=LOGO_DPI):
+    """
+    Reescala el logo una sola vez a su tamaño impreso y lo recomprime.
+    Prueba PNG con paleta y JPEG, y se queda con el más liviano.
     
-    elementos = []
+    Returns:
+        Bytes de la imagen
+    """
+    lado_px = int(LOGO_LADO / inch * dpi)
+    
+    with PILImage.open(logo_path) as original:
+        imagen = original.convert('RGBA')
+        imagen.thumbnail((lado_px, lado_px), PILImage.LANCZOS)
+    
+    # Aplanar transparencia sobre blanco (fondo del PDF)
+    fondo = PILImage.new('RGB', imagen.size, (255, 255, 255))
+    fondo.paste(imagen, mask=imagen.split()[3])
+    
+    png = io.BytesIO()
+    fondo.quantize(colors=256).save(png, format='PNG', optimize=True)
+    jpeg = io.BytesIO()
+    fondo.save(jpeg, format='JPEG', quality=85, optimize=True)
+    
+    return min(png.getvalue(), jpeg.getvalue(), key=len)
+
+
+def generar_cotizacion_pdf(info_reserva, totales, cantidad_noches, compacto=PDF_COMPACTO, detalle=None):
+    """Genera la cotización y la retorna codificada en base64"""
+    pdf_bytes = renderizar_cotizacion_pdf(info_reserva, totales, cantidad_noches, compacto, detalle)
+    return base64.b64encode(pdf_bytes).decode('utf-8')
+
+def lineas_detalle(check_in, cantidad_noches, habitaciones):
+    """
+    Cargos por noche y por habitación, generados a medida que se dibujan
+
+    Args:
+        check_in: Fecha de entrada (YYYY-MM-DD)
+        habitaciones: totales['habitaciones'] de calcular_totales
+
+    Yields:
+        Tuplas (fecha, descripción, cantidad, precio unitario)
+    """
+    entrada = datetime.strptime(check_in, '%Y-%m-%d')
+    for noche in range(cantidad_noches):
+        fecha = (entrada + timedelta(days=noche)).strftime('%d.%m.%Y')
+        numero = 0
+        for hab in habitaciones:
+            for _ in range(hab['cantidad']):
+                numero += 1
+                yield fecha, f"Habitación {numero} - {hab['tipo']}", 1, hab['precio_noche']
+
+def es_cotizacion_larga(totales, cantidad_noches):
+    """Las cotizaciones de grupo con muchas líneas se detallan por noche"""
+    habitaciones = sum(hab['cantidad'] for hab in totales['habitaciones'])
+    return habitaciones * cantidad_noches >= PDF_DETALLE_MIN_LINEAS
+
+class DocumentoPorPartes(SimpleDocTemplate):
+    """
+    SimpleDocTemplate que toma los flowables siguientes de un generador a
+    medida que los dibuja, desde handle_flowable (el punto de extensión por
+    flowable de BaseDocTemplate): solo existen las tablas de la página en curso
+    """
+
+    def build(self, flowables, siguientes=None, **kwargs):
+        self.elementos = flowables
+        self.siguientes = siguientes
+        super().build(flowables, **kwargs)
+
+    def handle_flowable(self, flowables):
+        # handle_flowable también recibe las acciones internas de página;
+        # solo se completa la lista de build(). El siguiente entra antes de
+        # sacar el último, así build() no la encuentra vacía
+        if flowables is self.elementos and self.siguientes is not None and len(flowables) < 2:
+            flowables.extend(islice(self.siguientes, 1))
+        super().handle_flowable(flowables)
+
+def _estilos():
     styles = getSampleStyleSheet()
     
     # --- ESTILOS (BLANCO Y NEGRO) ---
-    estilo_titulo_doc = ParagraphStyle('DocTitle', parent=styles['Heading1'], fontSize=20, alignment=TA_RIGHT, textColor=colors.black)
-    estilo_hotel_nombre = ParagraphStyle('HotelName', parent=styles['Heading1'], fontSize=18, textColor=colors.black)
-    estilo_label = ParagraphStyle('Label', parent=styles['Normal'], fontSize=9, fontName='Helvetica-Bold')
-    estilo_valor = ParagraphStyle('Value', parent=styles['Normal'], fontSize=9)
-    estilo_tabla_hdr = ParagraphStyle('TblHdr', parent=styles['Normal'], fontSize=10, fontName='Helvetica-Bold', textColor=colors.white, alignment=TA_CENTER)
+    return {
+        'titulo_doc': ParagraphStyle('DocTitle', parent=styles['Heading1'], fontSize=20, alignment=TA_RIGHT, textColor=colors.black),
+        'hotel_nombre': ParagraphStyle('HotelName', parent=styles['Heading1'], fontSize=18, textColor=colors.black),
+        'label': ParagraphStyle('Label', parent=styles['Normal'], fontSize=9, fontName='Helvetica-Bold'),
+        'valor': ParagraphStyle('Value', parent=styles['Normal'], fontSize=9),
+        'descuento': ParagraphStyle('Discount', parent=styles['Normal'], fontSize=9, alignment=TA_RIGHT),
+        'tabla_hdr': ParagraphStyle('TblHdr', parent=styles['Normal'], fontSize=10, fontName='Helvetica-Bold', textColor=colors.white, alignment=TA_CENTER),
+    }
+
+def _encabezado(info_reserva, cantidad_noches, compacto, estilos):
+    """Logo, fechas de emisión y validez, y datos de la estadía"""
+    elementos = []
 
     # --- 1. ENCABEZADO CON LOGO ---
-    logo_path = "logo.png" 
-    
     col_izq = []
-    if os.path.exists(logo_path):
-        img = Image(logo_path, width=1.2*inch, height=1.2*inch)
+    if os.path.exists(LOGO_PATH):
+        logo = io.BytesIO(cargar_logo_compacto(LOGO_PATH)) if compacto else LOGO_PATH
+        img = Image(logo, width=LOGO_LADO, height=LOGO_LADO)
         img.hAlign = 'LEFT'
         col_izq.append(img)
     else:
-        col_izq.append(Paragraph(HOTEL_INFO['nombre'], estilo_hotel_nombre))
+        col_izq.append(Paragraph(HOTEL_INFO['nombre'], estilos['hotel_nombre']))
 
     header_data = [
-        [col_izq, Paragraph("COTIZACIÓN", estilo_titulo_doc)]
+        [col_izq, Paragraph("COTIZACIÓN", estilos['titulo_doc'])]
     ]
     header_tab = Table(header_data, colWidths=[3.5*inch, 3*inch])
     header_tab.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'MIDDLE')]))
@@ -56,8 +139,8 @@ def generar_cotizacion_pdf(info_reserva, totales, cantidad_noches):
     fecha_validez = (datetime.now() + timedelta(days=2)).strftime('%d.%m.%Y')
     
     control_data = [
-        [Paragraph("FECHA EMISIÓN", estilo_label), Paragraph(fecha_emision, estilo_valor)],
-        [Paragraph("FECHA VALIDEZ", estilo_label), Paragraph(fecha_validez, estilo_valor)]
+        [Paragraph("FECHA EMISIÓN", estilos['label']), Paragraph(fecha_emision, estilos['valor'])],
+        [Paragraph("FECHA VALIDEZ", estilos['label']), Paragraph(fecha_validez, estilos['valor'])]
     ]
     control_tab = Table(control_data, colWidths=[1.5*inch, 1.2*inch], hAlign='RIGHT')
     control_tab.setStyle(TableStyle([
@@ -69,8 +152,8 @@ def generar_cotizacion_pdf(info_reserva, totales, cantidad_noches):
 
     # --- 3. DATOS DE ESTADÍA (Cuadro Minimalista) ---
     estadia_data = [
-        [Paragraph("CHECK IN", estilo_label), info_reserva['check_in'], Paragraph("NOCHES", estilo_label), str(cantidad_noches)],
-        [Paragraph("CHECK OUT", estilo_label), info_reserva['check_out'], Paragraph("HUÉSPEDES", estilo_label), str(info_reserva['cant_personas'])]
+        [Paragraph("CHECK IN", estilos['label']), info_reserva['check_in'], Paragraph("NOCHES", estilos['label']), str(cantidad_noches)],
+        [Paragraph("CHECK OUT", estilos['label']), info_reserva['check_out'], Paragraph("HUÉSPEDES", estilos['label']), str(info_reserva['cant_personas'])]
     ]
     estadia_tab = Table(estadia_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
     estadia_tab.setStyle(TableStyle([
@@ -81,13 +164,18 @@ def generar_cotizacion_pdf(info_reserva, totales, cantidad_noches):
     ]))
     elementos.append(estadia_tab)
     elementos.append(Spacer(1, 0.3*inch))
+    return elementos
+
+def _resumen(totales, estilos):
+    """Cargos por tipo de habitación, totales y pie de página"""
+    elementos = []
 
     # --- 4. TABLA DE CARGOS ---
     tabla_header = [
-        Paragraph("DESCRIPCIÓN", estilo_tabla_hdr), 
-        Paragraph("CANT", estilo_tabla_hdr), 
-        Paragraph("UNITARIO", estilo_tabla_hdr), 
-        Paragraph("TOTAL", estilo_tabla_hdr)
+        Paragraph("DESCRIPCIÓN", estilos['tabla_hdr']), 
+        Paragraph("CANT", estilos['tabla_hdr']), 
+        Paragraph("UNITARIO", estilos['tabla_hdr']), 
+        Paragraph("TOTAL", estilos['tabla_hdr'])
     ]
     datos_items = [tabla_header]
     
@@ -108,7 +196,17 @@ def generar_cotizacion_pdf(info_reserva, totales, cantidad_noches):
     elementos.append(items_tab)
 
     # --- 5. TOTALES ---
-    totales_data = [
+    totales_data = []
+    descuentos = totales.get('descuentos') or []
+    if descuentos:
+        totales_data.append(["", "SUBTOTAL", formatear_precio(totales['subtotal'])])
+        for descuento in descuentos:
+            totales_data.append([
+                Paragraph(f"{descuento['nombre']} ({descuento['porcentaje']:g}%)", estilos['descuento']),
+                "DESCUENTO",
+                "-" + formatear_precio(descuento['monto'])
+            ])
+    totales_data += [
         ["", "NETO", formatear_precio(totales['total_neto'])],
         ["", "IVA (19%)", formatear_precio(totales['iva'])],
         ["", "TOTAL FINAL", formatear_precio(totales['total_bruto'])]
@@ -118,7 +216,7 @@ def generar_cotizacion_pdf(info_reserva, totales, cantidad_noches):
         ('FONTNAME', (1,0), (1,-1), 'Helvetica-Bold'),
         ('ALIGN', (1,0), (-1,-1), 'RIGHT'),
         ('GRID', (1,0), (-1,-1), 0.5, colors.black),
-        ('BACKGROUND', (1,2), (2,2), colors.lightgrey), # Resaltar total con gris
+        ('BACKGROUND', (1,-1), (2,-1), colors.lightgrey), # Resaltar total con gris
     ]))
     elementos.append(totales_tab)
     
@@ -133,10 +231,114 @@ def generar_cotizacion_pdf(info_reserva, totales, cantidad_noches):
     <b>DATOS DE PAGO:</b> {HOTEL_INFO['nombre']} | RUT: {HOTEL_INFO['rut']} | Banco de Chile | Cta: 2501678302<br/>
     <b>TÉRMINOS:</b> Cotización válida por 48 horas. Reserva requiere 100% de pago anticipado.
     """
-    elementos.append(Paragraph(banco_y_terminos, estilo_valor))
+    elementos.append(Paragraph(banco_y_terminos, estilos['valor']))
+    return elementos
+
+ESTILO_DETALLE = [
+    ('FONTSIZE', (0,0), (-1,-1), 8),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+    ('BACKGROUND', (0,0), (-1,0), colors.black),
+    ('ALIGN', (0,0), (-1,0), 'CENTER'),
+    ('ALIGN', (2,1), (-1,-1), 'RIGHT'),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+    ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
+    ('BACKGROUND', (0,-1), (-1,-1), colors.lightgrey),
+]
+ENCABEZADO_DETALLE = ["FECHA", "DESCRIPCIÓN", "CANT", "UNITARIO", "TOTAL"]
+
+def _tabla_detalle(lineas, transporte, acumulado, ultima):
+    """Una página del detalle: encabezado, transporte, líneas y subtotal acumulado"""
+    filas = [ENCABEZADO_DETALLE]
+    estilo = list(ESTILO_DETALLE)
+    if transporte is not None:
+        filas.append(["", "Transporte página anterior", "", "", formatear_precio(transporte)])
+        estilo.append(('FONTNAME', (0,1), (-1,1), 'Helvetica-Oblique'))
+    for fecha, descripcion, cantidad, unitario in lineas:
+        filas.append([fecha, descripcion, str(cantidad), formatear_precio(unitario), formatear_precio(cantidad * unitario)])
+    etiqueta = "Total detalle" if ultima else "Subtotal a transportar"
+    filas.append(["", etiqueta, "", "", formatear_precio(acumulado)])
+    tabla = Table(filas, colWidths=ANCHOS_DETALLE, rowHeights=ALTO_FILA_DETALLE)
+    tabla.setStyle(TableStyle(estilo))
+    return tabla
+
+def _paginas_detalle(lineas, filas_primera, filas_pagina):
+    """
+    Tablas del detalle de a una página, tomando las líneas del generador a
+    medida que se necesitan; el subtotal se arrastra de página en página
+    """
+    lineas = iter(lineas)
+    siguiente = next(lineas, None)
+    transporte = None
+    acumulado = 0
+    capacidad = filas_primera
+    if capacidad < MIN_FILAS_PRIMERA_PAGINA:
+        yield PageBreak()
+        capacidad = filas_pagina
+    while siguiente is not None:
+        pagina = [siguiente, *islice(lineas, capacidad - 1)]
+        siguiente = next(lineas, None)
+        acumulado += sum(cantidad * unitario for _, _, cantidad, unitario in pagina)
+        yield _tabla_detalle(pagina, transporte, acumulado, siguiente is None)
+        if siguiente is not None:
+            yield PageBreak()
+        transporte = acumulado
+        # En las páginas siguientes también va la fila de transporte
+        capacidad = filas_pagina - 1
+
+def renderizar_cotizacion_pdf(info_reserva, totales, cantidad_noches, compacto=PDF_COMPACTO, detalle=None):
+    """
+    Genera la cotización en PDF
+    
+    Args:
+        compacto: Comprime los streams del PDF y usa el logo reescalado.
+            Solo se usan fuentes base-14 (Helvetica), que no se incrustan.
+        detalle: Líneas (fecha, descripción, cantidad, unitario) del detalle
+            paginado, típicamente un generador. Por defecto se detallan por
+            noche y por habitación las cotizaciones largas
+            (PDF_DETALLE_MIN_LINEAS); False lo omite.
+    
+    Returns:
+        Bytes del PDF
+    """
+    buffer = io.BytesIO()
+    doc = DocumentoPorPartes(
+        buffer,
+        pagesize=letter,
+        rightMargin=50,
+        leftMargin=50,
+        topMargin=40,
+        bottomMargin=30,
+        pageCompression=1 if compacto else None,  # None: valor de rl_config
+    )
+    
+    estilos = _estilos()
+    elementos = _encabezado(info_reserva, cantidad_noches, compacto, estilos)
+
+    if detalle is None and es_cotizacion_larga(totales, cantidad_noches):
+        detalle = lineas_detalle(info_reserva['check_in'], cantidad_noches, totales['habitaciones'])
+
+    if detalle:
+        # Filas de alto fijo: las que caben en el marco (6 pt de relleno
+        # arriba y abajo), menos encabezado y subtotal de cada tabla
+        alto_util = doc.height - 12
+        alto_encabezado = sum(f.wrap(doc.width, alto_util)[1] for f in elementos)
+        filas_primera = int((alto_util - alto_encabezado) // ALTO_FILA_DETALLE) - 2
+        filas_pagina = int(alto_util // ALTO_FILA_DETALLE) - 2
+
+        def resto():
+            yield from _paginas_detalle(detalle, filas_primera, filas_pagina)
+            yield Spacer(1, 0.3*inch)
+            yield from _resumen(totales, estilos)
+
+        siguientes = resto()
+    else:
+        elementos += _resumen(totales, estilos)
+        siguientes = None
 
     # CONSTRUCCIÓN
-    doc.build(elementos)
+    doc.build(elementos, siguientes)
     pdf_bytes = buffer.getvalue()
     buffer.close()
-    return base64.b64encode(pdf_bytes).decode('utf-8')
+    return pdf_bytes
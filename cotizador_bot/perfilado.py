@@ -0,0 +1,237 @@
+"""
+Perfilado opcional por solicitud del webhook.
+
+Se activa con la variable de entorno COTIZADOR_PERFIL=<porcentaje>. Con el
+modo activo, un hilo muestreador toma la pila de cada solicitud en curso
+cada PERFIL_INTERVALO_MS y se guarda el perfil del PERFIL_PORCENTAJE% de las
+solicitudes más todas las que superen PERFIL_UMBRAL_MS. Cada perfil es un
+archivo de pilas colapsadas (compatible con flamegraph.pl) cuya primera
+línea es un comentario JSON con message_id, duración y etapas. Los archivos
+rotan en PERFIL_DIR.
+
+Con el modo apagado perfilar_solicitud() retorna un objeto nulo compartido,
+sin hilos ni muestreo.
+
+Solo para app.py: el muestreo atribuye la pila de cada hilo a la solicitud
+que lo ocupa. En app_async.py todas las solicitudes comparten el hilo del
+event loop, así que no se perfila.
+
+Resumen de los perfiles guardados:
+    python perfilado.py [directorio] [--top N]
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from config import (
+    PERFIL_PORCENTAJE, PERFIL_UMBRAL_MS, PERFIL_DIR,
+    PERFIL_MAX_ARCHIVOS, PERFIL_INTERVALO_MS
+)
+from registro import obtener_logger
+from estadisticas import percentil
+
+log = obtener_logger("perfilado")
+
+class _PerfilNulo:
+    """Perfil del modo apagado: todas las operaciones son no-op"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def etapa(self, nombre):
+        pass
+
+_PERFIL_NULO = _PerfilNulo()
+
+class PerfilSolicitud:
+    """Muestras de pila y etapas de una solicitud"""
+
+    def __init__(self, message_id, muestreado):
+        self.message_id = message_id
+        self.muestreado = muestreado
+        self.hilo = threading.get_ident()
+        self.inicio = time.perf_counter()
+        self.etapa_actual = "inicio"
+        self.etapas = []
+        self.pilas = Counter()
+
+    def etapa(self, nombre):
+        """Marca el comienzo de una etapa del procesamiento"""
+        self.etapas.append((nombre, round((time.perf_counter() - self.inicio) * 1000, 1)))
+        self.etapa_actual = nombre
+
+    def __enter__(self):
+        _muestreador.registrar(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.pilas = _muestreador.desregistrar(self)
+        duracion_ms = (time.perf_counter() - self.inicio) * 1000
+        if self.muestreado or duracion_ms >= PERFIL_UMBRAL_MS:
+            # Un perfil que no se puede guardar no debe hacer fallar la solicitud
+            try:
+                guardar_perfil(self, duracion_ms)
+            except Exception:
+                log.exception("Perfil no guardado", extra={"datos": {"message_id": self.message_id}})
+        return False
+
+class _Muestreador:
+    """Hilo que toma la pila de las solicitudes registradas"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.activos = {}
+        self.hilo = None
+
+    def registrar(self, perfil):
+        with self.lock:
+            self.activos[id(perfil)] = perfil
+            if self.hilo is None:
+                self.hilo = threading.Thread(target=self._muestrear, name="perfilado", daemon=True)
+                self.hilo.start()
+
+    def desregistrar(self, perfil):
+        """
+        Retira el perfil y retorna una copia de sus pilas: el muestreador
+        solo las modifica con el lock tomado y mientras el perfil está activo
+        """
+        with self.lock:
+            self.activos.pop(id(perfil), None)
+            return Counter(perfil.pilas)
+
+    def _muestrear(self):
+        intervalo = PERFIL_INTERVALO_MS / 1000
+        while True:
+            time.sleep(intervalo)
+            with self.lock:
+                perfiles = list(self.activos.values())
+            if not perfiles:
+                continue
+            frames = sys._current_frames()
+            muestras = [
+                (perfil, _colapsar(frames[perfil.hilo], perfil.etapa_actual))
+                for perfil in perfiles if perfil.hilo in frames
+            ]
+            with self.lock:
+                for perfil, pila in muestras:
+                    if id(perfil) in self.activos:
+                        perfil.pilas[pila] += 1
+
+_muestreador = _Muestreador()
+
+def _colapsar(frame, etapa):
+    """Pila de la raíz a la hoja como 'etapa:x;modulo:funcion;...'"""
+    nombres = []
+    while frame is not None:
+        codigo = frame.f_code
+        nombres.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+        frame = frame.f_back
+    nombres.append(f"etapa:{etapa}")
+    return ";".join(reversed(nombres))
+
+def perfilar_solicitud(message_id):
+    """
+    Context manager que perfila una solicitud si el modo está activo
+
+    Uso:
+        with perfilar_solicitud(message_id) as perfil:
+            perfil.etapa("extraccion")
+            ...
+    """
+    if PERFIL_PORCENTAJE <= 0:
+        return _PERFIL_NULO
+    return PerfilSolicitud(message_id, random.random() * 100 < PERFIL_PORCENTAJE)
+
+def guardar_perfil(perfil, duracion_ms):
+    os.makedirs(PERFIL_DIR, exist_ok=True)
+    nombre = f"{int(time.time() * 1000)}_{_nombre_seguro(perfil.message_id)}.collapsed"
+    meta = {
+        "message_id": perfil.message_id,
+        "duracion_ms": round(duracion_ms, 1),
+        "muestreado": perfil.muestreado,
+        "etapas": perfil.etapas,
+    }
+    with open(os.path.join(PERFIL_DIR, nombre), "w", encoding="utf-8") as archivo:
+        archivo.write(f"# {json.dumps(meta)}\n")
+        for pila, cantidad in perfil.pilas.items():
+            archivo.write(f"{pila} {cantidad}\n")
+    _rotar()
+
+def _nombre_seguro(texto):
+    return "".join(c for c in str(texto) if c.isalnum())[:40] or "sin_id"
+
+def _rotar():
+    archivos = sorted(
+        entrada.path for entrada in os.scandir(PERFIL_DIR)
+        if entrada.name.endswith(".collapsed")
+    )
+    for ruta in archivos[:-PERFIL_MAX_ARCHIVOS]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+def leer_perfiles(directorio):
+    """Genera (meta, pilas) de cada perfil guardado en el directorio"""
+    for nombre in sorted(os.listdir(directorio)):
+        if not nombre.endswith(".collapsed"):
+            continue
+        meta, pilas = {}, Counter()
+        with open(os.path.join(directorio, nombre), encoding="utf-8") as archivo:
+            for linea in archivo:
+                if linea.startswith("# "):
+                    meta = json.loads(linea[2:])
+                    continue
+                pila, _, cantidad = linea.rstrip("\n").rpartition(" ")
+                if pila:
+                    pilas[pila] += int(cantidad)
+        yield meta, pilas
+
+def resumir(directorio, top=20):
+    """Imprime las funciones más calientes de todos los perfiles guardados"""
+    propias = Counter()
+    inclusivas = Counter()
+    por_etapa = Counter()
+    total_muestras = 0
+    duraciones = []
+
+    for meta, pilas in leer_perfiles(directorio):
+        duraciones.append(meta.get("duracion_ms", 0))
+        for pila, cantidad in pilas.items():
+            marcos = pila.split(";")
+            total_muestras += cantidad
+            por_etapa[marcos[0]] += cantidad
+            propias[marcos[-1]] += cantidad
+            for marco in set(marcos[1:]):
+                inclusivas[marco] += cantidad
+
+    if not total_muestras:
+        print(f"Sin muestras en {directorio}")
+        return
+
+    print(f"Perfiles: {len(duraciones)} | muestras: {total_muestras} | "
+          f"duración p50: {percentil(duraciones, 50):.0f} ms | "
+          f"máx: {max(duraciones):.0f} ms\n")
+
+    print("Etapas:")
+    for etapa, cantidad in por_etapa.most_common():
+        print(f"  {100 * cantidad / total_muestras:5.1f}%  {etapa}")
+
+    for titulo, contador in (("Tiempo propio", propias), ("Tiempo inclusivo", inclusivas)):
+        print(f"\n{titulo} (top {top}):")
+        for funcion, cantidad in contador.most_common(top):
+            print(f"  {100 * cantidad / total_muestras:5.1f}%  {funcion}")
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    top = 20
+    if "--top" in argumentos:
+        i = argumentos.index("--top")
+        top = int(argumentos[i + 1])
+        del argumentos[i:i + 2]
+    resumir(argumentos[0] if argumentos else PERFIL_DIR, top)
@@ -0,0 +1,433 @@
+"""
+Caché de extracción por plantilla de mensaje.
+
+Los clientes repiten la misma forma de frase con otros números ("2 personas
+del 3 al 5", "4 personas del 10 al 12"). La plantilla de un mensaje es su
+texto normalizado con cada número (en cifras o palabras) reemplazado por una
+ranura; los valores de las ranuras se guardan aparte.
+
+Cada vez que el LLM extrae un mensaje completo (sin reserva a medias), la
+plantilla aprende cómo se obtiene cada campo: de qué ranura sale
+cant_personas, si check_in es el día de una ranura, un mes fijo o un
+desplazamiento desde hoy, si check_out es otra ranura, N noches después o
+el día siguiente, y así. Se guardan todas las explicaciones compatibles con
+los ejemplos vistos y cada nuevo ejemplo descarta las que lo contradicen.
+
+Antes de llamar al LLM se busca la plantilla del mensaje. Se responde
+localmente cuando todas las explicaciones que quedan dan el mismo resultado
+y la plantilla es confiable: sus predicciones ya coincidieron
+PLANTILLAS_MIN_ACIERTOS veces con el LLM, con precisión de al menos
+PLANTILLAS_PRECISION_MIN. Una fracción PLANTILLAS_MUESTREO de los aciertos
+locales igual pasa por el LLM para seguir midiendo la precisión. Las
+plantillas se descartan por LRU al superar PLANTILLAS_MAX.
+
+Simulación con un flujo sintético de mensajes:
+    python plantillas.py
+"""
+import itertools
+import random
+import re
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from config import (
+    PLANTILLAS_MAX, PLANTILLAS_MIN_ACIERTOS, PLANTILLAS_PRECISION_MIN,
+    PLANTILLAS_MUESTREO
+)
+from lexico import normalizar_texto, NUMEROS_PALABRA
+
+CAMPOS = ('check_in', 'check_out', 'cant_personas', 'cantidad_habitaciones', 'tipo_habitaciones')
+CAMPOS_NUMERICOS = ('cant_personas', 'cantidad_habitaciones')
+
+RANURA = '#'
+MAX_RANURAS = 8
+MAX_COMBINACIONES = 64
+
+_PALABRAS = re.compile(r'[a-z]+|\d+|[,;]')
+_DIGITOS = re.compile(r'(\d+)')
+
+def plantilla(mensaje):
+    """
+    Returns:
+        Tupla (clave, valores): las palabras del mensaje con los números
+        reemplazados por RANURA, y los números en orden
+    """
+    palabras = []
+    valores = []
+    for palabra in _PALABRAS.findall(normalizar_texto(mensaje)):
+        if palabra.isdigit():
+            valores.append(int(palabra))
+            palabra = RANURA
+        elif palabra in NUMEROS_PALABRA:
+            valores.append(NUMEROS_PALABRA[palabra])
+            palabra = RANURA
+        palabras.append(palabra)
+    return ' '.join(palabras), tuple(valores)
+
+def _proximo_dia(dia, desde):
+    """Primera fecha >= desde cuyo día del mes es `dia`"""
+    if not 1 <= dia <= 31:
+        return None
+    mes = desde.replace(day=1)
+    for _ in range(13):
+        try:
+            fecha = mes.replace(day=dia)
+        except ValueError:
+            fecha = None
+        if fecha is not None and fecha >= desde:
+            return fecha
+        mes = (mes + timedelta(days=32)).replace(day=1)
+    return None
+
+def _fecha_en_mes(dia, mes, desde):
+    """Primera fecha >= desde con ese día y mes"""
+    for anio in (desde.year, desde.year + 1):
+        try:
+            fecha = desde.replace(year=anio, month=mes, day=dia)
+        except ValueError:
+            continue
+        if fecha >= desde:
+            return fecha
+    return None
+
+def _a_fecha(valor, referencia):
+    try:
+        return referencia.strptime(valor, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+def _candidatos_numero(valor, valores):
+    candidatos = {("constante", valor)}
+    candidatos.update(("ranura", i) for i, v in enumerate(valores) if str(v) == valor)
+    # "2 estandar y 1 superior" -> 3 habitaciones
+    candidatos.update(
+        ("suma", i, j) for i, j in itertools.combinations(range(len(valores)), 2)
+        if str(valores[i] + valores[j]) == valor
+    )
+    return candidatos
+
+def _candidatos_texto(valor, valores):
+    """Texto con números ("2 estandar, 1 superior"): cada número es literal o una ranura"""
+    if valor is None:
+        return {("constante", None)}
+    partes = _DIGITOS.split(valor)
+    opciones = []
+    for indice, parte in enumerate(partes):
+        if indice % 2 == 0:
+            opciones.append([parte])
+        else:
+            opciones.append([("literal", parte)] + [
+                ("ranura", i) for i, v in enumerate(valores) if str(v) == parte
+            ])
+    total = 1
+    for opcion in opciones:
+        total *= len(opcion)
+    if total > MAX_COMBINACIONES:
+        return {("constante", valor)}
+    return {("texto", combinacion) for combinacion in itertools.product(*opciones)}
+
+def _candidatos_fecha(fecha, valores, base, desde):
+    """
+    Explicaciones de una fecha: desplazamiento desde `base`, día de una
+    ranura (>= desde), día de una ranura en un mes fijo o ranura de noches
+    """
+    candidatos = {("despues", (fecha - base).days)}
+    for i, valor in enumerate(valores):
+        if _proximo_dia(valor, desde) == fecha:
+            candidatos.add(("dia", i))
+        if valor == fecha.day and _fecha_en_mes(valor, fecha.month, desde) == fecha:
+            candidatos.add(("dia_mes", i, fecha.month))
+        if base + timedelta(days=valor) == fecha:
+            candidatos.add(("noches", i))
+    return candidatos
+
+def candidatos(resultado, valores, ahora):
+    """Explicaciones compatibles con un resultado del LLM, por campo"""
+    hoy = ahora.date()
+    explicaciones = {}
+    for campo in CAMPOS_NUMERICOS:
+        valor = resultado.get(campo)
+        explicaciones[campo] = _candidatos_numero(str(valor) if valor else None, valores)
+    explicaciones['tipo_habitaciones'] = _candidatos_texto(resultado.get('tipo_habitaciones') or None, valores)
+
+    check_in = _a_fecha(resultado.get('check_in'), ahora)
+    check_out = _a_fecha(resultado.get('check_out'), ahora)
+    explicaciones['check_in'] = (
+        _candidatos_fecha(check_in, valores, hoy, hoy) if check_in else {("constante", None)}
+    )
+    base = check_in or hoy
+    explicaciones['check_out'] = (
+        _candidatos_fecha(check_out, valores, base, base + timedelta(days=1))
+        if check_out else {("constante", None)}
+    )
+    return explicaciones
+
+def _aplicar(explicacion, valores, base, desde):
+    tipo = explicacion[0]
+    if tipo == "constante":
+        return explicacion[1]
+    if tipo == "ranura":
+        return str(valores[explicacion[1]])
+    if tipo == "suma":
+        return str(valores[explicacion[1]] + valores[explicacion[2]])
+    if tipo == "texto":
+        return ''.join(
+            parte if isinstance(parte, str)
+            else parte[1] if parte[0] == "literal"
+            else str(valores[parte[1]])
+            for parte in explicacion[1]
+        )
+    if tipo == "despues":
+        fecha = base + timedelta(days=explicacion[1])
+    elif tipo == "dia":
+        fecha = _proximo_dia(valores[explicacion[1]], desde)
+    elif tipo == "dia_mes":
+        fecha = _fecha_en_mes(valores[explicacion[1]], explicacion[2], desde)
+    else:
+        fecha = base + timedelta(days=valores[explicacion[1]])
+    return fecha.strftime('%Y-%m-%d') if fecha else None
+
+def _unanime(explicaciones, valores, base, desde):
+    """Valor en que coinciden todas las explicaciones, o lanza KeyError"""
+    resultados = {_aplicar(explicacion, valores, base, desde) for explicacion in explicaciones}
+    if len(resultados) != 1:
+        raise KeyError
+    return resultados.pop()
+
+def _relativa_a_hoy(explicaciones):
+    """La fecha de entrada sale de un desplazamiento desde hoy ("mañana", "el viernes")"""
+    if ("constante", None) in explicaciones['check_in']:
+        return any(e[0] in ("despues", "noches") for e in explicaciones['check_out'])
+    return any(e[0] in ("despues", "noches") for e in explicaciones['check_in'])
+
+def predecir(explicaciones, valores, ahora):
+    """
+    Resultado de la plantilla para estos valores, o None si las
+    explicaciones que quedan no coinciden entre sí
+    """
+    hoy = ahora.date()
+    try:
+        resultado = {
+            campo: _unanime(explicaciones[campo], valores, hoy, hoy)
+            for campo in ('check_in', 'cant_personas', 'cantidad_habitaciones', 'tipo_habitaciones')
+        }
+        check_in = _a_fecha(resultado['check_in'], ahora)
+        base = check_in or hoy
+        resultado['check_out'] = _unanime(explicaciones['check_out'], valores, base, base + timedelta(days=1))
+    except (KeyError, IndexError, ValueError, OverflowError):
+        return None
+    return resultado
+
+class CachePlantillas:
+    """Plantillas aprendidas, con LRU y contadores de uso"""
+
+    def __init__(self, maximo=PLANTILLAS_MAX):
+        self.maximo = maximo
+        self.plantillas = OrderedDict()
+        self.lock = threading.Lock()
+        self.contadores = {
+            "consultas": 0,
+            "locales": 0,
+            "sin_plantilla": 0,
+            "no_confiables": 0,
+            "ambiguas": 0,
+            "verificaciones": 0,
+            "ejemplos": 0,
+            "aciertos": 0,
+            "fallos": 0,
+            "descartadas": 0,
+        }
+
+    def _confiable(self, entrada):
+        verificadas = entrada["aciertos"] + entrada["fallos"]
+        if (entrada["aciertos"] < PLANTILLAS_MIN_ACIERTOS
+                or entrada["aciertos"] / verificadas < PLANTILLAS_PRECISION_MIN):
+            return False
+        # Un desplazamiento desde hoy visto un solo día no distingue "mañana"
+        # (siempre +1) de "el viernes" (cambia cada día)
+        return len(entrada["dias"]) > 1 or not _relativa_a_hoy(entrada["explicaciones"])
+
+    def buscar(self, mensaje, ahora):
+        """
+        Extracción local del mensaje
+
+        Args:
+            ahora: datetime de referencia para fechas relativas
+
+        Returns:
+            Diccionario con los campos de la reserva, o None si el mensaje
+            debe ir al LLM
+        """
+        clave, valores = plantilla(mensaje)
+        with self.lock:
+            self.contadores["consultas"] += 1
+            entrada = self.plantillas.get(clave)
+            if entrada is None or len(valores) > MAX_RANURAS:
+                self.contadores["sin_plantilla"] += 1
+                return None
+            self.plantillas.move_to_end(clave)
+            if not self._confiable(entrada):
+                self.contadores["no_confiables"] += 1
+                return None
+            explicaciones = entrada["explicaciones"]
+
+        resultado = predecir(explicaciones, valores, ahora)
+        with self.lock:
+            if resultado is None:
+                self.contadores["ambiguas"] += 1
+                return None
+            if random.random() < PLANTILLAS_MUESTREO:
+                self.contadores["verificaciones"] += 1
+                return None
+            self.contadores["locales"] += 1
+            entrada["locales"] += 1
+        return resultado
+
+    def aprender(self, mensaje, resultado, ahora):
+        """
+        Incorpora una extracción del LLM: verifica la predicción de la
+        plantilla y descarta las explicaciones que el resultado contradice
+        """
+        clave, valores = plantilla(mensaje)
+        if len(valores) > MAX_RANURAS:
+            return
+        nuevas = candidatos(resultado, valores, ahora)
+        esperado = {campo: resultado.get(campo) or None for campo in CAMPOS}
+
+        with self.lock:
+            self.contadores["ejemplos"] += 1
+            entrada = self.plantillas.get(clave)
+            if entrada is None:
+                self.plantillas[clave] = {
+                    "explicaciones": nuevas, "dias": {ahora.date()}, "ejemplos": 1,
+                    "aciertos": 0, "fallos": 0, "locales": 0,
+                }
+                while len(self.plantillas) > self.maximo:
+                    self.plantillas.popitem(last=False)
+                    self.contadores["descartadas"] += 1
+                return
+            self.plantillas.move_to_end(clave)
+            explicaciones = entrada["explicaciones"]
+
+        prediccion = predecir(explicaciones, valores, ahora)
+        interseccion = {campo: explicaciones[campo] & nuevas[campo] for campo in CAMPOS}
+
+        with self.lock:
+            entrada["ejemplos"] += 1
+            if prediccion is not None:
+                acierto = {campo: prediccion[campo] or None for campo in CAMPOS} == esperado
+                entrada["aciertos" if acierto else "fallos"] += 1
+                self.contadores["aciertos" if acierto else "fallos"] += 1
+            # Si ninguna explicación sobrevive la plantilla no es regular
+            # (ej: "el viernes"); se reinicia con este ejemplo y los fallos
+            # acumulados le impiden responder localmente
+            if all(interseccion.values()):
+                entrada["explicaciones"] = interseccion
+                if len(entrada["dias"]) < 2:
+                    entrada["dias"].add(ahora.date())
+            else:
+                entrada["explicaciones"] = nuevas
+                entrada["dias"] = {ahora.date()}
+
+    def estadisticas(self):
+        with self.lock:
+            estadisticas = dict(self.contadores)
+            estadisticas["plantillas"] = len(self.plantillas)
+            estadisticas["confiables"] = sum(1 for e in self.plantillas.values() if self._confiable(e))
+        consultas = estadisticas["consultas"]
+        estadisticas["tasa_local"] = round(estadisticas["locales"] / consultas, 3) if consultas else 0.0
+        return estadisticas
+
+    def mas_usadas(self, cantidad=10):
+        """[(plantilla, ejemplos, aciertos, fallos, locales)] por uso local"""
+        with self.lock:
+            filas = [(clave, e["ejemplos"], e["aciertos"], e["fallos"], e["locales"])
+                     for clave, e in self.plantillas.items()]
+        return sorted(filas, key=lambda fila: (fila[4], fila[1]), reverse=True)[:cantidad]
+
+cache_plantillas = CachePlantillas()
+
+# Formas de frase para la simulación: (plantilla, generador de valores, extracción esperada)
+_DIAS_SEMANA = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
+
+def _simulacion():
+    from datetime import datetime
+
+    def fecha(d):
+        return d.strftime('%Y-%m-%d')
+
+    def rango(hoy, a, b):
+        entrada = _proximo_dia(a, hoy)
+        return entrada, _proximo_dia(b, entrada + timedelta(days=1))
+
+    def personas_rango(azar, hoy):
+        p, a = azar.randint(1, 8), azar.randint(1, 28)
+        b = azar.randint(1, 28)
+        entrada, salida = rango(hoy, a, b)
+        return (f"{p} personas del {a} al {b}",
+                {"check_in": fecha(entrada), "check_out": fecha(salida), "cant_personas": str(p)})
+
+    def somos_manana(azar, hoy):
+        p, h = azar.randint(2, 9), azar.randint(1, 4)
+        tipo = azar.choice(['estandar', 'superior'])
+        entrada = hoy + timedelta(days=1)
+        return (f"Hola! somos {p}, necesitamos {h} habitaciones {tipo} para mañana",
+                {"check_in": fecha(entrada), "check_out": fecha(entrada + timedelta(days=1)),
+                 "cant_personas": str(p), "cantidad_habitaciones": str(h),
+                 "tipo_habitaciones": f"{h} {tipo}"})
+
+    def noches(azar, hoy):
+        p, n, a = azar.randint(1, 6), azar.randint(1, 7), azar.randint(1, 28)
+        entrada = _proximo_dia(a, hoy)
+        return (f"cotizacion para {p} personas, {n} noches desde el {a}",
+                {"check_in": fecha(entrada), "check_out": fecha(entrada + timedelta(days=n)),
+                 "cant_personas": str(p)})
+
+    def mixta(azar, hoy):
+        e, s, a, b = azar.randint(1, 3), azar.randint(1, 2), azar.randint(1, 28), azar.randint(1, 28)
+        entrada, salida = rango(hoy, a, b)
+        return (f"quiero {e} estandar y {s} superior del {a} al {b}",
+                {"check_in": fecha(entrada), "check_out": fecha(salida),
+                 "cantidad_habitaciones": str(e + s), "tipo_habitaciones": f"{e} estandar, {s} superior"})
+
+    def dia_semana(azar, hoy):
+        p, dia = azar.randint(1, 4), azar.choice(_DIAS_SEMANA)
+        entrada = hoy + timedelta(days=(_DIAS_SEMANA.index(dia) - hoy.weekday()) % 7 or 7)
+        return (f"hay disponibilidad el {dia} para {p}?",
+                {"check_in": fecha(entrada), "check_out": fecha(entrada + timedelta(days=1)),
+                 "cant_personas": str(p)})
+
+    def unica(azar, hoy):
+        return (f"consulta {azar.random():.8f} sobre {azar.choice(_DIAS_SEMANA)}", {})
+
+    formas = [personas_rango, somos_manana, noches, mixta, dia_semana, unica]
+    pesos = [30, 20, 15, 10, 10, 15]
+
+    azar = random.Random(5)
+    random.seed(5)
+    cache = CachePlantillas()
+    locales = correctas = llamadas = 0
+    for dia in range(14):
+        ahora = datetime(2026, 10, 1, 12) + timedelta(days=dia)
+        for _ in range(500):
+            forma = azar.choices(formas, pesos)[0]
+            mensaje, esperado = forma(azar, ahora.date())
+            esperado = {campo: esperado.get(campo) for campo in CAMPOS}
+            local = cache.buscar(mensaje, ahora)
+            if local is not None:
+                locales += 1
+                correctas += local == esperado
+            else:
+                llamadas += 1
+                cache.aprender(mensaje, esperado, ahora)
+
+    total = locales + llamadas
+    print(f"Mensajes: {total} | respondidos localmente: {locales / total:.1%} | "
+          f"precisión local: {correctas / max(locales, 1):.2%} | llamadas al LLM: {llamadas}")
+    print(cache.estadisticas())
+    print("\nejemplos aciertos fallos locales  plantilla")
+    for clave, ejemplos, aciertos, fallos, usos in cache.mas_usadas(6):
+        print(f"{ejemplos:8d} {aciertos:8d} {fallos:6d} {usos:7d}  {clave}")
+
+if __name__ == "__main__":
+    _simulacion()
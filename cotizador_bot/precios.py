@@ -1,5 +1,18 @@
 from config import PRECIOS_HABITACIONES
-import re
+from functools import lru_cache
+from promociones import obtener_tabla, caracteristicas, evaluar
+from lexico import (
+    normalizar_texto, tokenizar, tipos_mencionados, dividir_por_separador,
+    NUMERO, TIPO_HABITACION, FRASES_TIPO
+)
+
+# Tipo canónico del léxico -> nombre usado en PRECIOS_HABITACIONES
+NOMBRES_TIPO_HABITACION = {
+    'single': 'Habitación Single',
+    'estandar': 'Habitación Estándar',
+    'superior': 'Habitación Superior',
+    'doble': 'Habitación Doble 2 Camas',
+}
 
 def obtener_precios_habitaciones():
     """
@@ -8,6 +21,7 @@ def obtener_precios_habitaciones():
     """
     return PRECIOS_HABITACIONES.copy()
 
+@lru_cache(maxsize=256)
 def normalizar_tipo_habitacion(tipo_str):
     """
     Normaliza el nombre del tipo de habitación a formato estándar
@@ -18,30 +32,15 @@ def normalizar_tipo_habitacion(tipo_str):
     Returns:
         String normalizado (ej: "Habitación Single")
     """
-    if not tipo_str:
-        return 'Habitación Estándar'  # Default
+    tipos = tipos_mencionados(tokenizar(tipo_str)) if tipo_str else []
+    if not tipos and tipo_str:
+        normalizado = normalizar_texto(tipo_str)
+        tipos = [tipo for frase, tipo in FRASES_TIPO.items() if frase in normalizado]
     
-    tipo_lower = tipo_str.lower().strip()
-    
-    # Normalizar caracteres especiales
-    tipo_lower = (tipo_lower
-        .replace('á', 'a')
-        .replace('é', 'e')
-        .replace('í', 'i')
-        .replace('ó', 'o')
-        .replace('ú', 'u'))
-    
-    # Mapeo de tipos
-    if 'single' in tipo_lower or 'sencilla' in tipo_lower or 'individual' in tipo_lower:
-        return 'Habitación Single'
-    elif 'estandar' in tipo_lower or 'standard' in tipo_lower:
-        return 'Habitación Estándar'
-    elif 'superior' in tipo_lower or 'premium' in tipo_lower:
-        return 'Habitación Superior'
-    elif 'doble' in tipo_lower or 'matrimonial' in tipo_lower or '2 camas' in tipo_lower:
-        return 'Habitación Doble 2 Camas'
-    else:
+    if not tipos:
         return 'Habitación Estándar'  # Default
+    
+    return NOMBRES_TIPO_HABITACION[tipos[0]]
 
 def parsear_tipos_habitaciones(tipo_habitaciones_str):
     """
@@ -58,63 +57,18 @@ def parsear_tipos_habitaciones(tipo_habitaciones_str):
         return []
     
     habitaciones = []
-    tipo_str_lower = tipo_habitaciones_str.lower().strip()
-    
-    # Normalizar caracteres
-    tipo_str_lower = (tipo_str_lower
-        .replace('á', 'a')
-        .replace('é', 'e')
-        .replace('í', 'i')
-        .replace('ó', 'o')
-        .replace('ú', 'u'))
     
     # Separar por comas, "y", "e"
-    partes = re.split(r'[,;]|\s+y\s+|\s+e\s+', tipo_str_lower)
-    
-    # Palabras a números
-    palabras_a_numeros = {
-        'un': 1, 'una': 1,
-        'dos': 2,
-        'tres': 3,
-        'cuatro': 4,
-        'cinco': 5,
-        'seis': 6,
-        'siete': 7,
-        'ocho': 8,
-        'nueve': 9,
-        'diez': 10
-    }
-    
-    # Procesar cada parte
-    for parte in partes:
-        parte = parte.strip()
-        if not parte:
-            continue
-        
-        # Patrón: "2 estandar" o "dos estandar"
-        match_numero = re.search(r'^(\d+)\s*(single|estandar|standard|superior|doble|sencilla|individual|matrimonial)', parte)
-        match_palabra = re.search(r'^(un|una|dos|tres|cuatro|cinco|seis|siete|ocho|nueve|diez)\s*(single|estandar|standard|superior|doble|sencilla|individual|matrimonial)', parte)
-        
-        if match_numero:
-            cantidad = int(match_numero.group(1))
-            tipo = match_numero.group(2)
-            habitaciones.append((tipo, cantidad))
-        
-        elif match_palabra:
-            cantidad = palabras_a_numeros.get(match_palabra.group(1), 1)
-            tipo = match_palabra.group(2)
-            habitaciones.append((tipo, cantidad))
-        
+    for parte in dividir_por_separador(tokenizar(tipo_habitaciones_str)):
+        # Patrón: "2 estandar" o "dos estandar" al inicio de la parte
+        if (len(parte) > 1 and parte[0].tipo == NUMERO and parte[0].contiguo
+                and parte[1].tipo == TIPO_HABITACION and parte[1].contiguo):
+            habitaciones.append((parte[1].valor, parte[0].valor))
         else:
             # Solo tipo sin cantidad explícita
-            if 'single' in parte or 'sencilla' in parte or 'individual' in parte:
-                habitaciones.append(('single', 1))
-            elif 'estandar' in parte or 'standard' in parte:
-                habitaciones.append(('estandar', 1))
-            elif 'superior' in parte or 'premium' in parte:
-                habitaciones.append(('superior', 1))
-            elif 'doble' in parte or 'matrimonial' in parte:
-                habitaciones.append(('doble', 1))
+            tipos = tipos_mencionados(parte)
+            if tipos:
+                habitaciones.append((tipos[0], 1))
     
     # Si no se encontró nada, retornar una habitación estándar
     if not habitaciones:
@@ -122,14 +76,19 @@ def parsear_tipos_habitaciones(tipo_habitaciones_str):
     
     return habitaciones
 
-def calcular_totales(tipo_habitaciones_str, cantidad_noches, precios):
+def calcular_totales(tipo_habitaciones_str, cantidad_noches, precios,
+                     check_in=None, codigo_promocion=None, fecha_cotizacion=None):
     """
-    Calcula los totales de la cotización basado en tipos de habitaciones y noches
+    Calcula los totales de la cotización basado en tipos de habitaciones y noches,
+    aplicando las promociones vigentes (promociones.json)
     
     Args:
         tipo_habitaciones_str: String con tipos y cantidades (ej: "2 estandar, 1 superior")
         cantidad_noches: Número de noches
         precios: Diccionario con precios por tipo de habitación
+        check_in: Fecha de entrada "YYYY-MM-DD", para promociones por día o anticipación
+        codigo_promocion: Código de promoción del cliente
+        fecha_cotizacion: date de referencia para la anticipación (hoy por defecto)
     
     Returns:
         Diccionario con:
@@ -143,9 +102,14 @@ def calcular_totales(tipo_habitaciones_str, cantidad_noches, precios):
                 },
                 ...
             ],
-            "total_neto": 300000,
-            "iva": 57000,
-            "total_bruto": 357000
+            "subtotal": 300000,
+            "descuentos": [
+                {"nombre": "Estadía 3+ noches", "grupo": "estadia", "porcentaje": 5, "monto": 15000}
+            ],
+            "total_descuentos": 15000,
+            "total_neto": 285000,
+            "iva": 54150,
+            "total_bruto": 339150
         }
     """
     
@@ -157,7 +121,8 @@ def calcular_totales(tipo_habitaciones_str, cantidad_noches, precios):
         habitaciones_parseadas = [('estandar', 1)]
     
     habitaciones_detalle = []
-    total_neto = 0
+    subtotales_tipo = []
+    subtotal = 0
     
     # Procesar cada tipo de habitación
     for tipo, cantidad in habitaciones_parseadas:
@@ -177,7 +142,16 @@ def calcular_totales(tipo_habitaciones_str, cantidad_noches, precios):
             "total": total_tipo
         })
         
-        total_neto += total_tipo
+        subtotales_tipo.append((tipo, cantidad, total_tipo))
+        subtotal += total_tipo
+    
+    tabla = obtener_tabla()
+    descuentos = evaluar(tabla, caracteristicas(
+        tabla, subtotales_tipo, cantidad_noches,
+        check_in, codigo_promocion, fecha_cotizacion
+    ))
+    total_descuentos = sum(descuento['monto'] for descuento in descuentos)
+    total_neto = subtotal - total_descuentos
     
     # Calcular IVA (19% en Chile)
     iva = int(total_neto * 0.19)
@@ -185,6 +159,9 @@ def calcular_totales(tipo_habitaciones_str, cantidad_noches, precios):
     
     return {
         "habitaciones": habitaciones_detalle,
+        "subtotal": subtotal,
+        "descuentos": descuentos,
+        "total_descuentos": total_descuentos,
         "total_neto": total_neto,
         "iva": iva,
         "total_bruto": total_bruto
@@ -251,7 +228,8 @@ def obtener_precio_maximo():
 
 def calcular_descuento(total_neto, cantidad_noches):
     """
-    Calcula descuentos por cantidad de noches (opcional)
+    Calcula el descuento por cantidad de noches según las reglas del grupo
+    "estadia" de promociones.json
     
     Args:
         total_neto: Total neto sin descuentos
@@ -265,17 +243,16 @@ def calcular_descuento(total_neto, cantidad_noches):
             "total_con_descuento": 270000
         }
     """
-    descuento_porcentaje = 0
-    
-    # Descuentos por estadía larga
-    if cantidad_noches >= 7:
-        descuento_porcentaje = 15  # 15% para 7+ noches
-    elif cantidad_noches >= 5:
-        descuento_porcentaje = 10  # 10% para 5-6 noches
-    elif cantidad_noches >= 3:
-        descuento_porcentaje = 5   # 5% para 3-4 noches
+    tabla = obtener_tabla()
+    descuentos = [
+        descuento for descuento in evaluar(
+            tabla, caracteristicas(tabla, [('estandar', 1, total_neto)], cantidad_noches)
+        )
+        if descuento['grupo'] == 'estadia'
+    ]
     
-    descuento_monto = int(total_neto * (descuento_porcentaje / 100))
+    descuento_porcentaje = descuentos[0]['porcentaje'] if descuentos else 0
+    descuento_monto = descuentos[0]['monto'] if descuentos else 0
     total_con_descuento = total_neto - descuento_monto
     
     return {
@@ -334,11 +311,26 @@ if __name__ == "__main__":
     resultado = calcular_totales("2 estandar, 1 superior", 3, precios)
     
     print(f"  Habitaciones: {resultado['habitaciones']}")
+    print(f"  Subtotal: {formatear_precio(resultado['subtotal'])}")
+    for descuento in resultado['descuentos']:
+        print(f"  {descuento['nombre']} ({descuento['porcentaje']:g}%): -{formatear_precio(descuento['monto'])}")
     print(f"  Total Neto: {formatear_precio(resultado['total_neto'])}")
     print(f"  IVA: {formatear_precio(resultado['iva'])}")
     print(f"  Total Bruto: {formatear_precio(resultado['total_bruto'])}")
     print()
     
-    # Test 4: Generar resumen
-    print("Test 4: Resumen de precios")
+    # Test 4: Promociones
+    print("Test 4: Calcular totales con promociones")
+    from datetime import date, timedelta
+    check_in = (date.today() + timedelta(days=45)).strftime('%Y-%m-%d')
+    resultado = calcular_totales("3 superior", 7, precios, check_in=check_in)
+    
+    for descuento in resultado['descuentos']:
+        print(f"  {descuento['nombre']} ({descuento['porcentaje']:g}%): -{formatear_precio(descuento['monto'])}")
+    print(f"  Subtotal: {formatear_precio(resultado['subtotal'])} -> Neto: {formatear_precio(resultado['total_neto'])}")
+    print(f"  calcular_descuento(300000, 5): {calcular_descuento(300000, 5)}")
+    print()
+    
+    # Test 5: Generar resumen
+    print("Test 5: Resumen de precios")
     print(generar_resumen_precios())
\ No newline at end of file
@@ -0,0 +1,334 @@
+"""
+Motor de promociones y descuentos.
+
+Las reglas se declaran en PROMOCIONES_PATH (JSON) y al cargarse se compilan
+a una tabla de decisión plana: una columna numpy por condición y una fila
+por regla. Evaluar una cotización es una sola pasada vectorizada sobre la
+tabla; evaluar_lote() hace lo mismo para muchas cotizaciones a la vez.
+
+Formato de una regla:
+    {
+        "nombre": "Estadía 7+ noches",       # Texto de la línea en el PDF
+        "grupo": "estadia",                  # Reglas excluyentes entre sí
+        "porcentaje": 15,
+        "aplica_a": ["superior"],            # Opcional: tipos sobre los que se descuenta
+        "condiciones": {
+            "noches_min": 7, "noches_max": 10,
+            "habitaciones_min": 2, "habitaciones_max": 5,
+            "dias_semana": ["viernes", "sabado"],   # Día del check-in
+            "anticipacion_min": 30, "anticipacion_max": 90,  # Días hasta el check-in
+            "check_in_desde": "2026-12-01", "check_in_hasta": "2027-02-28",
+            "codigo": "BYTE10"
+        }
+    }
+
+El archivo del repositorio trae solo los tramos por estadía larga (los de
+calcular_descuento); el resto de las condiciones queda disponible para las
+promociones que defina el hotel y bench_promociones.py las ejercita con
+reglas sintéticas.
+
+De cada grupo se aplica solo la regla de mayor monto; los grupos se suman en
+el orden del archivo y el total se limita a DESCUENTO_MAXIMO por ciento del
+subtotal (el último grupo que excede el límite se recorta).
+"""
+import json
+import os
+import re
+from collections import namedtuple
+from datetime import date, datetime
+import numpy as np
+from config import PROMOCIONES_PATH, DESCUENTO_MAXIMO
+from lexico import normalizar_texto, ORDEN_TIPOS
+
+DIAS_SEMANA = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
+
+CONDICIONES = {
+    'noches_min', 'noches_max', 'habitaciones_min', 'habitaciones_max',
+    'dias_semana', 'anticipacion_min', 'anticipacion_max',
+    'check_in_desde', 'check_in_hasta', 'codigo',
+}
+
+# Condiciones que solo pueden cumplirse si la cotización tiene check-in
+CONDICIONES_FECHA = {
+    'dias_semana', 'anticipacion_min', 'anticipacion_max',
+    'check_in_desde', 'check_in_hasta',
+}
+
+SIN_LIMITE = 2 ** 62
+TODOS_LOS_DIAS = 0b1111111
+SIN_CODIGO = -1
+CODIGO_DESCONOCIDO = -2
+
+TablaPromociones = namedtuple('TablaPromociones', [
+    'nombres', 'grupos', 'inicios_grupo', 'codigos',
+    'noches_min', 'noches_max', 'habitaciones_min', 'habitaciones_max',
+    'dias', 'anticipacion_min', 'anticipacion_max', 'desde', 'hasta',
+    'requiere_fecha', 'codigo', 'tipos', 'porcentaje',
+])
+
+def _ordinal(fecha, nombre):
+    try:
+        return datetime.strptime(fecha, '%Y-%m-%d').toordinal()
+    except (TypeError, ValueError):
+        raise ValueError(f"Promoción '{nombre}': fecha inválida {fecha!r}")
+
+def _nombre_grupo(regla):
+    # Una regla sin grupo forma un grupo propio
+    return str(regla.get('grupo') or regla.get('nombre'))
+
+def compilar_reglas(reglas):
+    """
+    Compila la lista de reglas a una tabla de decisión
+
+    Args:
+        reglas: Lista de diccionarios con el formato del archivo de reglas
+
+    Returns:
+        TablaPromociones con las filas ordenadas por grupo
+
+    Raises:
+        ValueError si una regla tiene condiciones o valores desconocidos
+    """
+    # Los grupos quedan contiguos, en el orden en que aparecen en el archivo
+    orden_grupos = {}
+    for regla in reglas:
+        orden_grupos.setdefault(_nombre_grupo(regla), len(orden_grupos))
+    reglas = sorted(reglas, key=lambda regla: orden_grupos[_nombre_grupo(regla)])
+    codigos = {}
+    filas = []
+
+    for regla in reglas:
+        nombre = regla.get('nombre', '?')
+        condiciones = regla.get('condiciones', {})
+
+        desconocidas = set(condiciones) - CONDICIONES
+        if desconocidas:
+            raise ValueError(f"Promoción '{nombre}': condiciones desconocidas {sorted(desconocidas)}")
+
+        dias = TODOS_LOS_DIAS
+        if 'dias_semana' in condiciones:
+            dias = 0
+            for dia in condiciones['dias_semana']:
+                dia = normalizar_texto(dia)
+                if dia not in DIAS_SEMANA:
+                    raise ValueError(f"Promoción '{nombre}': día desconocido {dia!r}")
+                dias |= 1 << DIAS_SEMANA.index(dia)
+
+        tipos = [1.0] * len(ORDEN_TIPOS)
+        if regla.get('aplica_a'):
+            tipos = [0.0] * len(ORDEN_TIPOS)
+            for tipo in regla['aplica_a']:
+                if tipo not in ORDEN_TIPOS:
+                    raise ValueError(f"Promoción '{nombre}': tipo de habitación desconocido {tipo!r}")
+                tipos[ORDEN_TIPOS.index(tipo)] = 1.0
+
+        codigo = SIN_CODIGO
+        if condiciones.get('codigo'):
+            codigo = codigos.setdefault(str(condiciones['codigo']).upper(), len(codigos))
+
+        filas.append((
+            nombre,
+            _nombre_grupo(regla),
+            condiciones.get('noches_min', 0),
+            condiciones.get('noches_max', SIN_LIMITE),
+            condiciones.get('habitaciones_min', 0),
+            condiciones.get('habitaciones_max', SIN_LIMITE),
+            dias,
+            condiciones.get('anticipacion_min', -SIN_LIMITE),
+            condiciones.get('anticipacion_max', SIN_LIMITE),
+            _ordinal(condiciones['check_in_desde'], nombre) if 'check_in_desde' in condiciones else 0,
+            _ordinal(condiciones['check_in_hasta'], nombre) if 'check_in_hasta' in condiciones else SIN_LIMITE,
+            bool(CONDICIONES_FECHA & set(condiciones)),
+            codigo,
+            tipos,
+            float(regla.get('porcentaje', 0)),
+        ))
+
+    columnas = list(zip(*filas)) if filas else [[] for _ in range(15)]
+    grupos = list(columnas[1])
+    inicios = [i for i, grupo in enumerate(grupos) if i == 0 or grupo != grupos[i - 1]]
+    enteros = [np.array(columna, dtype=np.int64) for columna in columnas[2:11]]
+
+    return TablaPromociones(
+        list(columnas[0]),
+        [grupos[i] for i in inicios],
+        np.array(inicios, dtype=np.intp),
+        codigos,
+        *enteros,
+        np.array(columnas[11], dtype=bool),
+        np.array(columnas[12], dtype=np.int64),
+        np.array(columnas[13], dtype=np.float64).reshape(-1, len(ORDEN_TIPOS)),
+        np.array(columnas[14], dtype=np.float64),
+    )
+
+_cache = {"ruta": None, "mtime": None, "tabla": None}
+
+def obtener_tabla(ruta=PROMOCIONES_PATH):
+    """
+    Tabla compilada de las reglas del archivo. Se recompila solo si el
+    archivo cambió; sin archivo no hay promociones.
+    """
+    try:
+        mtime = os.path.getmtime(ruta)
+    except OSError:
+        mtime = None
+
+    if _cache["tabla"] is None or _cache["ruta"] != ruta or _cache["mtime"] != mtime:
+        reglas = []
+        if mtime is not None:
+            with open(ruta, encoding='utf-8') as archivo:
+                reglas = json.load(archivo)
+        _cache.update(ruta=ruta, mtime=mtime, tabla=compilar_reglas(reglas))
+
+    return _cache["tabla"]
+
+def detectar_codigo_promocion(texto, tabla=None):
+    """Retorna el primer código de promoción vigente mencionado en el texto"""
+    if not texto:
+        return None
+    tabla = tabla or obtener_tabla()
+    if not tabla.codigos:
+        return None
+    for palabra in re.findall(r'[A-Za-z0-9]+', texto):
+        if palabra.upper() in tabla.codigos:
+            return palabra.upper()
+    return None
+
+def caracteristicas(tabla, habitaciones, cantidad_noches, check_in=None,
+                    codigo_promocion=None, fecha_cotizacion=None):
+    """
+    Fila de la cotización en el formato que consume la tabla
+
+    Args:
+        habitaciones: Lista de tuplas (tipo, cantidad, subtotal) con el tipo
+            canónico del léxico (ej: [("estandar", 2, 479880)])
+        cantidad_noches: Número de noches
+        check_in: Fecha de entrada "YYYY-MM-DD" (opcional)
+        codigo_promocion: Código ingresado por el cliente (opcional)
+        fecha_cotizacion: date de referencia para la anticipación (hoy por defecto)
+
+    Returns:
+        Tupla (noches, habitaciones, dia, anticipacion, ordinal, tiene_fecha,
+        codigo, subtotales_por_tipo)
+    """
+    subtotales = [0] * len(ORDEN_TIPOS)
+    for tipo, _, subtotal in habitaciones:
+        subtotales[ORDEN_TIPOS.index(tipo)] += subtotal
+
+    codigo = SIN_CODIGO
+    if codigo_promocion:
+        codigo = tabla.codigos.get(str(codigo_promocion).upper(), CODIGO_DESCONOCIDO)
+
+    try:
+        fecha = datetime.strptime(check_in, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        fecha = None
+
+    dia = anticipacion = ordinal = 0
+    if fecha is not None:
+        dia = fecha.weekday()
+        anticipacion = (fecha - (fecha_cotizacion or date.today())).days
+        ordinal = fecha.toordinal()
+
+    return (
+        cantidad_noches,
+        sum(cantidad for _, cantidad, _ in habitaciones),
+        dia,
+        anticipacion,
+        ordinal,
+        fecha is not None,
+        codigo,
+        subtotales,
+    )
+
+def _columnas(filas):
+    columnas = list(zip(*filas))
+    return (
+        [np.array(columna, dtype=np.int64)[:, None] for columna in columnas[:5]]
+        + [np.array(columnas[5], dtype=bool)[:, None],
+           np.array(columnas[6], dtype=np.int64)[:, None],
+           np.array(columnas[7], dtype=np.float64)]
+    )
+
+def _montos(tabla, columnas):
+    """Matriz cotizaciones x reglas con el monto de cada regla aplicable (0 si no aplica)"""
+    noches, habitaciones, dia, anticipacion, ordinal, tiene_fecha, codigo, subtotales = columnas
+
+    aplica = (
+        (noches >= tabla.noches_min) & (noches <= tabla.noches_max)
+        & (habitaciones >= tabla.habitaciones_min) & (habitaciones <= tabla.habitaciones_max)
+        & ((tabla.codigo == SIN_CODIGO) | (tabla.codigo == codigo))
+    )
+    fecha_ok = (
+        ((tabla.dias >> dia) & 1).astype(bool)
+        & (anticipacion >= tabla.anticipacion_min) & (anticipacion <= tabla.anticipacion_max)
+        & (ordinal >= tabla.desde) & (ordinal <= tabla.hasta)
+    )
+    aplica &= ~tabla.requiere_fecha | (tiene_fecha & fecha_ok)
+
+    base = subtotales @ tabla.tipos.T
+    return np.floor(base * tabla.porcentaje / 100) * aplica
+
+def evaluar(tabla, fila):
+    """
+    Descuentos de una cotización
+
+    Args:
+        tabla: TablaPromociones
+        fila: Resultado de caracteristicas()
+
+    Returns:
+        Lista de líneas de descuento, en el orden de la tabla:
+        [{"nombre": "Estadía 7+ noches", "grupo": "estadia", "porcentaje": 15, "monto": 71982}, ...]
+    """
+    if not tabla.nombres:
+        return []
+
+    montos = _montos(tabla, _columnas([fila]))[0]
+    subtotal = sum(fila[7])
+    disponible = int(subtotal * DESCUENTO_MAXIMO / 100)
+    limites = list(tabla.inicios_grupo[1:]) + [len(montos)]
+    por_grupo = np.maximum.reduceat(montos, tabla.inicios_grupo)
+    descuentos = []
+
+    for indice in np.flatnonzero(por_grupo).tolist():
+        inicio = tabla.inicios_grupo[indice]
+        mejor = inicio + int(np.argmax(montos[inicio:limites[indice]]))
+        monto = min(int(montos[mejor]), disponible)
+        if monto <= 0:
+            continue
+        disponible -= monto
+        # Si el límite recortó el monto, el porcentaje informado es el efectivo
+        porcentaje = round(tabla.porcentaje[mejor].item() * monto / montos[mejor].item(), 2)
+        descuentos.append({
+            "nombre": tabla.nombres[mejor],
+            "grupo": tabla.grupos[indice],
+            "porcentaje": int(porcentaje) if porcentaje.is_integer() else porcentaje,
+            "monto": monto,
+        })
+
+    return descuentos
+
+def evaluar_lote(tabla, filas, tamano_bloque=512):
+    """
+    Descuento total de muchas cotizaciones, vectorizado por bloques
+
+    Args:
+        tabla: TablaPromociones
+        filas: Lista de resultados de caracteristicas()
+        tamano_bloque: Cotizaciones por bloque (acota la matriz cotizaciones x reglas)
+
+    Returns:
+        np.ndarray int64 con el descuento total de cada cotización
+    """
+    totales = np.zeros(len(filas), dtype=np.int64)
+    if not tabla.nombres:
+        return totales
+
+    for inicio in range(0, len(filas), tamano_bloque):
+        columnas = _columnas(filas[inicio:inicio + tamano_bloque])
+        por_grupo = np.maximum.reduceat(_montos(tabla, columnas), tabla.inicios_grupo, axis=1)
+        maximo = np.floor(columnas[7].sum(axis=1) * DESCUENTO_MAXIMO / 100)
+        totales[inicio:inicio + len(por_grupo)] = np.minimum(por_grupo.sum(axis=1), maximo)
+
+    return totales
@@ -0,0 +1,175 @@
+"""
+Registro estructurado y no bloqueante.
+
+Los hilos de solicitud solo encolan el registro (QueueHandler sobre una cola
+sin límite); un hilo escritor dedicado (QueueListener) lo serializa a JSON y
+lo escribe en consola y, desde que el punto de entrada llama a
+configurar_registro(), en un archivo con rotación por tamaño.
+
+Cada etapa tiene su logger "cotizador.<etapa>" con nivel configurable por
+separado vía COTIZADOR_LOG_NIVELES="extraccion=DEBUG,envio=WARNING".
+Los registros incluyen automáticamente el message_id y el hash del número
+de la solicitud en curso (ver contexto_solicitud).
+"""
+import atexit
+import contextvars
+import copy
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from config import (
+    LOG_ARCHIVO, LOG_MAX_BYTES, LOG_RESPALDOS, LOG_CONSOLA,
+    LOG_NIVEL, LOG_NIVELES, NUMERO_SAL
+)
+
+_message_id = contextvars.ContextVar("message_id", default=None)
+_numero_hash = contextvars.ContextVar("numero_hash", default=None)
+
+_CAMPOS_EXTRA = ("duracion_ms", "datos")
+
+def digest_numero(numero):
+    """sha256 del número con NUMERO_SAL; base de hash_numero y de los seudónimos de grabacion.py"""
+    return hashlib.sha256(f"{NUMERO_SAL}{numero}".encode()).hexdigest()
+
+def hash_numero(numero):
+    """Identificador estable del número sin exponerlo en los registros"""
+    return digest_numero(numero)[:12]
+
+@contextmanager
+def contexto_solicitud(message_id, numero):
+    """Asocia message_id y número a todos los registros de la solicitud"""
+    token_id = _message_id.set(message_id)
+    token_numero = _numero_hash.set(hash_numero(numero))
+    try:
+        yield
+    finally:
+        _message_id.reset(token_id)
+        _numero_hash.reset(token_numero)
+
+def solicitud_actual():
+    """Tupla (message_id, numero_hash) de la solicitud en curso"""
+    return _message_id.get(), _numero_hash.get()
+
+class _QueueHandlerContexto(logging.handlers.QueueHandler):
+    """
+    Agrega el contexto de la solicitud y deja el registro listo para otro
+    hilo sin formatear nada costoso aquí
+    """
+    def prepare(self, record):
+        record.message_id = _message_id.get()
+        record.numero_hash = _numero_hash.get()
+        record.msg = record.getMessage()
+        record.args = None
+        # datos se serializa en el escritor: se copia para que el llamador
+        # pueda seguir modificando el dict que pasó en extra
+        datos = getattr(record, "datos", None)
+        if datos is not None:
+            record.datos = copy.deepcopy(datos)
+        if record.exc_info:
+            # El traceback se formatea aquí: los frames no sobreviven al hilo
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class FormateadorJSON(logging.Formatter):
+    def format(self, record):
+        registro = {
+            "ts": round(record.created, 3),
+            "nivel": record.levelname,
+            "etapa": record.name.rpartition(".")[2],
+            "mensaje": record.msg,
+            "message_id": getattr(record, "message_id", None),
+            "numero_hash": getattr(record, "numero_hash", None),
+        }
+        for campo in _CAMPOS_EXTRA:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                registro[campo] = valor
+        if record.exc_text:
+            registro["error"] = record.exc_text
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+_lock = threading.Lock()
+_cola = queue.SimpleQueue()
+_destinos = []
+_listener = None
+_configurado = False
+_archivo = None
+
+def _escuchar():
+    """(Re)inicia el hilo escritor con los destinos actuales; con _lock tomado"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    _listener = logging.handlers.QueueListener(_cola, *_destinos, respect_handler_level=True)
+    _listener.start()
+
+def _detener():
+    """Escribe lo pendiente y detiene el hilo escritor"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def _configurar():
+    """Loggers, niveles y consola; el archivo lo agrega configurar_registro()"""
+    global _configurado
+    with _lock:
+        if _configurado:
+            return
+        _configurado = True
+        atexit.register(_detener)
+
+        if LOG_CONSOLA:
+            consola = logging.StreamHandler()
+            consola.setFormatter(FormateadorJSON())
+            _destinos.append(consola)
+
+        raiz = logging.getLogger("cotizador")
+        raiz.setLevel(LOG_NIVEL)
+        raiz.propagate = False
+        raiz.addHandler(_QueueHandlerContexto(_cola))
+
+        for par in filter(None, LOG_NIVELES.split(",")):
+            etapa, _, nivel = par.partition("=")
+            logging.getLogger(f"cotizador.{etapa.strip()}").setLevel(nivel.strip().upper())
+
+        _escuchar()
+
+def configurar_registro(archivo=LOG_ARCHIVO):
+    """
+    Agrega el archivo con rotación, creando su directorio. La llaman los
+    puntos de entrada (app.py, app_async.py): importar un módulo no escribe
+    nada en disco. Las llamadas siguientes no hacen nada; archivo="" deja
+    solo la consola.
+    """
+    global _archivo
+    _configurar()
+    with _lock:
+        if _archivo is not None or not archivo:
+            return
+        directorio = os.path.dirname(archivo)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        _archivo = logging.handlers.RotatingFileHandler(
+            archivo, maxBytes=LOG_MAX_BYTES, backupCount=LOG_RESPALDOS, encoding="utf-8"
+        )
+        _archivo.setFormatter(FormateadorJSON())
+        _destinos.append(_archivo)
+        _escuchar()
+
+def obtener_logger(etapa):
+    """Logger de una etapa: extraccion, envio, cotizacion, webhook, ..."""
+    _configurar()
+    return logging.getLogger(f"cotizador.{etapa}")
+
+def ms_desde(inicio):
+    """Milisegundos transcurridos desde un time.perf_counter()"""
+    return round((time.perf_counter() - inicio) * 1000, 1)
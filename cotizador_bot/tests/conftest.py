@@ -0,0 +1,19 @@
+"""
+Configuración de las pruebas (python -m pytest desde cotizador_bot/ o la raíz).
+
+Los módulos del bot se importan por nombre (from config import ...), como al
+ejecutarlos desde cotizador_bot/. Antes de importar config se apagan los
+archivos que el bot puede escribir (archivo de registro, bitácora del LLM,
+historial) y se fija el número autorizado, para que las pruebas no dejen
+nada en el directorio de trabajo ni dependan de la configuración local.
+"""
+import os
+import sys
+
+DIRECTORIO_BOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRECTORIO_BOT)
+
+os.environ["COTIZADOR_BITACORA_LLM"] = ""
+os.environ["COTIZADOR_LOG_ARCHIVO"] = ""
+os.environ["COTIZADOR_HISTORIAL"] = ""
+os.environ["COTIZADOR_NUMERO_AUTORIZADO"] = "56911112222"
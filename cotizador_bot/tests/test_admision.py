@@ -0,0 +1,87 @@
+import threading
+import time
+import pytest
+import admision
+from admision import DESCARTADO, DIFERIDO, ControlAdmision
+
+def mensaje(numero, texto):
+    return {"numero": numero, "texto": texto}
+
+class Registro:
+    def __init__(self):
+        self.procesados = []
+        self.avisos = []
+        self.procesado = threading.Event()
+
+    def procesar(self, mensaje):
+        self.procesados.append(mensaje["texto"])
+        self.procesado.set()
+        return "success"
+
+    def avisar(self, mensaje, motivo):
+        self.avisos.append((mensaje["numero"], motivo))
+
+@pytest.fixture
+def registro():
+    return Registro()
+
+def test_con_cupo_procesa(registro):
+    control = ControlAdmision(registro.procesar, registro.avisar)
+    assert control.ejecutar(mensaje("a", "hola")) == "success"
+    assert registro.procesados == ["hola"] and registro.avisos == []
+    assert control.estadisticas()["en_curso"] == 0
+
+def test_sin_cupo_difiere_y_agrupa_por_numero(monkeypatch, registro):
+    control = ControlAdmision(registro.procesar, registro.avisar)
+    monkeypatch.setattr(admision, "ADMISION_MAX_EN_CURSO", 0)
+    monkeypatch.setattr(admision, "ADMISION_MAX_EN_ESPERA", 0)
+
+    assert control.ejecutar(mensaje("a", "somos 2")) == DIFERIDO
+    assert control.ejecutar(mensaje("a", "del 3 al 5")) == DIFERIDO
+    # Un solo aviso por número diferido
+    assert registro.avisos == [("a", DIFERIDO)]
+    assert control.estadisticas()["diferidos_pendientes"] == 1
+
+    monkeypatch.setattr(admision, "ADMISION_MAX_EN_CURSO", 1)
+    with control.condicion:
+        control.condicion.notify_all()
+    assert registro.procesado.wait(5)
+    assert registro.procesados == ["somos 2\ndel 3 al 5"]
+
+def test_cola_de_diferidos_llena_descarta(monkeypatch, registro):
+    control = ControlAdmision(registro.procesar, registro.avisar)
+    monkeypatch.setattr(admision, "ADMISION_MAX_EN_CURSO", 0)
+    monkeypatch.setattr(admision, "ADMISION_MAX_EN_ESPERA", 0)
+    monkeypatch.setattr(admision, "ADMISION_MAX_DIFERIDOS", 0)
+    assert control.ejecutar(mensaje("a", "hola")) == DESCARTADO
+    assert registro.avisos == [("a", DESCARTADO)]
+    assert control.estadisticas()["descartados"] == 1
+
+def test_carril_prioritario_entra_primero(monkeypatch):
+    monkeypatch.setattr(admision, "ADMISION_MAX_EN_CURSO", 1)
+    orden = []
+    dentro = threading.Event()
+    soltar = threading.Event()
+
+    def procesar(mensaje):
+        if mensaje["texto"] == "ocupado":
+            dentro.set()
+            soltar.wait(5)
+        orden.append(mensaje["texto"])
+        return "success"
+
+    control = ControlAdmision(procesar, lambda mensaje, motivo: None)
+    hilos = [threading.Thread(target=control.ejecutar, args=(mensaje("x", "ocupado"),))]
+    hilos[0].start()
+    assert dentro.wait(5)
+    hilos.append(threading.Thread(target=control.ejecutar, args=(mensaje("a", "normal"),)))
+    hilos[-1].start()
+    hilos.append(threading.Thread(target=control.ejecutar, args=(mensaje("b", "prioritario"), True)))
+    hilos[-1].start()
+    while control.estadisticas()["en_espera"] + control.estadisticas()["en_espera_prioridad"] < 2:
+        time.sleep(0.001)
+    soltar.set()
+    for hilo in hilos:
+        hilo.join(5)
+    assert orden == ["ocupado", "prioritario", "normal"]
+    assert control.estadisticas()["admitidos_prioridad"] == 1
@@ -0,0 +1,116 @@
+import base64
+import time
+from datetime import date, timedelta
+import pytest
+import app
+import conversaciones
+import envios
+import intenciones
+from config import NUMERO_AUTORIZADO, WEBHOOK_TOKEN
+
+CHECK_IN = (date.today() + timedelta(days=10)).isoformat()
+CHECK_OUT = (date.today() + timedelta(days=12)).isoformat()
+
+def payload(message_id, texto, numero=NUMERO_AUTORIZADO, event="messages.upsert"):
+    return {
+        "event": event, "instance": "hotel",
+        "data": {
+            "key": {"remoteJid": f"{numero}@s.whatsapp.net", "id": message_id, "fromMe": False},
+            "message": {"conversation": texto}, "messageTimestamp": int(time.time()),
+        },
+    }
+
+class Evolution:
+    """Reemplazo de post_evolution que anota los envíos"""
+
+    def __init__(self):
+        self.envios = []
+
+    def __call__(self, url, datos, timeout=10):
+        self.envios.append((url.rsplit("/", 2)[-2], datos))
+        return True
+
+    def esperar(self, cantidad):
+        limite = time.monotonic() + 5
+        while len(self.envios) < cantidad and time.monotonic() < limite:
+            time.sleep(0.005)
+        return [(tipo, datos) for tipo, datos in self.envios if tipo in ("sendText", "sendMedia")]
+
+@pytest.fixture
+def evolution(monkeypatch):
+    evolution = Evolution()
+    monkeypatch.setattr(app, "post_evolution", evolution)
+    monkeypatch.setattr(app, "DURACION_ESCRIBIENDO", 0)
+    for nombre in ("ENVIOS_TASA_DESTINATARIO", "ENVIOS_RAFAGA_DESTINATARIO",
+                   "ENVIOS_TASA_INSTANCIA", "ENVIOS_RAFAGA_INSTANCIA"):
+        monkeypatch.setattr(envios, nombre, 1000)
+    conversaciones.reiniciar()
+    yield evolution
+    conversaciones.reiniciar()
+
+@pytest.fixture
+def cliente():
+    return app.app.test_client()
+
+def post(cliente, datos, token=WEBHOOK_TOKEN):
+    return cliente.post(f"/webhook?token={token}", json=datos)
+
+def olvidar_conversacion(numero=NUMERO_AUTORIZADO):
+    """La conversación recién cerrada ignora mensajes por unos segundos"""
+    conversaciones._franja(numero).conversaciones.pop(numero, None)
+
+def test_token_invalido(cliente, evolution):
+    assert post(cliente, payload("m1", "hola"), token="otro").status_code == 401
+
+def test_filtros_del_webhook(cliente, evolution):
+    assert post(cliente, {"event": "presence.update"}).get_json() == {"status": "ok"}
+    respuesta = post(cliente, payload("m1", "hola", numero="56999999999"))
+    assert respuesta.get_json() == {"status": "no_autorizado"}
+    invalido = cliente.post(f"/webhook?token={WEBHOOK_TOKEN}", data=b'{"event": "messages.upsert", "x": "\\"'
+                            + NUMERO_AUTORIZADO.encode() + b'@')
+    assert invalido.status_code == 400
+    assert evolution.envios == []
+
+def test_saludo_sin_llm(cliente, evolution, monkeypatch):
+    monkeypatch.setattr(app, "extraer_informacion_reserva", pytest.fail)
+    assert post(cliente, payload("m1", "hola buenas tardes")).get_json() == {"status": "saludo"}
+    (tipo, datos), = evolution.esperar(2)
+    assert tipo == "sendText" and datos["text"].startswith("Hola!")
+    # El mismo mensaje reenviado no se procesa de nuevo
+    olvidar_conversacion()
+    assert post(cliente, payload("m1", "hola buenas tardes")).get_json() == {"status": "ok"}
+
+def test_reserva_en_dos_mensajes(cliente, evolution, monkeypatch):
+    llamadas = []
+
+    def extraer(texto, conocidos=None):
+        llamadas.append((texto, conocidos))
+        if conocidos is None:
+            return {"check_in": CHECK_IN, "check_out": CHECK_OUT, "cant_personas": None,
+                    "cantidad_habitaciones": None, "tipo_habitaciones": None}
+        return dict(conocidos, cant_personas="5")
+
+    monkeypatch.setattr(app, "extraer_informacion_reserva", extraer)
+    respuesta = post(cliente, payload("m1", f"quiero cotizar del {CHECK_IN} al {CHECK_OUT}"))
+    assert respuesta.get_json() == {"status": "info_incompleta"}
+    (_, pregunta), = evolution.esperar(3)
+    assert "Cantidad de personas" in pregunta["text"]
+    assert conversaciones.tiene_reserva_parcial(NUMERO_AUTORIZADO)
+
+    olvidar_conversacion()
+    assert post(cliente, payload("m2", "somos 5")).get_json() == {"status": "success"}
+    assert llamadas[1] == ("somos 5", {"check_in": CHECK_IN, "check_out": CHECK_OUT})
+    texto, pdf = evolution.esperar(7)[1:]
+    assert texto[0] == "sendText" and "Noches: 2" in texto[1]["text"]
+    assert "Habitaciones para 5 personas" in texto[1]["text"]
+    assert pdf[0] == "sendMedia" and base64.b64decode(pdf[1]["media"]).startswith(b"%PDF")
+    assert not conversaciones.tiene_reserva_parcial(NUMERO_AUTORIZADO)
+
+def test_health(cliente, evolution):
+    estado = cliente.get("/health").get_json()
+    assert estado["status"] == "activo"
+    assert "envios" in estado
+    assert estado["bitacora"] == estado["grabacion"] == {"activa": False}
+
+def test_modelo_de_intencion_entrenado_al_arrancar():
+    assert intenciones._modelo_cargado and intenciones._modelo is not None
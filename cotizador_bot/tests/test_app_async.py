@@ -0,0 +1,60 @@
+import asyncio
+import base64
+import time
+from datetime import date, timedelta
+import pytest
+import app_async
+import conversaciones
+import envios
+from config import NUMERO_AUTORIZADO, WEBHOOK_TOKEN
+
+CHECK_IN = (date.today() + timedelta(days=10)).isoformat()
+CHECK_OUT = (date.today() + timedelta(days=13)).isoformat()
+
+def payload(message_id, texto):
+    return {
+        "event": "messages.upsert", "instance": "hotel",
+        "data": {
+            "key": {"remoteJid": f"{NUMERO_AUTORIZADO}@s.whatsapp.net", "id": message_id, "fromMe": False},
+            "message": {"conversation": texto}, "messageTimestamp": int(time.time()),
+        },
+    }
+
+@pytest.fixture
+def envios_anotados(monkeypatch):
+    anotados = []
+
+    async def post_evolution(url, datos, timeout=10):
+        anotados.append((url.rsplit("/", 2)[-2], datos))
+        return True
+
+    async def extraer(texto, cliente, conocidos=None):
+        return {"check_in": CHECK_IN, "check_out": CHECK_OUT, "cant_personas": "2",
+                "cantidad_habitaciones": None, "tipo_habitaciones": None}
+
+    monkeypatch.setattr(app_async, "post_evolution", post_evolution)
+    monkeypatch.setattr(app_async, "extraer_informacion_reserva_async", extraer)
+    monkeypatch.setattr(app_async, "DURACION_ESCRIBIENDO", 0)
+    for nombre in ("ENVIOS_TASA_DESTINATARIO", "ENVIOS_RAFAGA_DESTINATARIO",
+                   "ENVIOS_TASA_INSTANCIA", "ENVIOS_RAFAGA_INSTANCIA"):
+        monkeypatch.setattr(envios, nombre, 1000)
+    conversaciones.reiniciar()
+    yield anotados
+    conversaciones.reiniciar()
+
+def test_cotizacion_completa(envios_anotados):
+    async def flujo():
+        async with app_async.app.test_app() as servidor:
+            cliente = servidor.test_client()
+            respuesta = await cliente.post(f"/webhook?token={WEBHOOK_TOKEN}", json=payload("a1", "2 personas"))
+            estado = await respuesta.get_json()
+            while app_async.planificador.colas:
+                await asyncio.sleep(0.005)
+            return estado
+
+    assert asyncio.run(flujo()) == {"status": "success"}
+    tipos = [tipo for tipo, _ in envios_anotados]
+    assert tipos == ["markMessageAsRead", "sendPresence", "sendText", "sendMedia"]
+    texto, pdf = envios_anotados[2][1], envios_anotados[3][1]
+    assert "Noches: 3" in texto["text"] and "Habitaciones para 2 personas: 1 estandar" in texto["text"]
+    assert base64.b64decode(pdf["media"]).startswith(b"%PDF")
@@ -0,0 +1,75 @@
+import pytest
+from asignacion import _fuerza_bruta, _mejores, asignar, catalogo, completar_habitaciones, describir
+
+PRECIOS = {
+    "Habitación Single": 50000,
+    "Habitación Estándar": 60000,
+    "Habitación Superior": 80000,
+    "Habitación Doble 2 Camas": 65000,
+}
+
+@pytest.mark.parametrize("personas", range(1, 11))
+@pytest.mark.parametrize("habitaciones", [None, 1, 2, 4])
+@pytest.mark.parametrize("disponibilidad", [{}, {"estandar": 1, "superior": 0}, {"single": 2, "doble": 1}])
+def test_mejores_coincide_con_fuerza_bruta(personas, habitaciones, disponibilidad):
+    productos = catalogo(PRECIOS, disponibilidad)
+    esperado = _fuerza_bruta(personas, productos, habitaciones, 5)
+    assert [opcion[:3] for opcion in _mejores(productos, personas, habitaciones, 5)] == esperado
+
+def test_asignar_aloja_a_todos_al_menor_costo():
+    asignaciones = asignar(7, PRECIOS)
+    assert asignaciones
+    costos = [asignacion.costo_noche for asignacion in asignaciones]
+    assert costos == sorted(costos)
+    for asignacion in asignaciones:
+        assert asignacion.capacidad >= 7
+    # 2 estándar + 1 superior (200.000) es lo más barato para 7
+    assert asignaciones[0].habitaciones == [("estandar", 2), ("superior", 1)]
+    assert asignaciones[0].costo_noche == 200000
+
+def test_asignar_respeta_disponibilidad_y_cantidad():
+    asignaciones = asignar(4, PRECIOS, disponibilidad={"estandar": 1}, habitaciones=2)
+    for asignacion in asignaciones:
+        assert sum(n for _, n in asignacion.habitaciones) == 2
+        assert dict(asignacion.habitaciones).get("estandar", 0) <= 1
+
+def test_asignar_sin_opciones():
+    assert asignar(5, PRECIOS, disponibilidad={tipo: 0 for tipo in ("single", "estandar", "superior", "doble")}) == []
+
+def test_completar_solo_personas():
+    reserva = {"cant_personas": "7", "tipo_habitaciones": None, "cantidad_habitaciones": None}
+    asignaciones = completar_habitaciones(reserva, PRECIOS)
+    assert reserva["tipo_habitaciones"] == describir(asignaciones[0].habitaciones) == "2 estandar, 1 superior"
+    assert reserva["cantidad_habitaciones"] == "3"
+    assert reserva["alternativas_habitaciones"][0] == ["2 estandar, 1 superior", 200000]
+    assert "habitaciones_agregadas" not in reserva
+
+def test_completar_tipo_sin_cantidad_que_no_alcanza():
+    reserva = {"cant_personas": "6", "tipo_habitaciones": "superior", "cantidad_habitaciones": None}
+    completar_habitaciones(reserva, PRECIOS)
+    assert reserva["tipo_habitaciones"] == "2 superior"
+
+def test_completar_respeta_cantidades_que_alcanzan():
+    reserva = {"cant_personas": "4", "tipo_habitaciones": "2 estandar", "cantidad_habitaciones": "2"}
+    assert completar_habitaciones(reserva, PRECIOS) == []
+    assert reserva == {"cant_personas": "4", "tipo_habitaciones": "2 estandar", "cantidad_habitaciones": "2"}
+
+def test_completar_agrega_habitaciones_a_cantidades_que_no_alcanzan():
+    reserva = {"cant_personas": "5", "tipo_habitaciones": "2 estandar", "cantidad_habitaciones": "2"}
+    asignaciones = completar_habitaciones(reserva, PRECIOS)
+    assert asignaciones[0].capacidad >= 5
+    # Las pedidas se conservan y se agrega lo que falta, primero del mismo tipo
+    assert reserva["tipo_habitaciones"] == "3 estandar"
+    assert reserva["cantidad_habitaciones"] == "3"
+    assert reserva["habitaciones_agregadas"] == "1 estandar"
+
+def test_completar_agregadas_respetan_disponibilidad_restante():
+    reserva = {"cant_personas": "5", "tipo_habitaciones": "2 estandar"}
+    completar_habitaciones(reserva, PRECIOS, disponibilidad={"estandar": 2})
+    assert reserva["habitaciones_agregadas"] == "1 single"
+    assert reserva["tipo_habitaciones"] == "1 single, 2 estandar"
+
+def test_completar_sin_personas_no_modifica():
+    reserva = {"cant_personas": None, "tipo_habitaciones": None}
+    assert completar_habitaciones(reserva, PRECIOS) == []
+    assert reserva == {"cant_personas": None, "tipo_habitaciones": None}
@@ -0,0 +1,74 @@
+import json
+import sqlite3
+import bitacora as modulo_bitacora
+from bitacora import ESTADO_JSON_INVALIDO, ESTADO_OK, Bitacora, fila_llamada, hash_prompt, reporte
+from registro import contexto_solicitud
+
+SOLICITUD = {"model": "gpt-4o-mini", "max_tokens": 150,
+             "messages": [{"role": "system", "content": "Extrae"}, {"role": "user", "content": "somos 2"}]}
+
+class Respuesta:
+    def __init__(self, status_code=200, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        if self.data is None:
+            raise ValueError("sin cuerpo")
+        return self.data
+
+OK = Respuesta(200, {"usage": {"prompt_tokens": 120, "completion_tokens": 30},
+                     "choices": [{"finish_reason": "stop"}]})
+
+def evento(response=OK, error=None, tipo="completa"):
+    return (1.0, "ABC", "h", tipo, SOLICITUD, 850.0, response, error)
+
+def test_fila_llamada_exitosa():
+    fila = fila_llamada(evento())
+    assert fila[3:5] == ("gpt-4o-mini", "completa")
+    assert fila[5] == hash_prompt(SOLICITUD)
+    assert fila[6] == len("Extraesomos 2")
+    assert fila[7:] == (150, 120, 30, 850.0, 200, "stop", ESTADO_OK, 0)
+
+def test_fila_llamada_con_errores():
+    assert fila_llamada(evento(Respuesta(429)))[-2:] == ("http_429", 1)
+    error = json.JSONDecodeError("x", "doc", 0)
+    assert fila_llamada(evento(OK, error))[-2:] == (ESTADO_JSON_INVALIDO, 1)
+    fila = fila_llamada(evento(None, TimeoutError()))
+    assert fila[11] is None and fila[-2] == "excepcion:TimeoutError"
+
+def test_hash_prompt_ignora_el_resto_de_la_solicitud():
+    assert hash_prompt(SOLICITUD) == hash_prompt(dict(SOLICITUD, max_tokens=80))
+    otro = dict(SOLICITUD, messages=[{"role": "user", "content": "somos 3"}])
+    assert hash_prompt(SOLICITUD) != hash_prompt(otro)
+
+def test_escribe_en_lotes_y_reporta(tmp_path, capsys):
+    ruta = str(tmp_path / "bitacora.db")
+    bitacora = Bitacora(ruta)
+    with contexto_solicitud("ABC", "56911112222"):
+        for _ in range(3):
+            bitacora.registrar_llamada("completa", SOLICITUD, 850.0, OK)
+        bitacora.registrar_llamada("faltantes", SOLICITUD, 400.0, Respuesta(500))
+        bitacora.registrar_cotizacion()
+    bitacora._detener()
+
+    conexion = sqlite3.connect(ruta)
+    filas = conexion.execute("SELECT message_id, tipo, estado, fallback FROM llamadas").fetchall()
+    assert filas == [("ABC", "completa", "ok", 0)] * 3 + [("ABC", "faltantes", "http_500", 1)]
+    assert conexion.execute("SELECT COUNT(*) FROM cotizaciones").fetchone() == (1,)
+    conexion.close()
+
+    reporte(ruta)
+    salida = capsys.readouterr().out
+    assert "completa" in salida and "faltantes" in salida
+
+def test_cola_llena_se_cuenta(monkeypatch, tmp_path):
+    monkeypatch.setattr(modulo_bitacora, "BITACORA_MAX_COLA", 1)
+    bitacora = Bitacora(str(tmp_path / "bitacora.db"))
+    bitacora.hilo = "sin escritor"
+    bitacora.registrar_cotizacion()
+    bitacora.registrar_cotizacion()
+    assert bitacora.estadisticas() == {"activa": True, "pendientes": 1, "descartados_cola_llena": 1}
+
+def test_apagada_por_defecto():
+    assert modulo_bitacora.bitacora.estadisticas() == {"activa": False}
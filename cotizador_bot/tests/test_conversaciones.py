@@ -0,0 +1,103 @@
+import threading
+import time
+import pytest
+import conversaciones
+from conversaciones import (
+    cerrar_conversacion, debe_procesar_mensaje, descartar_reserva_parcial, guardar_reserva_parcial,
+    limpiar_cache, obtener_reserva_parcial, procesando, tiene_reserva_parcial, turnos_activos
+)
+from config import TIEMPO_AGRUPACION, TIEMPO_MENSAJE_ANTIGUO, TTL_RESERVA_PARCIAL
+
+NUMERO = "56911112222"
+T0 = 1_800_000_000.0
+
+@pytest.fixture(autouse=True)
+def estado_limpio():
+    conversaciones.reiniciar()
+    yield
+    conversaciones.reiniciar()
+
+def test_mensaje_duplicado_se_procesa_una_vez():
+    assert debe_procesar_mensaje(NUMERO, "m1", T0, ahora=T0)
+    assert not debe_procesar_mensaje(NUMERO, "m1", T0, ahora=T0 + 10)
+
+def test_mensaje_antiguo_se_descarta():
+    assert not debe_procesar_mensaje(NUMERO, "m1", T0 - TIEMPO_MENSAJE_ANTIGUO - 1, ahora=T0)
+
+def test_mensajes_dentro_de_la_ventana_se_agrupan():
+    assert debe_procesar_mensaje(NUMERO, "m1", T0, ahora=T0)
+    assert not debe_procesar_mensaje(NUMERO, "m2", T0, ahora=T0 + TIEMPO_AGRUPACION / 2)
+    assert debe_procesar_mensaje(NUMERO, "m3", T0, ahora=T0 + 2 * TIEMPO_AGRUPACION + 1)
+    # Otro número no comparte la ventana
+    assert debe_procesar_mensaje("56933334444", "m4", T0, ahora=T0 + 2 * TIEMPO_AGRUPACION + 1)
+
+def test_conversacion_cerrada_espera_antes_de_reabrir():
+    assert debe_procesar_mensaje(NUMERO, "m1", T0, ahora=T0)
+    cerrar_conversacion(NUMERO, ahora=T0 + 2)
+    assert not debe_procesar_mensaje(NUMERO, "m2", T0 + 3, ahora=T0 + 3)
+    assert debe_procesar_mensaje(NUMERO, "m3", T0 + 8, ahora=T0 + 8)
+
+def test_reserva_parcial_conserva_solo_campos_de_reserva():
+    guardar_reserva_parcial(NUMERO, {
+        "check_in": "2026-12-03", "cant_personas": "4", "check_out": None,
+        "codigo_promocion": "BYTE10", "alternativas_habitaciones": [["2 estandar", 1]],
+    })
+    assert obtener_reserva_parcial(NUMERO) == {"check_in": "2026-12-03", "cant_personas": "4"}
+    assert tiene_reserva_parcial(NUMERO)
+    descartar_reserva_parcial(NUMERO)
+    assert obtener_reserva_parcial(NUMERO) is None
+    assert not tiene_reserva_parcial(NUMERO)
+
+def test_reserva_parcial_vence(monkeypatch):
+    guardar_reserva_parcial(NUMERO, {"cant_personas": "4"})
+    ahora = time.time()
+    monkeypatch.setattr(conversaciones.time, "time", lambda: ahora + TTL_RESERVA_PARCIAL + 1)
+    assert not tiene_reserva_parcial(NUMERO)
+    assert obtener_reserva_parcial(NUMERO) is None
+
+def test_limpiar_cache_barre_a_lo_mas_cada_intervalo(monkeypatch):
+    barridos = []
+    monkeypatch.setattr(conversaciones, "_barrer", barridos.append)
+    monkeypatch.setattr(conversaciones, "_ultima_limpieza", 0.0)
+    limpiar_cache()
+    limpiar_cache()
+    assert len(barridos) == 1
+    limpiar_cache(forzar=True)
+    assert len(barridos) == 2
+
+def test_barrido_olvida_lo_vencido():
+    ahora = time.time()
+    assert debe_procesar_mensaje(NUMERO, "viejo", ahora - 30, ahora=ahora - 3 * TIEMPO_MENSAJE_ANTIGUO)
+    limpiar_cache(forzar=True)
+    # El message_id se olvidó: ya no cuenta como duplicado (y es antiguo igual)
+    franja = conversaciones._franja(NUMERO)
+    assert "viejo" not in franja.procesados
+    assert NUMERO in franja.conversaciones
+
+def test_procesando_serializa_un_numero_y_no_otros():
+    dentro = threading.Event()
+    soltar = threading.Event()
+    orden = []
+
+    def primero():
+        with procesando(NUMERO):
+            dentro.set()
+            soltar.wait(5)
+            orden.append("primero")
+
+    def segundo():
+        with procesando(NUMERO):
+            orden.append("segundo")
+
+    hilos = [threading.Thread(target=primero), threading.Thread(target=segundo)]
+    hilos[0].start()
+    assert dentro.wait(5)
+    hilos[1].start()
+    # Otro número entra aunque NUMERO esté ocupado
+    with procesando("56933334444"):
+        orden.append("otro")
+    soltar.set()
+    for hilo in hilos:
+        hilo.join(5)
+    assert orden == ["otro", "primero", "segundo"]
+    assert turnos_activos() == 0
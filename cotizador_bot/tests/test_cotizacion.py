@@ -0,0 +1,53 @@
+import base64
+import pytest
+from cotizacion import (
+    formatear_mensaje_exito, formatear_mensaje_faltantes, generar_cotizacion, obtener_campos_faltantes,
+    responder_sin_extraccion
+)
+from intenciones import SALUDO
+
+RESERVA = {"check_in": "2026-12-03", "check_out": "2026-12-06", "cant_personas": "4",
+           "cantidad_habitaciones": "2", "tipo_habitaciones": "1 estandar, 1 superior"}
+
+def test_campos_faltantes_con_personas_no_pide_habitaciones():
+    reserva = dict(RESERVA, cantidad_habitaciones=None, tipo_habitaciones=None)
+    assert obtener_campos_faltantes(reserva) == []
+    reserva["cant_personas"] = None
+    assert obtener_campos_faltantes(reserva) == ["cant_personas", "cantidad_habitaciones", "tipo_habitaciones"]
+
+def test_mensaje_faltantes():
+    assert formatear_mensaje_faltantes(["check_out"]).endswith("Por favor indica: Fecha de salida.")
+    assert formatear_mensaje_faltantes(["check_in", "check_out", "cant_personas"]).endswith(
+        "Fecha de entrada, fecha de salida y cantidad de personas.")
+
+def test_generar_cotizacion_con_descuento_por_estadia():
+    cotizacion = generar_cotizacion(dict(RESERVA))
+    totales = cotizacion["totales"]
+    assert cotizacion["cantidad_noches"] == 3
+    assert totales["subtotal"] == 3 * (79980 + 81990)
+    assert [d["nombre"] for d in totales["descuentos"]] == ["Estadía 3+ noches"]
+    assert totales["total_neto"] == totales["subtotal"] - totales["total_descuentos"]
+    pdf = base64.b64decode(cotizacion["pdf_base64"])
+    assert pdf.startswith(b"%PDF") and cotizacion["pdf_bytes"] == len(pdf)
+
+def test_generar_cotizacion_fechas_invalidas():
+    with pytest.raises(ValueError):
+        generar_cotizacion(dict(RESERVA, check_out="2026-12-03"))
+
+def test_mensaje_exito_con_habitaciones_agregadas():
+    reserva = dict(RESERVA, cant_personas="5", tipo_habitaciones="3 estandar",
+                   alternativas_habitaciones=[["3 estandar", 239940], ["1 single, 2 estandar", 239940]],
+                   habitaciones_agregadas="1 estandar")
+    totales = {"total_descuentos": 1000, "total_bruto": 700000}
+    mensaje = formatear_mensaje_exito(reserva, 3, totales)
+    assert "Habitaciones para 5 personas: 3 estandar\n" in mensaje
+    assert "agregamos 1 estandar\n" in mensaje
+    assert "Otras opciones: 1 single, 2 estandar ($239,940 por noche)" in mensaje
+    assert "Descuentos: -$1,000 CLP" in mensaje and "Total: $700,000 CLP" in mensaje
+
+def test_responder_sin_extraccion():
+    intencion, texto = responder_sin_extraccion("hola buenas tardes")
+    assert intencion == SALUDO and texto.startswith("Hola!")
+    assert responder_sin_extraccion("somos 4 del 3 al 5") is None
+    # Con una reserva a medias todo va a la extracción
+    assert responder_sin_extraccion("hola buenas tardes", {"cant_personas": "4"}) is None
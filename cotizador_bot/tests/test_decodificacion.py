@@ -0,0 +1,56 @@
+import json
+import pytest
+from decodificacion import (
+    ACEPTADO, RECHAZO_EVENTO, RECHAZO_INVALIDO, RECHAZO_NO_AUTORIZADO, RECHAZO_PROPIO,
+    RECHAZO_SIN_TEXTO, clasificar, decodificar, estadisticas, parsear_mensaje
+)
+from config import NUMERO_AUTORIZADO
+
+def evento(numero=NUMERO_AUTORIZADO, texto="somos 2 del 3 al 5", from_me=False, event="messages.upsert",
+           extendido=False):
+    mensaje = {"extendedTextMessage": {"text": texto}} if extendido else {"conversation": texto}
+    return {
+        "event": event, "instance": "hotel",
+        "data": {
+            "key": {"remoteJid": f"{numero}@s.whatsapp.net", "id": "ABC", "fromMe": from_me},
+            "message": mensaje, "messageTimestamp": 1760000000,
+        },
+    }
+
+def cuerpo(data):
+    return json.dumps(data).encode()
+
+def test_parsear_mensaje():
+    assert parsear_mensaje(evento(extendido=True)) == {
+        "instance_name": "hotel", "remote_jid": f"{NUMERO_AUTORIZADO}@s.whatsapp.net",
+        "message_id": "ABC", "numero": NUMERO_AUTORIZADO, "from_me": False,
+        "timestamp": 1760000000, "texto": "somos 2 del 3 al 5",
+    }
+    assert parsear_mensaje(evento(event="presence.update")) is None
+
+@pytest.mark.parametrize("datos, motivo", [
+    (cuerpo(evento()), ACEPTADO),
+    (cuerpo(evento(event="messages.update")), RECHAZO_EVENTO),
+    (cuerpo(evento(numero="56999999999")), RECHAZO_NO_AUTORIZADO),
+    (cuerpo(evento(from_me=True)), RECHAZO_PROPIO),
+    (cuerpo(evento(texto="")), RECHAZO_SIN_TEXTO),
+    (b'{"event": "messages.upsert", "x": "\\"' + NUMERO_AUTORIZADO.encode() + b'@", ', RECHAZO_INVALIDO),
+    # El evento solo aparece dentro del texto: el parseo completo lo rechaza
+    (cuerpo(dict(evento(event="send.message"), nota="messages.upsert")), RECHAZO_EVENTO),
+])
+def test_clasificar(datos, motivo):
+    mensaje, resultado = clasificar(datos)
+    assert resultado == motivo
+    assert (mensaje is not None) == (motivo == ACEPTADO)
+
+def test_numero_autorizado_dentro_del_texto_no_alcanza():
+    datos = evento(numero="56999999999", texto=f'"{NUMERO_AUTORIZADO}@ hola')
+    assert clasificar(cuerpo(datos)) == (None, RECHAZO_NO_AUTORIZADO)
+
+def test_decodificar_cuenta_por_motivo():
+    antes = estadisticas()
+    decodificar(cuerpo(evento()))
+    decodificar(cuerpo(evento(event="presence.update")))
+    despues = estadisticas()
+    assert despues[ACEPTADO] == antes[ACEPTADO] + 1
+    assert despues[RECHAZO_EVENTO] == antes[RECHAZO_EVENTO] + 1
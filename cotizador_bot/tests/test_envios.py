@@ -0,0 +1,85 @@
+import threading
+import time
+import pytest
+import envios
+from envios import CuboTokens, PlanificadorEnvios
+
+@pytest.fixture(autouse=True)
+def sin_esperas(monkeypatch):
+    monkeypatch.setattr(envios, "ENVIOS_BACKOFF_BASE", 0)
+    monkeypatch.setattr(envios, "ENVIOS_TASA_DESTINATARIO", 1000)
+    monkeypatch.setattr(envios, "ENVIOS_RAFAGA_DESTINATARIO", 1000)
+    monkeypatch.setattr(envios, "ENVIOS_TASA_INSTANCIA", 1000)
+    monkeypatch.setattr(envios, "ENVIOS_RAFAGA_INSTANCIA", 1000)
+
+def test_cubo_permite_rafaga_y_luego_espera():
+    cubo = CuboTokens(1, 2)
+    assert cubo.reservar() == 0
+    assert cubo.reservar() == 0
+    assert cubo.reservar() == pytest.approx(1, abs=0.05)
+    assert cubo.reservar() == pytest.approx(2, abs=0.05)
+    assert not cubo.lleno()
+
+def test_envios_de_una_conversacion_en_orden():
+    planificador = PlanificadorEnvios(hilos=4)
+    entregados = []
+
+    def enviar(numero, texto):
+        time.sleep(0.001)
+        entregados.append((numero, texto))
+        return True
+
+    futuros = [
+        planificador.encolar("hotel", numero, enviar, numero, i)
+        for i in range(20) for numero in ("a", "b")
+    ]
+    assert all(futuro.result(5) for futuro in futuros)
+    for numero in ("a", "b"):
+        assert [texto for n, texto in entregados if n == numero] == list(range(20))
+    assert planificador.estadisticas()["enviados"] == 40
+
+def test_excepcion_se_reintenta():
+    planificador = PlanificadorEnvios(hilos=1)
+    intentos = []
+
+    def inestable():
+        intentos.append(1)
+        if len(intentos) < 3:
+            raise ConnectionError("503")
+        return True
+
+    assert planificador.encolar("hotel", "a", inestable).result(5)
+    assert len(intentos) == 3
+    assert planificador.estadisticas()["reintentos"] == 2
+
+def test_fallo_definitivo_y_reintentos_agotados():
+    planificador = PlanificadorEnvios(hilos=1)
+    rechazos = []
+
+    def rechazado():
+        rechazos.append(1)
+        return False
+
+    def caido():
+        raise ConnectionError("caído")
+
+    assert planificador.encolar("hotel", "a", rechazado).result(5) is False
+    assert len(rechazos) == 1
+    assert planificador.encolar("hotel", "a", caido).result(5) is False
+    estadisticas = planificador.estadisticas()
+    assert estadisticas["fallidos"] == 2
+    assert estadisticas["reintentos"] == envios.ENVIOS_MAX_REINTENTOS
+
+def test_cola_llena_descarta(monkeypatch):
+    monkeypatch.setattr(envios, "ENVIOS_MAX_COLA", 2)
+    planificador = PlanificadorEnvios(hilos=1)
+    soltar = threading.Event()
+    primero = planificador.encolar("hotel", "a", soltar.wait, 5)
+    # Mientras el primero se envía, la cola admite ENVIOS_MAX_COLA pendientes más
+    while planificador.estadisticas()["pendientes"]:
+        time.sleep(0.001)
+    pendientes = [planificador.encolar("hotel", "a", lambda: True) for _ in range(3)]
+    assert pendientes[2].result(1) is False
+    soltar.set()
+    assert primero.result(5) and pendientes[0].result(5) and pendientes[1].result(5)
+    assert planificador.estadisticas()["descartados_cola_llena"] == 1
@@ -0,0 +1,11 @@
+from estadisticas import percentil
+
+def test_percentil_rango_mas_cercano():
+    valores = [5, 1, 4, 2, 3, 6, 7, 8, 9, 10]
+    assert percentil(valores, 0) == 1
+    assert percentil(valores, 50) == 6
+    assert percentil(valores, 95) == 10
+    assert percentil(valores, 100) == 10
+
+def test_percentil_sin_valores():
+    assert percentil([], 95) == 0
@@ -0,0 +1,80 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from extractor import (
+    combinar_con_conocidos, extraccion_fallback, procesar_fechas, procesar_respuesta_openai, validar_datos
+)
+
+CONOCIDOS = {"check_in": "2026-12-03", "check_out": "2026-12-05", "cant_personas": "2",
+             "cantidad_habitaciones": "1", "tipo_habitaciones": None}
+
+class Respuesta:
+    def __init__(self, contenido, status_code=200):
+        self.status_code = status_code
+        self.contenido = contenido
+        self.text = contenido
+
+    def json(self):
+        return {"choices": [{"message": {"content": self.contenido}}]}
+
+def test_combinar_completa_con_lo_conocido():
+    combinado = combinar_con_conocidos({"tipo_habitaciones": "superior", "check_in": None}, CONOCIDOS)
+    assert combinado == dict(CONOCIDOS, tipo_habitaciones="superior")
+
+def test_combinar_lo_nuevo_corrige_lo_conocido():
+    combinado = combinar_con_conocidos({"cant_personas": "4"}, CONOCIDOS)
+    assert combinado["cant_personas"] == "4"
+    assert combinado["check_in"] == "2026-12-03"
+
+def test_combinar_ignora_campos_ajenos_y_sin_conocidos_no_cambia():
+    assert "otro" not in combinar_con_conocidos({"otro": "x"}, CONOCIDOS)
+    resultado = {"cant_personas": "3"}
+    assert combinar_con_conocidos(resultado, None) is resultado
+
+def test_respuesta_openai_con_markdown_y_conocidos():
+    respuesta = Respuesta('```json\n{"cant_personas": 4, "tipo_habitaciones": "Superior"}\n```')
+    resultado = procesar_respuesta_openai(respuesta, "mejor somos 4 en superior", "2026-11-20", CONOCIDOS)
+    assert resultado["cant_personas"] == "4"
+    assert resultado["tipo_habitaciones"] == "superior"
+    assert resultado["check_out"] == "2026-12-05"
+
+def test_respuesta_openai_con_error_usa_fallback():
+    resultado = procesar_respuesta_openai(Respuesta("rate limit", 429), "somos 3", "2026-11-20")
+    assert resultado["cant_personas"] == "3"
+    assert resultado["cantidad_habitaciones"] == "1"
+
+def test_fallback_extrae_personas_habitaciones_y_tipos():
+    resultado = extraccion_fallback("Hola, somos cinco, 2 habitaciones estandar para mañana")
+    manana = datetime.now() + timedelta(days=1)
+    assert resultado["cant_personas"] == "5"
+    assert resultado["cantidad_habitaciones"] == "2"
+    assert resultado["tipo_habitaciones"] == "estandar"
+    assert resultado["check_in"] == manana.strftime("%Y-%m-%d")
+
+def test_fallback_no_pisa_habitaciones_conocidas():
+    assert extraccion_fallback("mejor somos 6")["cantidad_habitaciones"] == "1"
+    conocidos = dict(CONOCIDOS, cantidad_habitaciones="3")
+    resultado = combinar_con_conocidos(extraccion_fallback("mejor somos 6", conocidos), conocidos)
+    assert resultado["cant_personas"] == "6"
+    assert resultado["cantidad_habitaciones"] == "3"
+
+def test_procesar_fechas_mueve_al_mes_siguiente():
+    resultado = procesar_fechas({"check_in": "2026-11-03", "check_out": "2026-11-01"}, "2026-11-20")
+    assert resultado == {"check_in": "2026-12-03", "check_out": "2027-01-01"}
+    assert procesar_fechas({"check_in": "3 de diciembre"}, "2026-11-20") == {"check_in": None}
+
+def test_validar_datos():
+    resultado = validar_datos({"cant_personas": "80", "cantidad_habitaciones": "2",
+                               "tipo_habitaciones": "Estándar", "check_in": ""})
+    assert resultado == {"cant_personas": None, "cantidad_habitaciones": "2",
+                         "tipo_habitaciones": "estandar", "check_in": None}
+    assert json.dumps(validar_datos({"cant_personas": "dos"})) == '{"cant_personas": null}'
+
+@pytest.mark.parametrize("texto, personas", [
+    ("hola, para una noche, somos 4", "4"),
+    ("quiero una habitacion para dos noches, somos 3", "3"),
+    ("reserva para un grupo de 5", None),
+    ("una doble para 2", "2"),
+])
+def test_fallback_para_con_palabras_no_es_cantidad(texto, personas):
+    assert extraccion_fallback(texto)["cant_personas"] == personas
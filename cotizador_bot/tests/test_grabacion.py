@@ -0,0 +1,96 @@
+import asyncio
+import gzip
+import json
+import time
+import httpx
+import grabacion
+from grabacion import Grabador, leer_captura, redactar, reproducir, seudonimo
+
+PAYLOAD = {
+    "event": "messages.upsert",
+    "apikey": "secreta",
+    "sender": "56911112222@s.whatsapp.net",
+    "data": {
+        "key": {"remoteJid": "56933334444@s.whatsapp.net", "id": "ABC"},
+        "pushName": "Ana",
+        "message": {"conversation": "somos 2, escribir a ana.perez@mail.com o al +56 9 5555 6666 / 955556666"},
+        "messageTimestamp": 1760000000,
+    },
+}
+
+def test_redactar_quita_claves_sensibles():
+    redactado = redactar(PAYLOAD)
+    assert "apikey" not in redactado and "sender" not in redactado
+    assert "pushName" not in redactado["data"]
+    assert redactado["event"] == "messages.upsert"
+    assert redactado["data"]["messageTimestamp"] == 1760000000
+    # El original no se modifica
+    assert PAYLOAD["apikey"] == "secreta"
+
+def test_redactar_telefonos_y_correos():
+    redactado = redactar(PAYLOAD)
+    jid = redactado["data"]["key"]["remoteJid"]
+    assert jid == f"{seudonimo('56933334444')}@s.whatsapp.net"
+    texto = redactado["data"]["message"]["conversation"]
+    assert "ana.perez" not in texto and "correo@redactado" in texto
+    assert "955556666" not in texto
+    # Los números cortos (personas, fechas) se conservan
+    assert texto.startswith("somos 2,")
+
+def test_seudonimo_estable_y_del_mismo_largo():
+    assert seudonimo("56933334444") == seudonimo("56933334444")
+    assert seudonimo("56933334444") != seudonimo("56933334445")
+    assert len(seudonimo("56933334444")) == 11 and seudonimo("56933334444").isdigit()
+
+def test_grabador_escribe_captura_legible(tmp_path):
+    grabador = Grabador(str(tmp_path))
+    grabador.registrar(json.dumps(PAYLOAD).encode())
+    grabador.registrar(b"{no es json")
+    grabador.registrar({"event": "otro"})
+    grabador._detener()
+
+    eventos = leer_captura(grabador.ruta)
+    assert [payload.get("event") for _, payload in eventos] == ["messages.upsert", "otro"]
+    assert eventos[0][1] == redactar(PAYLOAD)
+    assert eventos[0][0] <= eventos[1][0] <= time.time()
+
+def test_leer_captura_tolera_ultima_linea_truncada(tmp_path):
+    ruta = tmp_path / "captura.jsonl.gz"
+    with gzip.open(ruta, "wt", encoding="utf-8") as archivo:
+        archivo.write(json.dumps({"t": 2.0, "payload": {"n": 2}}) + "\n")
+        archivo.write(json.dumps({"t": 1.0, "payload": {"n": 1}}) + "\n")
+        archivo.write('{"t": 3.0, "payl')
+    assert leer_captura(str(ruta)) == [(1.0, {"n": 1}), (2.0, {"n": 2})]
+
+def test_reproducir_eventos_sin_mensaje(monkeypatch, tmp_path):
+    ruta = tmp_path / "captura.jsonl.gz"
+    with gzip.open(ruta, "wt", encoding="utf-8") as archivo:
+        archivo.write(json.dumps({"t": 1.0, "payload": PAYLOAD}) + "\n")
+        archivo.write(json.dumps({"t": 2.0, "payload": {"event": "contacts.update",
+                                                       "data": [{"remoteJid": "x"}]}}) + "\n")
+        archivo.write(json.dumps({"t": 3.0, "payload": {"event": "connection.update", "data": None}}) + "\n")
+
+    recibidos = []
+
+    def responder(request):
+        recibidos.append(json.loads(request.content))
+        return httpx.Response(200, json={"status": "ok"})
+
+    cliente = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient",
+                        lambda **kwargs: cliente(transport=httpx.MockTransport(responder), **kwargs))
+    resultados = asyncio.run(reproducir(str(ruta), "http://prueba/webhook", velocidad=None))
+
+    assert sorted((r["numero"], r["id"], r["http"]) for r in resultados) == [
+        ("", None, 200), ("", None, 200), ("56933334444", "ABC", 200)
+    ]
+    eventos = [payload["event"] for payload in recibidos]
+    assert eventos.index("contacts.update") < eventos.index("connection.update")
+
+def test_cola_llena_se_cuenta(monkeypatch, tmp_path):
+    monkeypatch.setattr(grabacion, "GRABACION_MAX_COLA", 1)
+    grabador = Grabador(str(tmp_path))
+    grabador.hilo = "sin escritor"
+    grabador.registrar(b"{}")
+    grabador.registrar(b"{}")
+    assert grabador.estadisticas() == {"activa": True, "pendientes": 1, "descartados_cola_llena": 1}
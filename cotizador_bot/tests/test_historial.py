@@ -0,0 +1,126 @@
+import os
+from datetime import datetime
+import numpy as np
+import pytest
+import historial
+from historial import (
+    COLUMNAS, Historial, analizar, archivo_columna, cargar, fila_cotizacion, filas_completas, reparar
+)
+
+def totales(habitaciones, subtotal, descuentos=0):
+    neto = subtotal - descuentos
+    return {
+        "habitaciones": [{"tipo": tipo, "cantidad": cantidad} for tipo, cantidad in habitaciones],
+        "subtotal": subtotal, "total_descuentos": descuentos,
+        "total_neto": neto, "total_bruto": round(neto * 1.19),
+    }
+
+TS = datetime(2026, 11, 20, 12).timestamp()
+
+def cotizacion(check_in, noches, personas, habitaciones, subtotal, descuentos=0, pdf=True, ts=TS):
+    return fila_cotizacion(
+        {"check_in": check_in, "cant_personas": str(personas)}, noches,
+        totales(habitaciones, subtotal, descuentos), pdf, ts,
+    )
+
+FILAS = [
+    cotizacion("2026-12-03", 2, 2, [("Habitación Estándar", 1)], 160000),
+    cotizacion("2026-12-20", 3, 5, [("Habitación Estándar", 2), ("Habitación Superior", 1)], 720000, 36000),
+    cotizacion("2027-01-05", 1, 1, [("Habitación Single", 1)], 50000, pdf=False),
+]
+
+def columnas(filas):
+    return list(zip(*filas))
+
+def test_fila_cotizacion_en_orden_de_columnas():
+    fila = FILAS[1]
+    assert len(fila) == len(COLUMNAS)
+    valores = dict(zip((nombre for nombre, _ in COLUMNAS), fila))
+    assert valores["check_in"] == (datetime(2026, 12, 20) - datetime(1970, 1, 1)).days
+    assert (valores["noches"], valores["personas"], valores["habitaciones"]) == (3, 5, 3)
+    assert (valores["hab_estandar"], valores["hab_superior"], valores["hab_single"]) == (2, 1, 0)
+    assert valores["descuentos"] == 36000 and valores["pdf"] == 1
+
+def test_agregar_y_analizar(tmp_path):
+    directorio = str(tmp_path)
+    Historial(directorio).agregar(columnas(FILAS))
+    datos = cargar(directorio)
+    assert len(datos["ts"]) == 3
+    assert datos["total_neto"].tolist() == [160000, 684000, 50000]
+
+    resultado = analizar(datos, periodo="mes")
+    assert resultado["cotizaciones"] == 3 and resultado["con_pdf"] == 2
+    assert resultado["noches_promedio"] == 2.0
+    assert resultado["demanda"]["periodos"].astype(str).tolist() == ["2026-12-01", "2027-01-01"]
+    assert resultado["demanda"]["cotizaciones"].tolist() == [2, 1]
+    # 1x2 + 3x3 noches-habitación en diciembre
+    assert resultado["demanda"]["noches_habitacion"].tolist() == [11, 1]
+    assert resultado["mezcla"]["estandar"] == {"habitaciones": 3, "noches_habitacion": 8, "cotizaciones": 2}
+    assert resultado["descuento_promedio"] == pytest.approx(36000 / 930000)
+
+def test_analizar_filtra_por_fecha_de_cotizacion(tmp_path):
+    filas = FILAS + [cotizacion("2026-12-03", 2, 2, [("Habitación Estándar", 1)], 160000,
+                                ts=datetime(2026, 10, 1, 12).timestamp())]
+    Historial(str(tmp_path)).agregar(columnas(filas))
+    datos = cargar(str(tmp_path))
+    assert analizar(datos, desde="2026-11-01")["cotizaciones"] == 3
+    assert analizar(datos, hasta="2026-10-31")["cotizaciones"] == 1
+    assert analizar(datos, desde="2027-01-01") == {"cotizaciones": 0}
+
+def test_lectura_ignora_fila_incompleta_y_apertura_la_recorta(tmp_path):
+    directorio = str(tmp_path)
+    Historial(directorio).agregar(columnas(FILAS))
+    # Proceso muerto a mitad de fila: solo la primera columna quedó escrita
+    with open(archivo_columna(directorio, *COLUMNAS[0]), "ab") as archivo:
+        archivo.write(np.asarray([TS], dtype=COLUMNAS[0][1]).tobytes())
+    assert filas_completas(directorio) == 3
+    assert len(cargar(directorio)["ts"]) == 3
+
+    Historial(directorio).agregar(columnas(FILAS[:1]))
+    datos = cargar(directorio)
+    assert len(datos["ts"]) == 4
+    assert datos["total_neto"].tolist() == [160000, 684000, 50000, 160000]
+    for nombre, dtype in COLUMNAS:
+        assert os.path.getsize(archivo_columna(directorio, nombre, dtype)) == 4 * np.dtype(dtype).itemsize
+
+class _DiscoLleno:
+    def write(self, datos):
+        raise OSError(28, "No space left on device")
+
+def test_error_de_escritura_recorta_las_columnas_escritas(tmp_path):
+    directorio = str(tmp_path)
+    escritor = Historial(directorio)
+    escritor.agregar(columnas(FILAS[:1]))
+    escritor.archivos[3] = _DiscoLleno()
+    with pytest.raises(OSError):
+        escritor.agregar(columnas(FILAS[1:]))
+    for nombre, dtype in COLUMNAS:
+        assert os.path.getsize(archivo_columna(directorio, nombre, dtype)) == np.dtype(dtype).itemsize
+
+def test_registrar_no_propaga_errores(tmp_path):
+    escritor = Historial(str(tmp_path))
+    escritor.registrar({"check_in": "no es fecha"}, 2, totales([], 0), True)
+    escritor.registrar({"check_in": "2026-12-03", "cant_personas": "2"}, 2,
+                       totales([("Habitación Estándar", 1)], 160000), True)
+    escritor.registrar({"check_in": "2026-12-03", "cant_personas": "2"}, 70000,
+                       totales([("Habitación Estándar", 1)], 160000), True)
+    assert len(cargar(str(tmp_path))["ts"]) == 1
+
+def test_reparar_y_cargar_directorio_vacio(tmp_path):
+    reparar(str(tmp_path))
+    assert filas_completas(str(tmp_path)) == 0
+    assert all(len(valores) == 0 for valores in cargar(str(tmp_path)).values())
+
+def test_apagado_por_defecto():
+    assert not isinstance(historial.historial, Historial)
+
+def test_filas_de_otro_proceso_se_cuentan(tmp_path):
+    directorio = str(tmp_path)
+    escritor, otro = Historial(directorio), Historial(directorio)
+    escritor.agregar(columnas(FILAS[:1]))
+    otro.agregar(columnas(FILAS[1:2]))
+    escritor.archivos[3] = _DiscoLleno()
+    with pytest.raises(OSError):
+        escritor.agregar(columnas(FILAS[2:]))
+    assert filas_completas(directorio) == 2
+    assert list(cargar(directorio)["noches"]) == [2, 3]
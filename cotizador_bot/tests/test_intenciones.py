@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import pytest
+import intenciones
+from intenciones import (
+    GRACIAS, PRECIOS, RESERVA, SALUDO, SERVICIOS, RUTA_DATASET, clasificar, enrutar, entrenar, leer_dataset
+)
+
+@pytest.fixture(scope="module")
+def modelo():
+    return entrenar(leer_dataset(RUTA_DATASET))
+
+@pytest.mark.parametrize("texto, intencion", [
+    ("hola buenas tardes", SALUDO),
+    ("muchas gracias!", GRACIAS),
+    ("tienen estacionamiento?", SERVICIOS),
+    ("cuanto cuesta la habitacion superior", PRECIOS),
+    ("somos 3 personas del 5 al 8 de enero", RESERVA),
+    ("hola, somos 2 para mañana en una doble", RESERVA),
+])
+def test_enrutar(modelo, texto, intencion):
+    assert enrutar(texto, modelo=modelo) == intencion
+
+def test_bajo_el_umbral_va_a_la_extraccion(modelo):
+    etiqueta, probabilidad = clasificar("hola", modelo)
+    assert etiqueta == SALUDO
+    assert enrutar("hola", umbral=min(1.0, probabilidad + 1e-9), modelo=modelo) == RESERVA
+
+def test_sin_dataset_todo_es_reserva(monkeypatch, tmp_path):
+    monkeypatch.setattr(intenciones, "RUTA_DATASET", str(tmp_path / "no_existe.tsv"))
+    monkeypatch.setattr(intenciones, "_modelo", None)
+    monkeypatch.setattr(intenciones, "_modelo_cargado", False)
+    assert clasificar("muchas gracias") == (RESERVA, 1.0)
+    assert intenciones._modelo_cargado
+
+def test_dataset_con_etiqueta_desconocida(tmp_path):
+    ruta = tmp_path / "intenciones.tsv"
+    ruta.write_text("# comentario\n\nsaludo\thola\nqueja\tmal servicio\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        leer_dataset(str(ruta))
+
+def test_importar_no_entrena():
+    codigo = "import intenciones; print(intenciones._modelo_cargado)"
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True,
+                            cwd=os.path.dirname(RUTA_DATASET), check=True)
+    assert salida.stdout.strip() == "False"
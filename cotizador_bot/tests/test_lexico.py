@@ -0,0 +1,64 @@
+import pytest
+from lexico import (
+    CLAVE, FECHA, NUMERO, SEPARADOR, TIPO_HABITACION, UNIDAD,
+    buscar_secuencia, compilar_secuencia, normalizar_texto, tipos_mencionados, tokenizar
+)
+from precios import normalizar_tipo_habitacion, parsear_tipos_habitaciones
+
+def tipos_y_valores(texto):
+    return [(token.tipo, token.valor) for token in tokenizar(texto)]
+
+def test_normalizar_texto():
+    assert normalizar_texto("Habitación ESTÁNDAR para Ñuñoa") == "habitacion estandar para nunoa"
+
+def test_tokenizar_reconoce_numeros_tipos_y_unidades():
+    assert tipos_y_valores("Somos cinco, 2 habitaciones dobles") == [
+        (CLAVE, "somos"), (NUMERO, 5), (SEPARADOR, ","),
+        (NUMERO, 2), (UNIDAD, "habitacion"), (TIPO_HABITACION, "doble"),
+    ]
+
+def test_tokenizar_sinonimos_de_tipo():
+    assert tipos_mencionados(tokenizar("una matrimonial y una sencilla premium")) == ["single", "superior", "doble"]
+
+def test_pasado_manana_no_es_manana():
+    assert tipos_y_valores("pasado mañana") == [(FECHA, 2)]
+    assert tipos_y_valores("mañana") == [(FECHA, 1)]
+
+def test_palabras_desconocidas_cortan_la_contiguidad():
+    tokens = tokenizar("2 lindas personas")
+    assert [token.contiguo for token in tokens] == [True, False]
+    personas = compilar_secuencia((NUMERO, None), (UNIDAD, "persona"))
+    assert buscar_secuencia(tokens, personas) is None
+    assert [t.valor for t in buscar_secuencia(tokenizar("hola, 2 personas"), personas)] == [2, "persona"]
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("2 estandar, 1 superior", [("estandar", 2), ("superior", 1)]),
+    ("estandar y doble", [("estandar", 1), ("doble", 1)]),
+    ("dos superior", [("superior", 2)]),
+    ("3 dobles", [("doble", 3)]),
+    ("", []),
+    ("algo", [("estandar", 1)]),
+])
+def test_parsear_tipos_habitaciones(texto, esperado):
+    assert parsear_tipos_habitaciones(texto) == esperado
+
+@pytest.mark.parametrize("texto, esperado", [
+    # "2 camas" no es una habitación más ni fija el tipo por sí sola
+    ("2 camas", [("estandar", 1)]),
+    ("2 dobles, 2 camas", [("doble", 2)]),
+    ("1 doble y 2 camas", [("doble", 1)]),
+    ("2 camas y 1 superior", [("superior", 1)]),
+])
+def test_dos_camas_no_cuenta_una_habitacion_mas(texto, esperado):
+    assert parsear_tipos_habitaciones(texto) == esperado
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("single", "Habitación Single"),
+    ("Estándar", "Habitación Estándar"),
+    ("matrimonial", "Habitación Doble 2 Camas"),
+    ("2 camas", "Habitación Doble 2 Camas"),
+    ("estandar 2 camas", "Habitación Estándar"),
+    ("", "Habitación Estándar"),
+])
+def test_normalizar_tipo_habitacion(texto, esperado):
+    assert normalizar_tipo_habitacion(texto) == esperado
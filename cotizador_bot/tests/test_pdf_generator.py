@@ -0,0 +1,50 @@
+from reportlab.platypus import PageBreak, Table
+from pdf_generator import _paginas_detalle, lineas_detalle, es_cotizacion_larga, renderizar_cotizacion_pdf
+from precios import calcular_totales, obtener_precios_habitaciones
+
+def cotizacion(tipo, noches):
+    info = {"check_in": "2026-12-03", "check_out": f"2026-12-{3 + noches:02d}",
+            "cant_personas": "2", "cantidad_habitaciones": "1", "tipo_habitaciones": tipo}
+    return info, calcular_totales(tipo, noches, obtener_precios_habitaciones(), check_in=info["check_in"])
+
+def paginas(pdf):
+    return pdf.count(b"/Type /Page\n")
+
+def test_lineas_detalle_por_noche_y_habitacion():
+    _, totales = cotizacion("2 estandar, 1 superior", 2)
+    lineas = list(lineas_detalle("2026-12-03", 2, totales["habitaciones"]))
+    assert len(lineas) == 6
+    assert lineas[0] == ("03.12.2026", "Habitación 1 - Habitación Estándar", 1, 79980)
+    assert lineas[5] == ("04.12.2026", "Habitación 3 - Habitación Superior", 1, 81990)
+
+def test_paginas_detalle_arrastra_el_subtotal():
+    lineas = [("01.12.2026", f"Habitación {i}", 1, 1000) for i in range(1, 11)]
+    elementos = list(_paginas_detalle(iter(lineas), 5, 5))
+    tablas = [e for e in elementos if isinstance(e, Table)]
+    assert sum(isinstance(e, PageBreak) for e in elementos) == len(tablas) - 1
+    # 5 líneas en la primera página y 4 en las siguientes (una fila va al transporte)
+    filas = [tabla._cellvalues for tabla in tablas]
+    assert [len(f) - 2 for f in filas] == [5, 5, 2]
+    assert filas[0][-1][1:] == ["Subtotal a transportar", "", "", "$5.000"]
+    assert filas[1][1][1:] == ["Transporte página anterior", "", "", "$5.000"]
+    assert filas[1][-1][4] == "$9.000"
+    assert filas[2][-1][1:] == ["Total detalle", "", "", "$10.000"]
+
+def test_poco_espacio_en_la_primera_pagina_empieza_en_la_siguiente():
+    lineas = [("01.12.2026", "Habitación 1", 1, 1000)]
+    elementos = list(_paginas_detalle(iter(lineas), 2, 10))
+    assert isinstance(elementos[0], PageBreak) and isinstance(elementos[1], Table)
+
+def test_cotizacion_corta_en_una_pagina():
+    info, totales = cotizacion("1 estandar", 2)
+    assert not es_cotizacion_larga(totales, 2)
+    pdf = renderizar_cotizacion_pdf(info, totales, 2)
+    assert pdf.startswith(b"%PDF") and paginas(pdf) == 1
+
+def test_cotizacion_larga_se_detalla_en_varias_paginas():
+    info, totales = cotizacion("10 estandar", 20)
+    assert es_cotizacion_larga(totales, 20)
+    pdf = renderizar_cotizacion_pdf(info, totales, 20)
+    # 200 líneas de detalle no caben en una página
+    assert paginas(pdf) > 3
+    assert paginas(renderizar_cotizacion_pdf(info, totales, 20, detalle=False)) == 1
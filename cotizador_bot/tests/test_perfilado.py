@@ -0,0 +1,60 @@
+import time
+import perfilado
+from perfilado import _PERFIL_NULO, leer_perfiles, perfilar_solicitud
+
+def trabajo_lento():
+    fin = time.perf_counter() + 0.05
+    while time.perf_counter() < fin:
+        pass
+
+def test_apagado_retorna_perfil_nulo():
+    assert perfilar_solicitud("ABC") is _PERFIL_NULO
+    with perfilar_solicitud("ABC") as perfil:
+        perfil.etapa("extraccion")
+
+def test_guarda_pilas_y_etapas(monkeypatch, tmp_path):
+    monkeypatch.setattr(perfilado, "PERFIL_PORCENTAJE", 100)
+    monkeypatch.setattr(perfilado, "PERFIL_DIR", str(tmp_path))
+    with perfilar_solicitud("ABC/1") as perfil:
+        perfil.etapa("extraccion")
+        trabajo_lento()
+        perfil.etapa("pdf")
+
+    (meta, pilas), = leer_perfiles(str(tmp_path))
+    assert meta["message_id"] == "ABC/1" and meta["muestreado"]
+    assert [nombre for nombre, _ in meta["etapas"]] == ["extraccion", "pdf"]
+    assert meta["duracion_ms"] >= 50
+    assert pilas
+    assert any(pila.startswith("etapa:extraccion;") and pila.endswith("test_perfilado.py:trabajo_lento")
+               for pila in pilas)
+
+def test_rota_los_perfiles(monkeypatch, tmp_path):
+    monkeypatch.setattr(perfilado, "PERFIL_PORCENTAJE", 100)
+    monkeypatch.setattr(perfilado, "PERFIL_DIR", str(tmp_path))
+    monkeypatch.setattr(perfilado, "PERFIL_MAX_ARCHIVOS", 2)
+    for i in range(4):
+        with perfilar_solicitud(f"m{i}"):
+            time.sleep(0.002)
+    assert [meta["message_id"] for meta, _ in leer_perfiles(str(tmp_path))] == ["m2", "m3"]
+
+def test_error_al_guardar_no_llega_a_la_solicitud(monkeypatch):
+    monkeypatch.setattr(perfilado, "PERFIL_PORCENTAJE", 100)
+
+    def falla(perfil, duracion_ms):
+        raise RuntimeError("dictionary changed size during iteration")
+
+    monkeypatch.setattr(perfilado, "guardar_perfil", falla)
+    with perfilar_solicitud("ABC"):
+        time.sleep(0.002)
+
+def test_pilas_copiadas_al_terminar(monkeypatch, tmp_path):
+    monkeypatch.setattr(perfilado, "PERFIL_PORCENTAJE", 100)
+    monkeypatch.setattr(perfilado, "PERFIL_DIR", str(tmp_path))
+    with perfilar_solicitud("ABC") as perfil:
+        trabajo_lento()
+        pilas = perfil.pilas
+    assert perfil.pilas is not pilas and perfil.pilas == pilas
+    # Ya desregistrado, el muestreador no vuelve a tocar sus pilas
+    antes = dict(perfil.pilas)
+    time.sleep(3 * perfilado.PERFIL_INTERVALO_MS / 1000)
+    assert perfil.pilas == antes
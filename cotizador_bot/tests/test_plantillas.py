@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+import pytest
+import plantillas
+from plantillas import CachePlantillas, plantilla
+
+AHORA = datetime(2026, 11, 20, 10, 0)
+
+@pytest.fixture(autouse=True)
+def sin_muestreo(monkeypatch):
+    monkeypatch.setattr(plantillas, "PLANTILLAS_MUESTREO", 0)
+
+def fecha(dia):
+    """Próxima fecha con ese día del mes desde AHORA (20 de noviembre)"""
+    return f"2026-11-{dia:02d}" if dia > AHORA.day else f"2026-12-{dia:02d}"
+
+def rango(personas, entrada, salida):
+    return (f"somos {personas} del {entrada} al {salida} en estandar", {
+        "check_in": fecha(entrada), "check_out": fecha(salida),
+        "cant_personas": str(personas), "cantidad_habitaciones": "1", "tipo_habitaciones": "estandar",
+    })
+
+def manana(personas, hoy):
+    return (f"para {personas} manana", {
+        "check_in": (hoy + timedelta(days=1)).strftime("%Y-%m-%d"),
+        "check_out": (hoy + timedelta(days=2)).strftime("%Y-%m-%d"),
+        "cant_personas": str(personas), "cantidad_habitaciones": "1", "tipo_habitaciones": None,
+    })
+
+def test_plantilla_reemplaza_numeros_en_cifras_y_palabras():
+    assert plantilla("Somos cuatro, del 3 al 5") == ("somos # , del # al #", (4, 3, 5))
+    assert plantilla("somos 2 del 10 al 12")[0] == plantilla("Somos dos del 1 al 2")[0]
+
+EJEMPLOS = ((2, 3, 5), (4, 10, 13), (3, 25, 26), (6, 1, 4), (2, 7, 11))
+
+def test_responde_localmente_tras_aciertos_confirmados():
+    cache = CachePlantillas()
+    # Los primeros ejemplos no predicen: ¿el 2 es constante o ranura?, ¿el
+    # día cae en diciembre o en el próximo mes que lo tenga?
+    for personas, entrada, salida in EJEMPLOS:
+        cache.aprender(*rango(personas, entrada, salida), AHORA)
+
+    mensaje, esperado = rango(5, 14, 18)
+    assert cache.buscar(mensaje, AHORA) == esperado
+    estadisticas = cache.estadisticas()
+    assert estadisticas["aciertos"] == 2 and estadisticas["fallos"] == 0
+    assert estadisticas["locales"] == 1
+
+def test_sin_aciertos_suficientes_va_al_llm():
+    cache = CachePlantillas()
+    for personas, entrada, salida in EJEMPLOS[:3]:
+        cache.aprender(*rango(personas, entrada, salida), AHORA)
+    assert cache.buscar(rango(5, 14, 18)[0], AHORA) is None
+    assert cache.estadisticas()["no_confiables"] == 1
+
+def test_relativa_a_hoy_requiere_dos_dias_distintos():
+    cache = CachePlantillas()
+    for personas in (2, 3, 4, 7):
+        cache.aprender(*manana(personas, AHORA), AHORA)
+    # "mañana" visto un solo día no se distingue de "el viernes"
+    entrada = cache.plantillas[plantilla("para 2 manana")[0]]
+    assert entrada["aciertos"] == 2
+    assert not cache._confiable(entrada)
+    assert cache.buscar("para 5 manana", AHORA) is None
+
+    otro_dia = AHORA + timedelta(days=3)
+    cache.aprender(*manana(6, otro_dia), otro_dia)
+    assert cache._confiable(entrada)
+    assert cache.buscar("para 5 manana", otro_dia) == manana(5, otro_dia)[1]
+
+def test_confiable_exige_precision():
+    cache = CachePlantillas()
+    entrada = {"aciertos": 9, "fallos": 3, "dias": {AHORA.date()},
+               "explicaciones": {"check_in": {("dia", 0)}, "check_out": {("dia", 1)}}}
+    assert not cache._confiable(entrada)
+    entrada["fallos"] = 1
+    assert cache._confiable(entrada)
+
+def test_un_resultado_contradictorio_cuenta_como_fallo():
+    cache = CachePlantillas()
+    for personas, entrada, salida in EJEMPLOS:
+        cache.aprender(*rango(personas, entrada, salida), AHORA)
+    mensaje, resultado = rango(5, 14, 18)
+    resultado["cant_personas"] = "7"
+    cache.aprender(mensaje, resultado, AHORA)
+    assert cache.estadisticas()["fallos"] == 1
+
+def test_lru_descarta_las_menos_usadas():
+    cache = CachePlantillas(maximo=2)
+    cache.aprender("hola 1", {}, AHORA)
+    cache.aprender("chao 1", {}, AHORA)
+    cache.aprender("hola 2", {}, AHORA)
+    cache.aprender("otra 1", {}, AHORA)
+    assert list(cache.plantillas) == ["hola #", "otra #"]
+    assert cache.estadisticas()["descartadas"] == 1
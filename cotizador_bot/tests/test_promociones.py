@@ -0,0 +1,94 @@
+from datetime import date
+import json
+import os
+import pytest
+from promociones import (
+    caracteristicas, compilar_reglas, detectar_codigo_promocion, evaluar, evaluar_lote, obtener_tabla
+)
+
+REGLAS = [
+    {"nombre": "Estadía 3+ noches", "grupo": "estadia", "porcentaje": 5,
+     "condiciones": {"noches_min": 3, "noches_max": 6}},
+    {"nombre": "Estadía 7+ noches", "grupo": "estadia", "porcentaje": 15,
+     "condiciones": {"noches_min": 7}},
+    {"nombre": "Fin de semana", "porcentaje": 10, "aplica_a": ["superior"],
+     "condiciones": {"dias_semana": ["viernes", "sábado"]}},
+    {"nombre": "Código BYTE", "porcentaje": 20, "condiciones": {"codigo": "byte10"}},
+]
+
+VIERNES = "2026-12-04"
+MARTES = "2026-12-01"
+
+@pytest.fixture
+def tabla():
+    return compilar_reglas(REGLAS)
+
+def fila(tabla, habitaciones, noches, check_in=None, codigo=None):
+    return caracteristicas(tabla, habitaciones, noches, check_in, codigo, fecha_cotizacion=date(2026, 11, 1))
+
+def test_grupo_aplica_solo_la_mejor_regla(tabla):
+    descuentos = evaluar(tabla, fila(tabla, [("estandar", 1, 100000)], 8))
+    assert descuentos == [{"nombre": "Estadía 7+ noches", "grupo": "estadia", "porcentaje": 15, "monto": 15000}]
+
+def test_sin_condiciones_cumplidas(tabla):
+    assert evaluar(tabla, fila(tabla, [("estandar", 1, 100000)], 2, MARTES)) == []
+
+def test_regla_por_dia_y_tipo(tabla):
+    habitaciones = [("estandar", 1, 100000), ("superior", 1, 200000)]
+    assert evaluar(tabla, fila(tabla, habitaciones, 1, MARTES)) == []
+    descuentos = evaluar(tabla, fila(tabla, habitaciones, 1, VIERNES))
+    # Solo sobre el subtotal de la superior
+    assert descuentos == [{"nombre": "Fin de semana", "grupo": "Fin de semana", "porcentaje": 10, "monto": 20000}]
+
+def test_regla_con_fecha_no_aplica_sin_check_in(tabla):
+    assert evaluar(tabla, fila(tabla, [("superior", 1, 200000)], 1)) == []
+
+def test_codigo(tabla):
+    habitaciones = [("estandar", 1, 100000)]
+    assert evaluar(tabla, fila(tabla, habitaciones, 1, codigo="OTRO")) == []
+    assert evaluar(tabla, fila(tabla, habitaciones, 1, codigo="Byte10"))[0]["monto"] == 20000
+
+def test_limite_de_descuento_recorta_el_ultimo_grupo(tabla):
+    # 15% + 10% + 20% excede DESCUENTO_MAXIMO (30%): el código se recorta a 5%
+    descuentos = evaluar(tabla, fila(tabla, [("superior", 1, 100000)], 7, VIERNES, "BYTE10"))
+    assert [d["monto"] for d in descuentos] == [15000, 10000, 5000]
+    assert descuentos[-1]["porcentaje"] == 5
+
+def test_evaluar_lote_coincide_con_evaluar(tabla):
+    filas = [
+        fila(tabla, [("superior", n % 3 + 1, 90000 * (n % 3 + 1))], n % 9 + 1,
+             VIERNES if n % 2 else MARTES, "BYTE10" if n % 5 == 0 else None)
+        for n in range(40)
+    ]
+    esperado = [sum(d["monto"] for d in evaluar(tabla, f)) for f in filas]
+    assert evaluar_lote(tabla, filas, tamano_bloque=7).tolist() == esperado
+
+def test_reglas_invalidas():
+    with pytest.raises(ValueError):
+        compilar_reglas([{"nombre": "x", "condiciones": {"noches": 3}}])
+    with pytest.raises(ValueError):
+        compilar_reglas([{"nombre": "x", "condiciones": {"dias_semana": ["feriado"]}}])
+    with pytest.raises(ValueError):
+        compilar_reglas([{"nombre": "x", "aplica_a": ["suite"]}])
+
+def test_detectar_codigo(tabla):
+    assert detectar_codigo_promocion("tengo el código byte10 para 2", tabla) == "BYTE10"
+    assert detectar_codigo_promocion("sin código", tabla) is None
+
+def test_tabla_del_archivo_se_recompila_al_cambiar(tmp_path):
+    ruta = tmp_path / "promociones.json"
+    ruta.write_text(json.dumps(REGLAS[:1]), encoding="utf-8")
+    assert obtener_tabla(str(ruta)).nombres == ["Estadía 3+ noches"]
+    ruta.write_text(json.dumps(REGLAS[:2]), encoding="utf-8")
+    os.utime(ruta, (1, 1))
+    assert obtener_tabla(str(ruta)).nombres == ["Estadía 3+ noches", "Estadía 7+ noches"]
+    assert obtener_tabla(str(tmp_path / "no_existe.json")).nombres == []
+
+def test_archivo_del_repositorio_trae_los_tramos_por_estadia():
+    tabla = obtener_tabla(os.path.join(os.path.dirname(os.path.dirname(__file__)), "promociones.json"))
+    assert set(tabla.grupos) == {"estadia"}
+    porcentajes = {
+        noches: sum(d["porcentaje"] for d in evaluar(tabla, fila(tabla, [("estandar", 1, 100000)], noches)))
+        for noches in (2, 3, 5, 7, 14)
+    }
+    assert porcentajes == {2: 0, 3: 5, 5: 10, 7: 15, 14: 15}
@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+import registro
+from registro import hash_numero
+
+DIRECTORIO_BOT = os.path.dirname(os.path.abspath(registro.__file__))
+
+def ejecutar(codigo, directorio, **variables):
+    """Corre el código en un proceso nuevo (el registro es estado global del proceso)"""
+    entorno = dict(os.environ, PYTHONPATH=DIRECTORIO_BOT, **variables)
+    entorno.pop("COTIZADOR_LOG_ARCHIVO")
+    return subprocess.run([sys.executable, "-c", codigo], cwd=directorio, env=entorno,
+                          capture_output=True, text=True, check=True, timeout=60)
+
+def test_importar_no_crea_el_archivo(tmp_path):
+    ejecutar(
+        "import registro, extractor, cotizacion\n"
+        "registro.obtener_logger('prueba').warning('hola')\n",
+        tmp_path,
+    )
+    assert os.listdir(tmp_path) == []
+
+def test_configurar_registro_escribe_json_con_contexto(tmp_path):
+    ejecutar(
+        "import registro\n"
+        "registro.configurar_registro()\n"
+        "registro.configurar_registro()\n"
+        "log = registro.obtener_logger('envio')\n"
+        "with registro.contexto_solicitud('ABC', '56911112222'):\n"
+        "    log.warning('enviado %s', 1, extra={'duracion_ms': 12.5, 'datos': {'intentos': 2}})\n"
+        "try:\n"
+        "    1 / 0\n"
+        "except ZeroDivisionError:\n"
+        "    log.exception('falló')\n"
+        "registro._detener()\n"
+        "registro._detener()\n",
+        tmp_path,
+    )
+    with open(tmp_path / "logs" / "cotizador.log", encoding="utf-8") as archivo:
+        lineas = [json.loads(linea) for linea in archivo]
+    assert len(lineas) == 2
+    assert lineas[0]["etapa"] == "envio" and lineas[0]["mensaje"] == "enviado 1"
+    assert lineas[0]["message_id"] == "ABC"
+    assert lineas[0]["numero_hash"] == hash_numero("56911112222") != "56911112222"
+    assert lineas[0]["duracion_ms"] == 12.5 and lineas[0]["datos"] == {"intentos": 2}
+    assert lineas[1]["message_id"] is None and "ZeroDivisionError" in lineas[1]["error"]
+
+def test_datos_copiados_y_hash_con_sal(tmp_path):
+    salida = ejecutar(
+        "import registro, grabacion\n"
+        "registro.configurar_registro()\n"
+        "log = registro.obtener_logger('envio')\n"
+        "datos = {'intentos': 1}\n"
+        "with registro.contexto_solicitud('ABC', '56911112222'):\n"
+        "    log.warning('enviado', extra={'datos': datos})\n"
+        "datos['intentos'] = 2\n"
+        "registro._detener()\n"
+        "print(registro.digest_numero('56911112222'), registro.hash_numero('56911112222'),\n"
+        "      grabacion.seudonimo('56911112222'))\n",
+        tmp_path, COTIZADOR_NUMERO_SAL="sal",
+    )
+    digest, hash_con_sal, seudonimo_con_sal = salida.stdout.split()
+    with open(tmp_path / "logs" / "cotizador.log", encoding="utf-8") as archivo:
+        linea, = [json.loads(linea) for linea in archivo]
+    assert linea["datos"] == {"intentos": 1}
+    assert linea["numero_hash"] == hash_con_sal != hash_numero("56911112222")
+    # Registros y capturas parten del mismo hash con sal
+    assert hash_con_sal == digest[:12]
+    assert seudonimo_con_sal == str(int(digest, 16))[:11]